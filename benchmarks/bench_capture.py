@@ -0,0 +1,166 @@
+"""
+Cost of raw traffic capture on the event loop.
+
+Scenarios, each with capture off and on, on both engines:
+  - flood: 20k small SIA DC-09 frames as fast as possible; overhead is
+    the extra wall time
+  - paced: 20k msgs/s for 2 s from a client thread, one send per frame;
+    reports the extra CPU time of the event loop thread, relative to the
+    sink handler and as a share of one core (the capture thread's own
+    disk writes show in the process CPU)
+
+The sink handler does no parsing or logging, so the relative figure is
+an upper bound for the real handlers.
+
+Target: paced overhead under 5% of the sink's event loop CPU. Not
+reached: a record costs ~0.6 us of interpreter time (method call, clock
+read, one pack_into), so ~1.2 us per frame against ~4.5 us of sink
+handling. Measured on one core: +13..27% relative, ~2% of a core.
+
+Every frame is answered with an ACK, so it produces an IN and an OUT
+record. Segments go to a temporary directory.
+
+Usage: python benchmarks/bench_capture.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import logging
+import socket
+import tempfile
+import threading
+import time
+
+from core.capture import CaptureWriter
+from core.connection_handler import BaseProtocol, start_server
+from utils.logger import logger
+
+FRAMES = 20_000
+RATE = 20_000
+PACED_SECONDS = 2
+ROUNDS = 5
+FRAME = b'D350003A"SIA-DCS"0003L0#55555[#55555|Nri1/BA01]_12:00:00,01-01-2025\r'
+ACK = b'"ACK"0003L0#55555[]_12:00:00,01-01-2025\r'
+
+
+class AckProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self, expected: int):
+        super().__init__(receiver="dummy")
+        self.expected = expected
+        self.frames = 0
+        self.done = asyncio.Event()
+
+    async def handle(self, reader, writer, client_ip, client_port, data, session=None):
+        count = data.count(b"\r")
+        session.send(ACK * count)
+        self.frames += count
+        if self.frames >= self.expected:
+            self.done.set()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _start(engine: str, expected: int, capture_dir):
+    protocol = AckProtocol(expected)
+    protocol.port = _free_port()
+    if capture_dir is not None:
+        protocol.capture = CaptureWriter(capture_dir, "dummy", protocol.port)
+    server_task = asyncio.create_task(start_server(protocol, engine=engine))
+    await asyncio.sleep(0.1)
+    return protocol, server_task
+
+
+async def _stop(protocol, server_task):
+    server_task.cancel()
+    try:
+        await server_task
+    except asyncio.CancelledError:
+        pass
+    if protocol.capture is not None:
+        protocol.capture.close()
+
+
+async def _run_flood(engine: str, capture_dir) -> float:
+    protocol, server_task = await _start(engine, FRAMES, capture_dir)
+    reader, writer = await asyncio.open_connection("127.0.0.1", protocol.port)
+    replies = asyncio.create_task(reader.readexactly(len(ACK) * FRAMES))
+    started = time.perf_counter()
+    for _ in range(FRAMES):
+        writer.write(FRAME)
+    await writer.drain()
+    await protocol.done.wait()
+    await replies
+    elapsed = time.perf_counter() - started
+
+    writer.close()
+    await writer.wait_closed()
+    await _stop(protocol, server_task)
+    return elapsed
+
+
+def _paced_client(port: int, frames: int):
+    """Blocking client: one send per frame at RATE, replies read back in bulk."""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        started = time.perf_counter()
+        for i in range(frames):
+            sock.sendall(FRAME)
+            ahead = i / RATE - (time.perf_counter() - started)
+            if ahead > 0.001:
+                time.sleep(ahead)
+        expected = len(ACK) * frames
+        while expected > 0:
+            expected -= len(sock.recv(65536))
+
+
+async def _run_paced(engine: str, capture_dir):
+    """(event loop thread CPU seconds, whole process CPU seconds)"""
+    frames = RATE * PACED_SECONDS
+    protocol, server_task = await _start(engine, frames, capture_dir)
+    client = threading.Thread(target=_paced_client, args=(protocol.port, frames))
+    loop_cpu = time.thread_time()
+    process_cpu = time.process_time()
+    client.start()
+    await protocol.done.wait()
+    loop_cpu = time.thread_time() - loop_cpu
+    await asyncio.to_thread(client.join)
+    await _stop(protocol, server_task)
+    return loop_cpu, time.process_time() - process_cpu
+
+
+async def _best_of(run, engine: str, capture_dir):
+    """Best of ROUNDS runs with capture off and on, alternated so drift hits both alike."""
+    off, on = [], []
+    for _ in range(ROUNDS):
+        off.append(await run(engine, None))
+        on.append(await run(engine, capture_dir))
+    return min(off), min(on)
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    print(f"Flood, SIA small frames x{FRAMES // 1000}k with ACKs:")
+    for engine in ("streams", "buffered"):
+        with tempfile.TemporaryDirectory() as tmp:
+            off, on = await _best_of(_run_flood, engine, tmp)
+        print(f"  {engine:<9} off {off:7.3f}s ({FRAMES / off:8.0f} msgs/s)   "
+              f"on {on:7.3f}s ({FRAMES / on:8.0f} msgs/s)   overhead {(on / off - 1) * 100:+5.1f}%")
+
+    print(f"Paced, {RATE // 1000}k msgs/s for {PACED_SECONDS}s, event loop CPU:")
+    for engine in ("streams", "buffered"):
+        with tempfile.TemporaryDirectory() as tmp:
+            off, on = await _best_of(_run_paced, engine, tmp)
+        extra = on[0] - off[0]
+        print(f"  {engine:<9} off {off[0]:7.3f}s   on {on[0]:7.3f}s   overhead {extra / off[0] * 100:+5.1f}% "
+              f"({extra / PACED_SECONDS * 100:+4.1f}% of a core)   process CPU {off[1]:.3f}s -> {on[1]:.3f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Time the event loop thread spends in logger.info under a log flood.
+
+"direct" is the default setup (console + rotating file handler called
+synchronously); "queue" puts enable_queue_logging() in front of the same
+handlers, so the caller only enqueues and a background thread writes. The
+console goes to /dev/null and the file to a temp dir.
+
+Usage: python benchmarks/bench_logging_queue.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import logging
+import os
+import tempfile
+import time
+
+from utils.logger import disable_queue_logging, enable_queue_logging, setup_logger
+
+RECORDS = 50_000
+BURST = 5_000
+
+
+def flood(log: logging.Logger, records: int = RECORDS) -> float:
+    started = time.perf_counter()
+    for i in range(records):
+        log.info(f"(SENTINEL) (127.0.0.1) <<-- [EVENT R401] Account=1234|Event=R401|Zone={i}")
+    return time.perf_counter() - started
+
+
+def burst(log: logging.Logger) -> float:
+    """A burst that fits in the queue, then idle time for the writer thread."""
+    elapsed = flood(log, BURST)
+    time.sleep(0.5)
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            log = setup_logger("bench_logging", level=logging.INFO, log_dir=Path(tmp))
+            direct_burst = burst(log)
+            direct = flood(log)
+            enable_queue_logging(log, overflow="block")
+            queued_burst = burst(log)
+            queued = flood(log)
+            disable_queue_logging(log)
+            enable_queue_logging(log, overflow="drop_oldest")
+            dropping = flood(log)
+            dropped = disable_queue_logging(log)
+        finally:
+            sys.stdout = stdout
+    print(f"Burst of {BURST} INFO records (fits in the queue), caller thread time:")
+    print(f"  direct             {direct_burst:6.3f}s")
+    print(f"  queue              {queued_burst:6.3f}s  {direct_burst / queued_burst:4.1f}x")
+    print(f"Flood of {RECORDS} INFO records, caller thread time:")
+    print(f"  direct             {direct:6.3f}s")
+    print(f"  queue (block)      {queued:6.3f}s  {direct / queued:4.1f}x")
+    print(f"  queue (drop_oldest){dropping:6.3f}s  {direct / dropping:4.1f}x  dropped={dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Manitou STX/ETX framing: previous bytes buffer vs StxEtxFramer.
+
+"before" is the previous handler loop: `buffer += chunk` on bytes, then for
+every frame find ETX, re-slice the rest of the buffer and look for STX.
+"after" is StxEtxFramer (bytearray + consume offset, occasional compaction).
+
+Two delivery patterns: 100 frames per read, and one byte per read, for a
+small Signal frame and an 8 KB Binary (photo) frame.
+
+Usage: python benchmarks/bench_manitou_framing.py [frames]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import base64
+import os
+import time
+
+from protocols.manitou.framing import StxEtxFramer
+
+FRAME = (
+    b'\x02<Signal Event="BA" EvType="1"><Area>1</Area><AreaInfo>Home</AreaInfo>'
+    b"<Zone>3</Zone><PointID>7</PointID></Signal>\x03"
+)
+PHOTO = (
+    b'\x02<Binary Ext="jpg" RawNo="ABC123" FrameNo="1" Length="6144"><Data Length="8192">'
+    + base64.b64encode(os.urandom(6144))
+    + b"</Data></Binary>\x03"
+)
+
+
+class LegacyFramer:
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, chunk: bytes):
+        self.buffer += chunk
+        frames = []
+        while True:
+            etx_pos = self.buffer.find(b"\x03")
+            if etx_pos < 0:
+                break
+            frame = self.buffer[: etx_pos + 1]
+            self.buffer = self.buffer[etx_pos + 1 :]
+            stx_pos = frame.find(b"\x02")
+            frames.append(frame[stx_pos:] if stx_pos >= 0 else b"\x02" + frame)
+        return frames
+
+
+def run_before(reads):
+    framer = LegacyFramer()
+    frames = 0
+    for chunk in reads:
+        frames += len(framer.feed(chunk))
+    return frames
+
+
+def run_after(reads):
+    framer = StxEtxFramer()
+    frames = 0
+    for chunk in reads:
+        frames += len(framer.feed(chunk))
+    return frames
+
+
+def bench(name: str, frames: int, reads) -> str:
+    timings = {}
+    for label, fn in (("before", run_before), ("after", run_after)):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            assert fn(reads) == frames
+            best = min(best, time.perf_counter() - started)
+        timings[label] = best
+    return (
+        f"  {name:<28} x{frames:<7} before {frames / timings['before']:10.0f} frames/s  "
+        f"after {frames / timings['after']:10.0f} frames/s  "
+        f"speedup {timings['before'] / timings['after']:5.1f}x"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Manitou framing ({len(FRAME)}-byte signal, {len(PHOTO)}-byte photo frames):")
+    for kind, frame, frames in (("signal", FRAME, count), ("photo", PHOTO, count // 50)):
+        stream = frame * frames
+        batch = len(frame) * 100
+        print(bench(f"{kind}, 100 frames/read", frames, [stream[i:i + batch] for i in range(0, len(stream), batch)]))
+        few = max(frames // 100, 1)
+        print(bench(f"{kind}, 1 byte/read", few, [bytes([b]) for b in frame * few]))
+
+
+if __name__ == "__main__":
+    main()
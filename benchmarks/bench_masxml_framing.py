@@ -0,0 +1,74 @@
+"""
+MASXML framing cost for large photo frames delivered in 4 KB reads.
+
+"before" is the previous handler loop: decode every read, append it to a
+str buffer and search for </XMLMessageClass> from the start of the buffer.
+"after" is BufferedFramer + parse_masxml_frame. Doubling the frame size
+should roughly double "after" (linear) while "before" grows quadratically.
+
+Usage: python benchmarks/bench_masxml_framing.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import base64
+import os
+import time
+
+from core.framing import BufferedFramer
+from protocols.masxml.parser import parse_masxml_frame
+
+READ_SIZE = 4096
+END_TAG = "</XMLMessageClass>"
+
+
+def photo_frame(size: int) -> bytes:
+    b64 = base64.b64encode(os.urandom(size * 3 // 4))
+    return (
+        b"<?xml version='1.0' encoding='UTF-8'?><XMLMessageClass><MessageType>AJAX</MessageType>"
+        b"<MessageSequenceNo>1</MessageSequenceNo><Payload><PayloadID>1</PayloadID>"
+        b"<PacketData>" + b64 + b"</PacketData></Payload></XMLMessageClass>"
+    )
+
+
+def run_before(reads):
+    buffer = ""
+    frames = 0
+    for data in reads:
+        buffer += data.decode(errors="ignore")
+        while END_TAG in buffer:
+            msg_end = buffer.index(END_TAG) + len(END_TAG)
+            buffer = buffer[msg_end:]
+            frames += 1
+    return frames
+
+
+def run_after(reads):
+    framer = BufferedFramer(END_TAG.encode(), max_frame_size=64 * 1024 * 1024)
+    frames = 0
+    for data in reads:
+        for frame in framer.feed(data):
+            parse_masxml_frame(frame)
+            frames += 1
+    return frames
+
+
+def main():
+    print(f"MASXML photo frame split into {READ_SIZE}-byte reads:")
+    for size_mb in (1, 2, 4):
+        frame = photo_frame(size_mb * 1024 * 1024)
+        reads = [frame[i:i + READ_SIZE] for i in range(0, len(frame), READ_SIZE)]
+        timings = {}
+        for name, fn in (("before", run_before), ("after", run_after)):
+            started = time.perf_counter()
+            assert fn(reads) == 1
+            timings[name] = time.perf_counter() - started
+        print(
+            f"  {size_mb} MB: before {timings['before']:7.3f}s  after {timings['after']:7.3f}s  "
+            f"speedup {timings['before'] / timings['after']:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
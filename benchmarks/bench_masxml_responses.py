@@ -0,0 +1,64 @@
+"""
+MASXML ACK/NAK serialization: ElementTree + minidom pretty-printing (previous
+path, kept as _prettify_xml) versus the precompiled bytes templates.
+
+Usage: python benchmarks/bench_masxml_responses.py [replies]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+from xml.etree.ElementTree import Element, SubElement
+
+from protocols.masxml.responses import _prettify_xml, convert_masxml_ack, convert_masxml_nak
+
+
+def minidom_reply(seq: str, code: str, text: str) -> str:
+    root = Element("AckNakClass")
+    SubElement(root, "MessageSequenceNo").text = seq
+    SubElement(root, "ResultCode").text = code
+    SubElement(root, "ResultText").text = text
+    return _prettify_xml(root)
+
+
+def run_before(count: int):
+    for seq in range(count):
+        minidom_reply(str(seq), "0", "ok").encode()
+
+
+def run_after(count: int):
+    for seq in range(count):
+        convert_masxml_ack(sequence=str(seq))
+
+
+def run_nak_before(count: int):
+    for seq in range(count):
+        minidom_reply(str(seq), "10", "Poorly formed XML").encode()
+
+
+def run_nak_after(count: int):
+    for seq in range(count):
+        convert_masxml_nak(sequence=str(seq))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"MASXML replies x{count}:")
+    for name, before, after in (("ACK", run_before, run_after), ("NAK", run_nak_before, run_nak_after)):
+        t_before = min(_timed(before, count) for _ in range(3))
+        t_after = min(_timed(after, count) for _ in range(3))
+        print(
+            f"  {name}: minidom {count / t_before:10.0f}/s  templates {count / t_after:10.0f}/s  "
+            f"speedup {t_before / t_after:6.1f}x"
+        )
+
+
+def _timed(fn, count) -> float:
+    started = time.perf_counter()
+    fn(count)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
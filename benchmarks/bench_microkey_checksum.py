@@ -0,0 +1,94 @@
+"""
+Micro Key checksums at high frame rates: verify the incoming <Checksum> and
+build the ACK for every frame.
+
+  fixed     default (microkey.checksum: fixed): no verification, ACK with constant 4FE9
+  naive     verify + format the ACK and CRC the whole <Response> body
+  computed  verify + ACK CRC continued from the precomputed prefix register
+            (microkey.checksum: ARC)
+
+The ACK-only rows isolate reply construction.
+
+Usage: python benchmarks/bench_microkey_checksum.py [frames]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+
+from protocols.microkey.parser import check_microkey_checksum
+from protocols.microkey.responses import ACK_PATTERN, generate_ack
+from utils.crc import crc16_arc_hex
+
+SIGNALS = (
+    '<Signals SignalCount="1"><Signal><Account>1234</Account><Date>01-01-2025</Date><Time>12:00:00</Time>'
+    "<SignalIdentifier>E130</SignalIdentifier><PhysicalZone>3</PhysicalZone><Area>1</Area></Signal>"
+    "<Sequence>{}</Sequence></Signals>"
+)
+
+
+def make_frames(count: int):
+    frames = []
+    for i in range(count):
+        seq = str(i % 100_000)
+        signals = SIGNALS.format(seq).encode()
+        frames.append((seq, signals + b"<Checksum>" + crc16_arc_hex(signals).encode() + b"</Checksum>"))
+    return frames
+
+
+def run_fixed(frames):
+    for seq, _frame in frames:
+        generate_ack(seq)
+
+
+def run_naive(frames):
+    for seq, frame in frames:
+        assert check_microkey_checksum(frame) is None
+        body = ACK_PATTERN.format(seq, "").encode()
+        body = body[1:body.index(b"<Checksum>")]
+        ACK_PATTERN.format(seq, crc16_arc_hex(body)).encode()
+
+
+def run_computed(frames):
+    for seq, frame in frames:
+        assert check_microkey_checksum(frame) is None
+        generate_ack(seq, compute=True)
+
+
+def run_ack_naive(frames):
+    for seq, _frame in frames:
+        body = ACK_PATTERN.format(seq, "").encode()
+        body = body[1:body.index(b"<Checksum>")]
+        ACK_PATTERN.format(seq, crc16_arc_hex(body)).encode()
+
+
+def run_ack_computed(frames):
+    for seq, _frame in frames:
+        generate_ack(seq, compute=True)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    frames = make_frames(count)
+    print(f"Micro Key verify + ACK x{count} ({len(frames[0][1])}-byte frames):")
+    runs = (
+        ("fixed", run_fixed),
+        ("naive", run_naive),
+        ("computed", run_computed),
+        ("ACK only, naive", run_ack_naive),
+        ("ACK only, computed", run_ack_computed),
+    )
+    for name, fn in runs:
+        best = min(_timed(fn, frames) for _ in range(3))
+        print(f"  {name:<24} {best:7.3f}s  {count / best:10.0f} frames/s")
+
+
+def _timed(fn, frames) -> float:
+    started = time.perf_counter()
+    fn(frames)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro Key framing for a large frame delivered in small reads.
+
+"before" is the previous handler loop: decode each read, append it to a str
+buffer and run split_complete_frames (lazy regex over the whole buffer).
+"after" is MicrokeyFramer, which only scans newly arrived bytes.
+
+Usage: python benchmarks/bench_microkey_framing.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+
+from protocols.microkey.framing import MicrokeyFramer
+from protocols.microkey.parser import split_complete_frames
+
+READ_SIZE = 1024
+SIGNAL = (
+    "<Signal><Account>1234</Account><SignalIdentifier>E761</SignalIdentifier>"
+    "<VideoFile>https://cdn.example.com/imagesvc/original/image_0001</VideoFile></Signal>"
+)
+
+
+def frame(signals: int) -> bytes:
+    return (
+        f'<Signals SignalCount="{signals}">' + SIGNAL * signals
+        + "<Sequence>1</Sequence></Signals><Checksum>4FE9</Checksum>"
+    ).encode()
+
+
+def run_before(reads):
+    buffer = ""
+    frames = 0
+    for data in reads:
+        buffer += data.decode("utf-8")
+        found, buffer = split_complete_frames(buffer)
+        frames += len(found)
+    return frames
+
+
+def run_after(reads):
+    framer = MicrokeyFramer()
+    frames = 0
+    for data in reads:
+        frames += len(framer.feed(data))
+    return frames
+
+
+def main():
+    print(f"Micro Key frame split into {READ_SIZE}-byte reads:")
+    for signals in (500, 1000, 2000):
+        data = frame(signals)
+        reads = [data[i:i + READ_SIZE] for i in range(0, len(data), READ_SIZE)]
+        timings = {}
+        for name, fn in (("before", run_before), ("after", run_after)):
+            best = float("inf")
+            for _ in range(3):
+                started = time.perf_counter()
+                assert fn(reads) == 1
+                best = min(best, time.perf_counter() - started)
+            timings[name] = best
+        print(
+            f"  {len(data) // 1024:5d} KB: before {timings['before']:7.3f}s  after {timings['after']:7.3f}s  "
+            f"speedup {timings['before'] / timings['after']:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Micro Key signal parsing and labelling per frame.
+
+"before" is the previous handler path: the frame was tokenized twice (once
+for the incoming label, once for the ACK/NAK label), every field was a
+separate re.search over the signal, and every signal ran the image-URL
+regexes over its whole body. "after" is extract_signals + classify_signals
+once, with both labels built from the same buckets.
+
+Usage: python benchmarks/bench_microkey_signals.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import re
+import time
+
+from protocols.microkey.parser import (
+    PHOTO_CODES,
+    build_labels,
+    build_reply_label,
+    classify_signals,
+    extract_signals,
+)
+
+ROUNDS = 2000
+
+_SIG_RE = re.compile(r"<Signal>(.*?)</Signal>", re.DOTALL)
+_URL_ANY_SCHEME_RE = re.compile(r"\b(?:[a-z][a-z0-9+.\-]*://\S+)", re.IGNORECASE)
+_IMAGE_EXT_URL_RE = re.compile(
+    r"\b(?:[a-z][a-z0-9+.\-]*://\S+?\.(?:jpg|jpeg|png|gif|webp|bmp|tif|tiff))(?:\?\S+)?\b",
+    re.IGNORECASE,
+)
+_IMAGE_HOST_HINT_RE = re.compile(r"imagesvc", re.IGNORECASE)
+_IMAGE_PATH_HINT_RE = re.compile(r"(?:/s/|image_|/original/)", re.IGNORECASE)
+_SERVICE_HINT_RE = re.compile(r"(?:app_video-svc|app_company-svc)", re.IGNORECASE)
+
+
+def legacy_labels(msg: str):
+    def get(field, src):
+        m = re.search(fr"<{field}>(.*?)</{field}>", src, flags=re.DOTALL)
+        return m.group(1).strip() if m else ""
+
+    buckets = ({}, {}, {})
+    for raw in _SIG_RE.findall(msg):
+        sig = {name: get(tag, raw) for name, tag in (
+            ("account", "Account"), ("date", "Date"), ("time", "Time"), ("code", "SignalIdentifier"),
+            ("zone", "PhysicalZone"), ("area", "Area"), ("data", "Data"),
+        )}
+        code = sig["code"]
+        if code == "E130" or _IMAGE_EXT_URL_RE.search(raw) or (
+            (_IMAGE_HOST_HINT_RE.search(raw) or _SERVICE_HINT_RE.search(raw)) and _IMAGE_PATH_HINT_RE.search(raw)
+        ) or code in PHOTO_CODES:
+            bucket = buckets[0]
+        elif _URL_ANY_SCHEME_RE.search(raw):
+            bucket = buckets[1]
+        else:
+            bucket = buckets[2]
+        bucket[code] = bucket.get(code, 0) + 1
+    return buckets
+
+
+def run_before(frames):
+    for frame in frames:
+        text = frame.decode()
+        legacy_labels(text)  # incoming label
+        legacy_labels(text)  # reply label
+
+
+def run_after(frames):
+    for frame in frames:
+        buckets = classify_signals(extract_signals(frame))
+        build_labels(*buckets)
+        build_reply_label("ACK", *buckets)
+
+
+def signal(code: str, extra: str = "") -> str:
+    return (
+        f"<Signal><Account>1234</Account><Date>01-01-2025</Date><Time>12:00:00</Time>"
+        f"<SignalIdentifier>{code}</SignalIdentifier><PhysicalZone>3</PhysicalZone>"
+        f"<Area>1</Area><Data>Front door</Data>{extra}</Signal>"
+    )
+
+
+def frame(*signals: str) -> bytes:
+    return (
+        f'<Signals SignalCount="{len(signals)}">' + "".join(signals) + "<Sequence>1</Sequence></Signals>"
+        "<Checksum>0000</Checksum>"
+    ).encode()
+
+
+def main():
+    cases = {
+        "1 event": frame(signal("R145")),
+        "8 events": frame(*[signal("R145")] * 8),
+        "4 photo links": frame(*[
+            signal("E761", f"<Url>https://imagesvc.example.com/original/{i}</Url>") for i in range(4)
+        ]),
+    }
+    print(f"Micro Key labels per frame ({ROUNDS} frames, best of 3):")
+    for name, data in cases.items():
+        frames = [data] * ROUNDS
+        timings = {}
+        for label, fn in (("before", run_before), ("after", run_after)):
+            best = float("inf")
+            for _ in range(3):
+                started = time.perf_counter()
+                fn(frames)
+                best = min(best, time.perf_counter() - started)
+            timings[label] = best
+        print(
+            f"  {name:14s} before {timings['before'] * 1e6 / ROUNDS:7.1f}us  "
+            f"after {timings['after'] * 1e6 / ROUNDS:7.1f}us  "
+            f"speedup {timings['before'] / timings['after']:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Sentinel per-frame rendering cost for 4 KB event frames, DEBUG off.
+
+"before" is the previous handler: a per-byte Python loop for the visible
+string, run twice for frames without a LinkUrl (link check, then the log
+line), plus the hex block and text preview that were always built for
+logger.debug. "after" renders the visible string once through the
+256-entry tables and skips the debug dumps behind isEnabledFor(DEBUG).
+
+Usage: python benchmarks/bench_sentinel_render.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import logging
+import time
+
+from protocols.sentinel.handler import SentinelProtocol
+from utils.tools import logger
+
+ROUNDS = 500
+FRAME_SIZE = 4096
+
+
+def legacy_visible(data: bytes) -> str:
+    out = []
+    for b in data:
+        if 0x20 <= b <= 0x7E:
+            ch = chr(b)
+            out.append(ch if ch not in '\r\n' else f'<0x{b:02X}>')
+        elif b == 0x09:
+            out.append(' ')
+        else:
+            out.append(f'<0x{b:02X}>')
+    return ''.join(out)
+
+
+def legacy_hex_block(data: bytes, limit: int = 512) -> str:
+    hex_str = " ".join(f"{b:02X}" for b in data[:limit])
+    if len(data) > limit:
+        hex_str += f" …(+{len(data) - limit} bytes)"
+    return hex_str
+
+
+def legacy_preview(data: bytes, limit: int = 4096) -> str:
+    s = data.decode(errors='ignore').replace('\r', ' ').replace('\n', ' ')
+    return s if len(s) <= limit else s[:limit] + '…'
+
+
+def run_before(protocol, frames):
+    for data in frames:
+        legacy_visible(data)  # LinkUrl check
+        legacy_visible(data)  # INFO line
+        f"[IN HEX]  {legacy_hex_block(data)}"
+        f"[PREVIEW] '{legacy_preview(data)}'"
+
+
+def run_after(protocol, frames):
+    for data in frames:
+        protocol._bytes_to_visible_str(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            f"[IN HEX]  {protocol._bytes_to_hex_block(data)}"
+            f"[PREVIEW] '{protocol._preview_bytes(data)}'"
+
+
+def event_frame(control_every: int = 0) -> bytes:
+    body = bytearray(b"Account=1234|Event=E130|Zone=3|Text=")
+    while len(body) < FRAME_SIZE - 1:
+        body += b"Front door opened by user 7 "
+    del body[FRAME_SIZE - 1:]
+    if control_every:
+        body[::control_every] = b"\x1e" * len(body[::control_every])
+    return bytes(body) + b"\x14"
+
+
+def main():
+    protocol = SentinelProtocol()
+    logger.setLevel(logging.INFO)
+    cases = {"ascii": event_frame(), "5% control bytes": event_frame(20)}
+    print(f"Sentinel {FRAME_SIZE}-byte event frames, DEBUG off ({ROUNDS} frames, best of 3):")
+    for name, data in cases.items():
+        assert protocol._bytes_to_visible_str(data) == legacy_visible(data)
+        frames = [data] * ROUNDS
+        timings = {}
+        for label, fn in (("before", run_before), ("after", run_after)):
+            best = float("inf")
+            for _ in range(3):
+                started = time.perf_counter()
+                fn(protocol, frames)
+                best = min(best, time.perf_counter() - started)
+            timings[label] = best
+        print(
+            f"  {name:17s} before {timings['before'] * 1e6 / ROUNDS:8.1f}us  "
+            f"after {timings['after'] * 1e6 / ROUNDS:6.1f}us  "
+            f"speedup {timings['before'] / timings['after']:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+SIA DC-09 CRC-16/ARC throughput: validate an incoming frame and build its
+ACK (CRC + 0LLL length) per message, on one core.
+
+Target: at least 50k msgs/s for typical ADM-CID frames. Frames carrying
+photo links are ~8x longer and CRC-bound in pure Python; they are shown
+for reference and are not held to the target.
+
+Usage: python benchmarks/bench_sia_crc.py [messages]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+
+from protocols.sia_dc09.parser import check_sia_frame
+from protocols.sia_dc09.responses import convert_sia_ack, frame_sia
+
+TARGET = 50_000
+
+
+def incoming_frames(count: int, photos: int = 0):
+    frames = []
+    for seq in range(count):
+        links = ",".join(f"https://i.ajax.systems/s/{seq:04d}{i:02d}abcdefghijklmnop" for i in range(photos))
+        v_block = f"[V{links}]" if photos else ""
+        body = f'"ADM-CID"{seq % 10000:04d}L0#1234[#1234|1130 01 001]{v_block}_12:00:00,01-01-2025'
+        frames.append("\n" + frame_sia(body).rstrip("\r"))
+    return frames
+
+
+def run(frames):
+    for frame in frames:
+        if check_sia_frame(frame) is not None:
+            raise AssertionError(f"Frame rejected: {frame!r}")
+        convert_sia_ack(sequence="0001", account="1234", timestamp="12:00:00,01-01-2025")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    for name, photos, target in (("ADM-CID event", 0, TARGET), ("ADM-CID with 10 photo links", 10, None)):
+        frames = incoming_frames(count, photos)
+        best = min(_timed(run, frames) for _ in range(3))
+        rate = count / best
+        if target is None:
+            verdict = "reference, no target"
+        else:
+            verdict = f"{'OK' if rate >= target else 'BELOW TARGET'}, target {target}"
+        print(f"{name} ({len(frames[0])} bytes) x{count}: validate + ACK {rate:10.0f} msgs/s  [{verdict}]")
+
+
+def _timed(fn, frames) -> float:
+    started = time.perf_counter()
+    fn(frames)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
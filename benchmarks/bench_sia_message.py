@@ -0,0 +1,138 @@
+"""
+Compare the per-message SIA DC-09 parsing cost before and after the
+single-pass SIAMessage model, on ADM-CID frames carrying 10 photo links.
+
+"before" replays the regex helpers the handler used to call per message:
+parse_sia_message, get_sia_label (-> get_link_summary), mask_links_for_log
+and get_sia_response_label (-> get_sia_label again).
+"after" builds one SIAMessage and reads label, log text and reply fields from it.
+
+Usage: python benchmarks/bench_sia_message.py [messages]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import logging
+import re
+import time
+
+from protocols.sia_dc09.message import SIAMessage, classify_v_link
+from protocols.sia_dc09.parser import parse_sia_message
+from utils.logger import logger
+
+ACK = '"ACK"0001R0L0A0#1234[]_12:00:00,01-01-2025\r'
+
+
+def _is_photo(part: str) -> bool:
+    return (
+        part.startswith('https://i.ajax.systems/s/')
+        or part.startswith('https://ajax-cdn-prod.s3.')
+        or '.jpg' in part
+        or '/image_' in part
+    )
+
+
+def legacy_link_summary(message: str):
+    photo, web, desktop, other = [], [], [], []
+    for v in re.findall(r'\[V([^\]]+)\]', message):
+        for part in [p.strip() for p in v.split(',')]:
+            t = classify_v_link(part)
+            if t == 'PHOTO':
+                photo.append(part)
+            elif t == 'WEB' and not web:
+                web.append(part)
+            elif t == 'DESKTOP' and not desktop:
+                desktop.append(part)
+            elif t == 'LINK' and not other:
+                other.append(part)
+    return photo, web, desktop, other
+
+
+def legacy_label(message: str) -> str:
+    if '"NULL"' in message:
+        return "PING"
+    if '"ADM-CID"' in message:
+        m = re.search(r'\|(\d{4})\s', message)
+        code = m.group(1) if m else None
+        photo, web, desktop, other = legacy_link_summary(message)
+        if photo:
+            return f"PHOTO {code} x{len(photo)}"
+        return f"EVENT {code}"
+    return "UNKNOWN"
+
+
+def legacy_mask(message: str) -> str:
+    def mask_v_block(match):
+        parts = [p.strip() for p in match.group(1).split(',')]
+        if not [p for p in parts if _is_photo(p)]:
+            return match.group(0)
+        masked, seen = [], 0
+        for part in parts:
+            if _is_photo(part):
+                masked.append(part if seen == 0 else " [PHOTO_URL]")
+                seen += 1
+            else:
+                masked.append(part)
+        return "[V" + ','.join(masked) + "]"
+    return re.sub(r'\[V([^\]]+)\]', mask_v_block, message)
+
+
+def legacy_response_label(response: str, message: str) -> str:
+    if '"ACK"' in response:
+        code = legacy_label(message)
+        return f"ACK {code}" if code != "UNKNOWN" else "ACK"
+    return "RESPONSE"
+
+
+def run_before(messages):
+    for message in messages:
+        parsed = parse_sia_message(message)
+        label = legacy_label(message)
+        text = legacy_mask(message).strip()
+        out = legacy_response_label(ACK, message)
+    return parsed, label, text, out
+
+
+def run_after(messages):
+    for message in messages:
+        sia = SIAMessage(message)
+        parsed = sia.reply_fields()
+        label = sia.label
+        text = sia.log_text
+        out = sia.response_label(ACK)
+    return parsed, label, text, out
+
+
+def photo_message(seq: int, photos: int = 10) -> str:
+    links = ",".join(f"https://i.ajax.systems/s/{seq:04d}{i:02d}abcdefghijklmnop" for i in range(photos))
+    return (
+        f'\n5D2F0047"ADM-CID"{seq % 10000:04d}L0#1234[#1234|1130 01 001]'
+        f'[V{links}]_12:00:00,01-01-2025'
+    )
+
+
+def main():
+    logger.setLevel(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    messages = [photo_message(i) for i in range(count)]
+    assert run_before(messages[:1]) == run_after(messages[:1])
+
+    results = {}
+    for name, fn in (("before", run_before), ("after", run_after)):
+        best = None
+        for _ in range(3):
+            started = time.perf_counter()
+            fn(messages)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+
+    print(f"SIA ADM-CID with 10 photo links x{count}:")
+    for name, elapsed in results.items():
+        print(f"  {name:<7} {elapsed:7.3f}s  {count / elapsed:10.0f} msgs/s")
+    print(f"  speedup {results['before'] / results['after']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+SIA DC-09 load test: datagram (UDP) endpoint against the TCP server.
+
+The same SIADC09Protocol instance serves both; every frame is answered with
+an ACK, and throughput is measured as ACKs received per second by one client.
+UDP frames are sent with a bounded window of unanswered datagrams so the
+socket buffers do not overflow; lost datagrams are reported, not retried.
+
+Usage: python benchmarks/bench_sia_udp.py [frames] [window]
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import logging
+import socket
+import time
+
+from core.connection_handler import create_server
+from core.datagram_transport import create_datagram_endpoint
+from protocols.sia_dc09.handler import SIADC09Protocol
+from protocols.sia_dc09.responses import frame_sia
+from utils.logger import logger
+
+LOSS_TIMEOUT = 1.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _frames(count: int):
+    return [
+        ("\n" + frame_sia(f'"ADM-CID"{seq % 10000:04d}R0L0#1234[#1234|1130 01 001]_12:00:00,01-01-2025')).encode()
+        for seq in range(count)
+    ]
+
+
+class _UDPClient(asyncio.DatagramProtocol):
+    def __init__(self, window: int):
+        self.acks = 0
+        self.slots = asyncio.Semaphore(window)
+
+    def datagram_received(self, data, addr):
+        self.acks += 1
+        self.slots.release()
+
+
+async def run_udp(protocol, frames, window: int) -> float:
+    loop = asyncio.get_running_loop()
+    server = await create_datagram_endpoint(protocol, host="127.0.0.1")
+    transport, client = await loop.create_datagram_endpoint(
+        lambda: _UDPClient(window), remote_addr=("127.0.0.1", protocol.port)
+    )
+    started = time.perf_counter()
+    for frame in frames:
+        try:
+            await asyncio.wait_for(client.slots.acquire(), LOSS_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass  # a datagram or its ACK was lost; keep the window moving
+        transport.sendto(frame)
+    last, idle_since = -1, time.perf_counter()
+    while client.acks < len(frames) and time.perf_counter() - idle_since < LOSS_TIMEOUT:
+        if client.acks != last:
+            last, idle_since = client.acks, time.perf_counter()
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    transport.close()
+    server.close()
+    if client.acks < len(frames):
+        print(f"  udp lost {len(frames) - client.acks} of {len(frames)} datagrams")
+    return elapsed
+
+
+async def run_tcp(protocol, frames) -> float:
+    server = await create_server(protocol)
+    reader, writer = await asyncio.open_connection("127.0.0.1", protocol.port)
+    started = time.perf_counter()
+    writer.write(b"".join(frames))
+    await writer.drain()
+    acks = 0
+    while acks < len(frames):
+        acks += (await reader.read(65536)).count(b"\r")
+    elapsed = time.perf_counter() - started
+    writer.close()
+    server.close()
+    return elapsed
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    frames = _frames(count)
+
+    protocol = SIADC09Protocol()
+    results = {}
+    for name in ("tcp", "udp"):
+        best = None
+        for _ in range(3):
+            protocol.port = _free_port()
+            elapsed = await (run_tcp(protocol, frames) if name == "tcp" else run_udp(protocol, frames, window))
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+
+    print(f"SIA ADM-CID x{count} (UDP window {window}):")
+    for name, elapsed in results.items():
+        print(f"  {name:<4} {elapsed:7.3f}s  {count / elapsed:10.0f} frames/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
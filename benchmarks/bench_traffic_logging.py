@@ -0,0 +1,89 @@
+"""
+Per-frame handler cost at INFO vs WARNING log level.
+
+Traffic lines go through log_traffic(), so at WARNING the labels, media
+shrinking and byte rendering passed as callables are never run. Handler
+output is sent to /dev/null; replies go to a session stub.
+
+Usage: python benchmarks/bench_traffic_logging.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import logging
+import os
+import time
+
+from protocols.microkey.handler import MicrokeyProtocol
+from protocols.sentinel.handler import SentinelProtocol
+from utils.logger import logger
+
+ROUNDS = 2000
+
+MICROKEY_FRAME = (
+    b'<Signals SignalCount="2">'
+    + b"<Signal><Account>1234</Account><SignalIdentifier>E761</SignalIdentifier>"
+      b"<Url>https://imagesvc.example.com/original/1</Url><Url>https://imagesvc.example.com/original/2</Url></Signal>"
+    + b"<Signal><Account>1234</Account><SignalIdentifier>R145</SignalIdentifier><Data>Front door</Data></Signal>"
+    + b"<Sequence>1</Sequence></Signals><Checksum>0000</Checksum>"
+)
+SENTINEL_FRAME = b"Account=1234|Event=E130|" + b"|".join(b"MediaUrl=https://x/%d.jpg" % i for i in range(8)) + b"\x14"
+
+
+class SessionStub:
+    def send(self, data, delay=0.0):
+        pass
+
+
+def run_microkey(protocol, session):
+    for _ in range(ROUNDS):
+        protocol._process_frame(MICROKEY_FRAME, session, "127.0.0.1", 5000)
+
+
+def run_sentinel(protocol, session):
+    async def frames():
+        for _ in range(ROUNDS):
+            await protocol._handle_frame(SENTINEL_FRAME, session, "127.0.0.1")
+    asyncio.run(frames())
+
+
+def best_of_3(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    microkey = MicrokeyProtocol()
+    microkey.validate_checksum = False
+    cases = (("microkey", run_microkey, microkey), ("sentinel", run_sentinel, SentinelProtocol()))
+    session = SessionStub()
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        streams = [h for h in logger.handlers if isinstance(h, logging.StreamHandler)]
+        saved = [h.setStream(devnull) for h in streams]
+        try:
+            for level in (logging.INFO, logging.WARNING):
+                logger.setLevel(level)
+                for name, fn, protocol in cases:
+                    results[name, level] = best_of_3(fn, protocol, session)
+        finally:
+            for h, stream in zip(streams, saved):
+                h.setStream(stream)
+            logger.setLevel(logging.INFO)
+    print(f"Handler time per frame ({ROUNDS} frames, best of 3):")
+    for name, _, _ in cases:
+        info, warning = results[name, logging.INFO], results[name, logging.WARNING]
+        print(
+            f"  {name:9s} INFO {info * 1e6 / ROUNDS:6.1f}us  WARNING {warning * 1e6 / ROUNDS:6.1f}us  "
+            f"{info / warning:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the StreamReader engine with the BufferedProtocol engine.
+
+Scenarios:
+  - 1 MB base64 MASXML photo frames
+  - 10k small SIA DC-09 frames
+
+The sink protocol buffers and splits exactly like the real handlers
+(`session.buffer += chunk`, then slice per frame), so the streams path
+pays the same re-copying cost the emulator pays today.
+
+Usage: python benchmarks/bench_transport.py
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import base64
+import logging
+import os
+import socket
+import time
+
+from core.connection_handler import BaseProtocol, start_server
+from utils.logger import logger
+
+
+class SinkProtocol(BaseProtocol):
+    session_buffer = ""
+
+    def __init__(self, delimiter: bytes, expected: int):
+        super().__init__(receiver="dummy")
+        self.frame_delimiter = delimiter
+        self._end = delimiter.decode()
+        self.expected = expected
+        self.frames = 0
+        self.done = asyncio.Event()
+
+    async def handle(self, reader, writer, client_ip, client_port, data, session=None):
+        session.buffer += data.decode(errors="ignore")
+        while self._end in session.buffer:
+            idx = session.buffer.index(self._end) + len(self._end)
+            session.buffer = session.buffer[idx:]
+            self.frames += 1
+        if self.frames >= self.expected:
+            self.done.set()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _run(engine: str, payload: bytes, delimiter: bytes, frames: int) -> float:
+    protocol = SinkProtocol(delimiter, frames)
+    protocol.port = _free_port()
+    server_task = asyncio.create_task(start_server(protocol, engine=engine))
+    await asyncio.sleep(0.1)
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", protocol.port)
+    started = time.perf_counter()
+    for _ in range(frames):
+        writer.write(payload)
+    await writer.drain()
+    await protocol.done.wait()
+    elapsed = time.perf_counter() - started
+
+    writer.close()
+    await writer.wait_closed()
+    server_task.cancel()
+    try:
+        await server_task
+    except asyncio.CancelledError:
+        pass
+    return elapsed
+
+
+def _masxml_photo_frame(size: int = 1024 * 1024) -> bytes:
+    b64 = base64.b64encode(os.urandom(size * 3 // 4)).decode()
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?><XMLMessageClass><MessageType>AJAX</MessageType>"
+        "<MessageSequenceNo>1</MessageSequenceNo><Payload><PayloadID>1</PayloadID>"
+        f"<PacketData>{b64}</PacketData></Payload></XMLMessageClass>"
+    ).encode()
+
+
+def _sia_frame() -> bytes:
+    return b'D350003A"SIA-DCS"0003L0#55555[#55555|Nri1/BA01]_12:00:00,01-01-2025\r'
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    scenarios = [
+        ("MASXML 1 MB base64 x20", _masxml_photo_frame(), b"</XMLMessageClass>", 20),
+        ("SIA small frames x10k", _sia_frame(), b"\r", 10_000),
+    ]
+    for name, payload, delimiter, frames in scenarios:
+        results = {}
+        for engine in ("streams", "buffered"):
+            results[engine] = min([await _run(engine, payload, delimiter, frames) for _ in range(3)])
+        mb = len(payload) * frames / 1e6
+        print(f"{name}:")
+        for engine, elapsed in results.items():
+            print(f"  {engine:<9} {elapsed:8.3f}s  {frames / elapsed:10.0f} frames/s  {mb / elapsed:8.1f} MB/s")
+        print(f"  speedup   {results['streams'] / results['buffered']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
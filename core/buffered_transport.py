@@ -0,0 +1,304 @@
+import asyncio
+from typing import List, Optional
+
+from core.capture import CAPTURE_IN
+from utils.tools import logger
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+DEFAULT_MAX_BUFFER_SIZE = 16 * 1024 * 1024
+MIN_READ_SIZE = 4096
+# Upper bound for one batch of complete frames handed to protocol.handle()
+HANDOFF_SIZE = 4096
+# Pause reading when this many batches of frames are waiting for the handler
+QUEUE_HIGH_WATER = 64
+
+
+class ReceiveBuffer:
+    """
+    Preallocated per-connection receive buffer.
+
+    The transport reads straight into the free tail of the bytearray
+    (get_buffer/buffer_updated), framers search it in place and complete
+    frames are copied out exactly once, when they are handed to the parser.
+    """
+
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE, max_size: int = DEFAULT_MAX_BUFFER_SIZE):
+        self._buf = bytearray(size)
+        self.max_size = max_size
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def writable(self, sizehint: int = -1) -> memoryview:
+        """Return a memoryview over the free tail, compacting or growing first if needed."""
+        need = max(sizehint, MIN_READ_SIZE)
+        if len(self._buf) - self.end < need:
+            self._make_room(need)
+        return memoryview(self._buf)[self.end:]
+
+    def advance(self, nbytes: int):
+        self.end += nbytes
+
+    def view(self) -> memoryview:
+        return memoryview(self._buf)[self.start:self.end]
+
+    def find(self, sub: bytes, scan_from: int = 0) -> int:
+        """Find `sub` in unconsumed data starting at absolute offset `scan_from`."""
+        return self._buf.find(sub, max(self.start, scan_from), self.end)
+
+    def rfind(self, sub: bytes, scan_from: int = 0, limit: Optional[int] = None) -> int:
+        end = self.end if limit is None else min(limit, self.end)
+        return self._buf.rfind(sub, max(self.start, scan_from), end)
+
+    def last(self, nbytes: int) -> bytes:
+        """Copy of the last `nbytes` received (raw traffic capture)."""
+        with memoryview(self._buf) as mv:
+            return bytes(mv[self.end - nbytes:self.end])
+
+    def take(self, end: int) -> bytes:
+        """Copy out and consume data up to absolute offset `end`."""
+        with memoryview(self._buf) as mv:
+            data = bytes(mv[self.start:end])
+        self.consume(end)
+        return data
+
+    def consume(self, end: int):
+        self.start = end
+        if self.start >= self.end:
+            self.start = self.end = 0
+
+    def clear(self):
+        self.start = self.end = 0
+
+    def _make_room(self, need: int):
+        size = self.end - self.start
+        if self.start and len(self._buf) - size >= need:
+            # Compact in place: equal-length slice assignment never resizes
+            # the bytearray, so it is safe while views are exported.
+            self._buf[:size] = self._buf[self.start:self.end]
+        else:
+            new_buf = bytearray(max(len(self._buf) * 2, size + need))
+            new_buf[:size] = self._buf[self.start:self.end]
+            self._buf = new_buf
+        self.start, self.end = 0, size
+
+
+class TransportWriter:
+    """StreamWriter-compatible facade over a transport so handlers stay engine-agnostic."""
+
+    def __init__(self, transport: asyncio.Transport):
+        self.transport = transport
+        self._paused = False
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def write(self, data: bytes):
+        self.transport.write(data)
+
+    def writelines(self, data):
+        self.transport.writelines(data)
+
+    def get_extra_info(self, name, default=None):
+        return self.transport.get_extra_info(name, default)
+
+    def is_closing(self) -> bool:
+        return self.transport.is_closing()
+
+    def close(self):
+        self.transport.close()
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+    async def drain(self):
+        if self._closed.done():
+            raise ConnectionResetError("Connection lost")
+        if not self._paused:
+            return
+        self._drain_waiter = asyncio.get_running_loop().create_future()
+        await self._drain_waiter
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        self._wake_drain()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self._wake_drain(exc or ConnectionResetError("Connection lost"))
+
+    def _wake_drain(self, exc: Optional[Exception] = None):
+        waiter, self._drain_waiter = self._drain_waiter, None
+        if waiter is None or waiter.done():
+            return
+        if exc is None:
+            waiter.set_result(None)
+        else:
+            waiter.set_exception(exc)
+
+
+class SessionBufferedProtocol(asyncio.BufferedProtocol):
+    """
+    asyncio.BufferedProtocol engine for one connection.
+
+    Data is received into a ReceiveBuffer. If the protocol declares a
+    `frame_delimiter`, only complete frames are copied out and handed to
+    `protocol.handle()`; partial frames stay in the preallocated buffer.
+    """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.delimiter: Optional[bytes] = getattr(protocol, "frame_delimiter", None)
+        self.rbuf = ReceiveBuffer(max_size=getattr(protocol, "max_buffer_size", DEFAULT_MAX_BUFFER_SIZE))
+        self._scan_rel = 0
+        self.transport = None
+        self.writer: Optional[TransportWriter] = None
+        self.session = None
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        self._reading_paused = False
+        self._task: Optional[asyncio.Task] = None
+        self._capture = protocol.capture
+        self._conn_id = 0
+
+    @property
+    def protocol_name(self) -> str:
+        return self.protocol.receiver_name.split(".")[-1]
+
+    # ---------- asyncio callbacks ----------
+
+    def connection_made(self, transport):
+        self.transport = transport
+        client_ip, client_port = transport.get_extra_info("peername")[:2]
+        self.writer = TransportWriter(transport)
+        writer = self.writer
+        if self._capture is not None:
+            self._conn_id = self._capture.open_connection(f"{client_ip}:{client_port}")
+            writer = self._capture.wrap(writer, self._conn_id)
+        self.session = self.protocol.create_session(client_ip, client_port, writer)
+        logger.debug(f"({self.protocol_name}) ({client_ip}:{client_port}) connection opened")
+        self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.rbuf.writable(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        self.rbuf.advance(nbytes)
+        self.session.feed(nbytes)
+        if self._capture is not None:
+            self._capture.record(self._conn_id, CAPTURE_IN, self.rbuf.last(nbytes))
+
+        for data in self._split_frames():
+            self._queue.put_nowait(data)
+
+        if len(self.rbuf) > self.rbuf.max_size:
+            logger.warning(
+                f"({self.protocol_name}) ({self.session.peer}) Receive buffer exceeded "
+                f"{self.rbuf.max_size} bytes without a frame delimiter; discarding"
+            )
+            self.rbuf.clear()
+            self._scan_rel = 0
+
+        if not self._reading_paused and self._queue.qsize() >= QUEUE_HIGH_WATER:
+            self._reading_paused = True
+            self.transport.pause_reading()
+
+    def eof_received(self) -> bool:
+        self._queue.put_nowait(None)
+        # Keep the transport open until queued frames are handled and replied to
+        return True
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.writer.connection_lost(exc)
+        self._queue.put_nowait(None)
+
+    def pause_writing(self):
+        self.writer.pause_writing()
+
+    def resume_writing(self):
+        self.writer.resume_writing()
+
+    # ---------- framing ----------
+
+    def _split_frames(self) -> List[bytes]:
+        """
+        Copy complete frames out of the receive buffer exactly once.
+
+        Frames are handed over in batches of roughly HANDOFF_SIZE bytes, each
+        ending on a delimiter, so handlers never re-scan one huge chunk.
+        """
+        rbuf = self.rbuf
+        if self.delimiter is None:
+            return [rbuf.take(rbuf.end)] if len(rbuf) else []
+
+        batches = []
+        dlen = len(self.delimiter)
+        # Scan position is kept relative to the unconsumed start, so it survives compaction
+        scan_from = rbuf.start + self._scan_rel
+        while len(rbuf):
+            limit = min(rbuf.end, rbuf.start + HANDOFF_SIZE)
+            pos = rbuf.rfind(self.delimiter, scan_from, limit)
+            if pos < 0:
+                # Single frame larger than one batch: look past the batch limit
+                pos = rbuf.find(self.delimiter, max(scan_from, limit - dlen + 1))
+            if pos < 0:
+                break
+            batches.append(rbuf.take(pos + dlen))
+            scan_from = rbuf.start
+
+        # Resume the next search where this one stopped (delimiter may straddle reads)
+        self._scan_rel = max(0, len(rbuf) - dlen + 1)
+        return batches
+
+    # ---------- dispatch ----------
+
+    async def _consume(self):
+        session = self.session
+        # None in the queue means EOF or a lost connection
+        peer_gone = True
+        try:
+            while True:
+                data = await self._queue.get()
+                if data is None:
+                    break
+                if self._reading_paused and self._queue.qsize() < QUEUE_HIGH_WATER // 2:
+                    self._reading_paused = False
+                    self.transport.resume_reading()
+                await self.protocol.handle(
+                    None, session.writer, session.client_ip, session.client_port, data, session=session
+                )
+                await session.flush()
+        except Exception as e:
+            peer_gone = isinstance(e, ConnectionError)
+            logger.error(
+                f"({self.protocol_name}) Error while handling connection from {session.peer}: {e}"
+            )
+        finally:
+            try:
+                await session.finish_replies(peer_gone)
+            finally:
+                logger.info(f"({self.protocol_name}) Connection closed by {session.peer}")
+                self.protocol.close_session(session)
+                if self._capture is not None:
+                    self._capture.close_connection(self._conn_id)
+                self.rbuf.clear()
+                self.transport.close()
+
+
+async def create_buffered_server(protocol, host: str = "0.0.0.0", port: Optional[int] = None,
+                                 reuse_port: bool = False):
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(
+        lambda: SessionBufferedProtocol(protocol),
+        host=host,
+        port=protocol.port if port is None else port,
+        reuse_port=reuse_port or None,
+    )
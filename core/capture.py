@@ -0,0 +1,373 @@
+import asyncio
+import atexit
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from time import monotonic
+from typing import Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.config_loader import get_capture_config
+from utils.tools import logger
+
+# Record directions
+CAPTURE_IN = 0      # bytes read from the client
+CAPTURE_OUT = 1     # reply bytes written to the client
+CAPTURE_OPEN = 2    # connection accepted; payload is "ip:port"
+CAPTURE_CLOSE = 3   # connection closed; empty payload
+DIRECTION_NAMES = {CAPTURE_IN: "in", CAPTURE_OUT: "out", CAPTURE_OPEN: "open", CAPTURE_CLOSE: "close"}
+
+SEGMENT_MAGIC = b"CMSCAP01"
+SEGMENT_SUFFIX = ".cap"
+# magic, wall clock and monotonic clock at segment start, protocol name length (name follows)
+_SEGMENT_HEADER = struct.Struct("<8sddH")
+# monotonic timestamp, connection id, direction, payload length (payload follows)
+_RECORD_HEADER = struct.Struct("<dIBI")
+_RECORD_SIZE = _RECORD_HEADER.size
+_pack_header_into = _RECORD_HEADER.pack_into
+# Header plus payload packed by one pack_into call, per payload length
+_record_packers: Dict[int, Callable] = {}
+MAX_RECORD_PACKERS = 4096
+
+
+def _record_packer(length: int) -> Callable:
+    pack_into = struct.Struct(f"{_RECORD_HEADER.format}{length}s").pack_into
+    if len(_record_packers) < MAX_RECORD_PACKERS:
+        _record_packers[length] = pack_into
+    return pack_into
+
+
+DEFAULT_CAPTURE_DIR = "captures"
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+# Bytes handed to the writer thread and not yet written; beyond this new records are dropped and counted
+DEFAULT_MAX_PENDING = 64 * 1024 * 1024
+# Records are packed straight into buffers of this size, each written with one write() call
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+# A partly filled buffer is handed to the writer thread at the latest this long after its first record
+FLUSH_INTERVAL = 0.2
+
+
+class CaptureRecord(NamedTuple):
+    timestamp: float
+    conn_id: int
+    direction: int
+    data: bytes
+
+
+class CaptureWriter:
+    """
+    Raw traffic capture of one protocol server.
+
+    The event loop packs each record (header and raw bytes, one
+    pack_into call) into a preallocated buffer: no lock, system call or
+    queued object per record. A buffer is handed to a background thread
+    once full, or FLUSH_INTERVAL after its first record (timer on the
+    running loop), and written there with a single write() before it is
+    reused. A segment is closed and the
+    next one started once it exceeds `segment_size`; with `max_segments`
+    only the newest segments are kept.
+
+    Segment layout: header (magic, wall clock, monotonic clock, protocol
+    name) followed by records (monotonic timestamp, connection id,
+    direction, length, raw bytes). Read it back with iter_records().
+    """
+
+    def __init__(
+        self,
+        directory,
+        protocol: str,
+        port: int = 0,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_segments: int = 0,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self.directory = Path(directory)
+        self.protocol = protocol
+        self.port = port
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.max_pending = max_pending
+        self.buffer_size = buffer_size
+        self.segments: List[Path] = []
+        # Metrics
+        self.records = 0
+
+        self._conn_ids = itertools.count(1)
+        # Buffer being filled by the event loop; _limit is 0 while there is none
+        self._buf = bytearray()
+        self._used = 0
+        self._limit = 0
+        self._batch = 0             # hand-offs so far, tells the flush timer whether its buffer is gone
+        self._batch_records = 0     # self.records when the current buffer got its first record
+        # Lock-free hand-off: deque append/popleft are atomic, and every
+        # counter below is only ever written by one thread
+        self._full: Deque[Tuple[bytearray, int, int]] = deque()    # (buffer, used bytes, records)
+        self._free: Deque[bytearray] = deque(bytearray(buffer_size) for _ in range(2))
+        self._queued_bytes = 0      # event loop side: memory handed to the writer thread
+        self._taken_bytes = 0       # writer thread side: memory written and released
+        self._dropped = 0           # event loop side: over max_pending or closed
+        self._lost = 0              # writer thread side: failed writes
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._file = None
+        self._segment_bytes = 0
+        self._segment_index = 0
+        self._started = time.strftime("%Y%m%d-%H%M%S")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=f"capture-{protocol}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def dropped(self) -> int:
+        """Records not captured: over max_pending, writer closed or write failed."""
+        return self._dropped + self._lost
+
+    # ---------- event loop side ----------
+
+    def open_connection(self, peer: str) -> int:
+        """Allocate a connection id and record the connection opening."""
+        conn_id = next(self._conn_ids)
+        self.record(conn_id, CAPTURE_OPEN, peer.encode())
+        return conn_id
+
+    def close_connection(self, conn_id: int):
+        self.record(conn_id, CAPTURE_CLOSE, b"")
+
+    def record(self, conn_id: int, direction: int, data):
+        """Pack one record into the current buffer; never blocks on disk I/O or on the writer thread."""
+        length = len(data)
+        used = self._used
+        end = used + _RECORD_SIZE + length
+        if end > self._limit:
+            self._record_slow(conn_id, direction, data)
+            return
+        try:
+            pack_into = _record_packers[length]
+        except KeyError:
+            pack_into = _record_packer(length)
+        try:
+            pack_into(self._buf, used, monotonic(), conn_id, direction, length, data)
+        except struct.error:
+            # memoryview and other buffers: 's' only takes bytes and bytearray
+            pack_into(self._buf, used, monotonic(), conn_id, direction, length, bytes(data))
+        self._used = end
+        self.records += 1
+
+    def _record_slow(self, conn_id: int, direction: int, data):
+        """No buffer yet, buffer full, record larger than a buffer, or closed."""
+        if self._closed:
+            self._dropped += 1
+            return
+        self._hand_off()
+        size = _RECORD_SIZE + len(data)
+        if size > self.buffer_size:
+            # Oversized (photo frames with a small buffer_size): written on its own
+            if self._queued_bytes - self._taken_bytes + size > self.max_pending:
+                self._dropped += 1
+                return
+            chunk = bytearray(size)
+            _pack_header_into(chunk, 0, monotonic(), conn_id, direction, len(data))
+            chunk[_RECORD_SIZE:] = data
+            self.records += 1
+            self._queue(chunk, size, 1, size)
+            return
+        if not self._take_buffer():
+            self._dropped += 1
+            return
+        self.record(conn_id, direction, data)
+
+    def _take_buffer(self) -> bool:
+        """Make a free (or, within max_pending, a new) buffer current and arm its flush timer."""
+        if self._free:
+            self._buf = self._free.popleft()
+        elif self._queued_bytes - self._taken_bytes + self.buffer_size <= self.max_pending:
+            self._buf = bytearray(self.buffer_size)
+        else:
+            return False
+        self._used = 0
+        self._limit = self.buffer_size
+        self._batch_records = self.records
+        try:
+            asyncio.get_running_loop().call_later(FLUSH_INTERVAL, self._flush_batch, self._batch)
+        except RuntimeError:
+            pass    # no event loop: written once full, or on close()
+        return True
+
+    def _flush_batch(self, batch: int):
+        if batch == self._batch and not self._closed:
+            self._hand_off()
+
+    def _hand_off(self):
+        """Queue the current buffer for the writer thread."""
+        if self._limit == 0:
+            return
+        buf, used = self._buf, self._used
+        self._buf = bytearray()
+        self._used = self._limit = 0
+        self._batch += 1
+        if used:
+            self._queue(buf, used, self.records - self._batch_records, self.buffer_size)
+        else:
+            self._free.append(buf)
+
+    def _queue(self, buf: bytearray, used: int, records: int, cost: int):
+        self._queued_bytes += cost
+        self._full.append((buf, used, records))
+        self._wakeup.set()
+
+    def wrap(self, writer, conn_id: int) -> "CapturingWriter":
+        """Writer facade that records every reply of `conn_id` before it is written."""
+        return CapturingWriter(writer, self, conn_id)
+
+    def close(self):
+        """Write everything still pending and close the current segment."""
+        if self._closed:
+            return
+        self._hand_off()
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        logger.info(
+            f"({self.protocol}) Capture closed: {self.records} record(s) in {len(self.segments)} segment(s), "
+            f"{self.dropped} dropped"
+        )
+
+    # ---------- writer thread ----------
+
+    def _run(self):
+        full = self._full
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            closed = self._closed
+            while full:
+                self._write(*full.popleft())
+            if closed:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, buf: bytearray, used: int, records: int):
+        try:
+            if self._file is None or self._segment_bytes >= self.segment_size:
+                self._rotate()
+            with memoryview(buf) as view:
+                view = view[:used]
+                while view:
+                    view = view[self._file.write(view):]
+            self._segment_bytes += used
+        except OSError as e:
+            self._lost += records
+            logger.error(f"({self.protocol}) Capture write failed, {records} record(s) lost: {e}")
+        if len(buf) == self.buffer_size:
+            self._taken_bytes += self.buffer_size
+            self._free.append(buf)
+        else:
+            self._taken_bytes += used
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        path = self.directory / (
+            f"{self.protocol}_{self.port}_{os.getpid()}_{self._started}_{self._segment_index:04d}{SEGMENT_SUFFIX}"
+        )
+        self._segment_index += 1
+        name = self.protocol.encode()
+        self._file = open(path, "wb", buffering=0)
+        self._file.write(_SEGMENT_HEADER.pack(SEGMENT_MAGIC, time.time(), time.monotonic(), len(name)) + name)
+        self._segment_bytes = _SEGMENT_HEADER.size + len(name)
+        self.segments.append(path)
+        if self.max_segments and len(self.segments) > self.max_segments:
+            for old in self.segments[:-self.max_segments]:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+            del self.segments[:-self.max_segments]
+
+
+class CapturingWriter:
+    """StreamWriter/TransportWriter facade that records outgoing bytes."""
+
+    __slots__ = ("_writer", "_capture", "_conn_id", "drain", "is_closing")
+
+    def __init__(self, writer, capture: CaptureWriter, conn_id: int):
+        self._writer = writer
+        self._capture = capture
+        self._conn_id = conn_id
+        # Called for every read: bound once instead of going through __getattr__
+        self.drain = writer.drain
+        self.is_closing = writer.is_closing
+
+    def write(self, data: bytes):
+        self._capture.record(self._conn_id, CAPTURE_OUT, data)
+        self._writer.write(data)
+
+    def writelines(self, data):
+        # One record per write call: the bytes leave as one unit anyway
+        if not isinstance(data, list):
+            data = list(data)
+        self._capture.record(self._conn_id, CAPTURE_OUT, data[0] if len(data) == 1 else b"".join(data))
+        self._writer.writelines(data)
+
+    def __getattr__(self, name):
+        return getattr(self._writer, name)
+
+
+def create_capture_writer(protocol: str, port: int) -> Optional[CaptureWriter]:
+    """CaptureWriter configured by the 'capture' section, or None when capture is off."""
+    settings = get_capture_config()
+    if not settings.get("enabled"):
+        return None
+    writer = CaptureWriter(
+        settings.get("dir", DEFAULT_CAPTURE_DIR),
+        protocol,
+        port,
+        segment_size=int(settings.get("segment_size", DEFAULT_SEGMENT_SIZE)),
+        max_segments=int(settings.get("max_segments", 0)),
+    )
+    logger.info(f"({protocol}) Capturing raw traffic to {writer.directory}")
+    return writer
+
+
+# ---------- reading ----------
+
+def read_segment_header(buf) -> Tuple[str, float, float, int]:
+    """(protocol, wall clock, monotonic clock, offset of the first record) of a segment."""
+    if len(buf) < _SEGMENT_HEADER.size:
+        raise ValueError("Not a capture segment: file too short")
+    magic, wall, mono, name_len = _SEGMENT_HEADER.unpack_from(buf, 0)
+    if magic != SEGMENT_MAGIC:
+        raise ValueError("Not a capture segment: bad magic")
+    offset = _SEGMENT_HEADER.size + name_len
+    return bytes(buf[_SEGMENT_HEADER.size:offset]).decode(errors="replace"), wall, mono, offset
+
+
+def iter_records(path) -> Iterator[CaptureRecord]:
+    """
+    Records of one segment, read through mmap. A record cut short at the
+    end of the file (writer killed mid-batch) ends the iteration.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _, _, _, offset = read_segment_header(mm)
+            size = len(mm)
+            header_size = _RECORD_HEADER.size
+            unpack_from = _RECORD_HEADER.unpack_from
+            while offset + header_size <= size:
+                timestamp, conn_id, direction, length = unpack_from(mm, offset)
+                offset += header_size
+                if offset + length > size:
+                    break
+                yield CaptureRecord(timestamp, conn_id, direction, mm[offset:offset + length])
+                offset += length
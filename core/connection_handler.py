@@ -1,50 +1,150 @@
 import asyncio
+from typing import Optional
 from utils.tools import logger
-from utils.config_loader import get_port_by_key
+from utils.config_loader import get_port_by_key, get_transport_engine, get_reply_ordering, get_protocol_config
+from core.capture import CAPTURE_IN, CaptureWriter, create_capture_writer
+from core.session import ConnectionSession
+from core.buffered_transport import create_buffered_server
+from core.datagram_transport import create_datagram_endpoint
+
+TRANSPORT_ENGINES = ("streams", "buffered")
 
 class BaseProtocol:
+    # Initial framing buffer type for new sessions (str for text-framed protocols)
+    session_buffer = b""
+    # Frame terminator used by the buffered engine to hand over only complete frames
+    frame_delimiter: Optional[bytes] = None
+    # Protocol can also take one frame per UDP datagram on the same port ('udp: true' in its config)
+    supports_datagram = False
+    datagram_transport = None
+    # Raw traffic capture of this server ('capture.enabled' in config_signalling.yaml)
+    capture: Optional[CaptureWriter] = None
+
     def __init__(self, receiver):
         self.receiver = receiver
         self.port = get_port_by_key(receiver)
 
-    async def handle(self, reader, writer, client_ip, client_port, data: bytes):
+    @property
+    def receiver_name(self) -> str:
+        return getattr(self.receiver, "value", self.receiver)
+
+    def create_session(self, client_ip: str, client_port: int, writer=None) -> ConnectionSession:
+        """Create per-connection state. Override to attach protocol-specific decoder state."""
+        return ConnectionSession(
+            client_ip, client_port,
+            buffer=self.session_buffer,
+            writer=writer,
+            reply_ordering=get_reply_ordering(),
+        )
+
+    def close_session(self, session: ConnectionSession):
+        """Called once the socket is closed; drops everything the session holds."""
+        logger.debug(f"({self.receiver_name}) ({session.peer}) session closed: {session.summary()}")
+        session.close()
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes,
+                     session: ConnectionSession):
         """
         Default handler: just log incoming raw data.
         Child classes should override for custom parsing/masking/logging.
         """
-        logger.info(f"({self.receiver.value}) ({client_ip}) <<-- {data.decode(errors='replace').strip()}")
+        logger.info(f"({self.receiver_name}) ({client_ip}) <<-- {data.decode(errors='replace').strip()}")
+
+    async def handle_datagram(self, writer, client_ip, client_port, data: bytes,
+                              session: ConnectionSession):
+        """One UDP datagram. Default: treat it like a stream read."""
+        await self.handle(None, writer, client_ip, client_port, data, session=session)
+
+    @property
+    def datagram_enabled(self) -> bool:
+        return self.supports_datagram and bool(get_protocol_config(self.receiver).get("udp", False))
+
+    def shutdown(self):
+        """Server stopped: release what outlives single connections (capture, open media files)."""
+        if self.capture is not None:
+            self.capture.close()
 
     async def run(self):
-        logger.info(f"({self.receiver.value}) Starting server on port {self.port}")
+        logger.info(f"({self.receiver_name}) Starting server on port {self.port}")
         await start_server(self)
 
-async def start_server(protocol: BaseProtocol):
-    server = await asyncio.start_server(
-        lambda r, w: _handle_connection(protocol, r, w),
-        host="0.0.0.0",
-        port=protocol.port,
-    )
+async def create_server(protocol: BaseProtocol, engine: Optional[str] = None,
+                        reuse_port: bool = False) -> asyncio.AbstractServer:
+    """
+    Bind the protocol port and return the listening server without serving forever.
+    With reuse_port=True several worker processes can bind the same port (SO_REUSEPORT).
+    """
+    engine = engine or get_transport_engine()
+    if engine not in TRANSPORT_ENGINES:
+        raise ValueError(f"Unknown transport engine '{engine}'. Valid: {', '.join(TRANSPORT_ENGINES)}")
+    if protocol.capture is None:
+        protocol.capture = create_capture_writer(protocol.receiver_name, protocol.port)
+
+    if engine == "buffered":
+        server = await create_buffered_server(protocol, reuse_port=reuse_port)
+    else:
+        server = await asyncio.start_server(
+            lambda r, w: _handle_connection(protocol, r, w),
+            host="0.0.0.0",
+            port=protocol.port,
+            reuse_port=reuse_port or None,
+        )
     addr = server.sockets[0].getsockname()
-    logger.info(f"({protocol.receiver.value}) Serving on {addr}")
-    async with server:
-        await server.serve_forever()
+    logger.info(f"({protocol.receiver_name}) Serving on {addr} ({engine} engine)")
+
+    if protocol.datagram_enabled:
+        # Lives as long as the process; kept on the protocol so tests/tools can close it
+        protocol.datagram_transport = await create_datagram_endpoint(protocol, reuse_port=reuse_port)
+        logger.info(f"({protocol.receiver_name}) Serving UDP on {protocol.datagram_transport.get_extra_info('sockname')}")
+    return server
+
+async def start_server(protocol: BaseProtocol, engine: Optional[str] = None):
+    server = await create_server(protocol, engine)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        protocol.shutdown()
 
 async def _handle_connection(protocol: BaseProtocol, reader, writer):
     peername = writer.get_extra_info("peername")
     client_ip, client_port = peername[0], peername[1]
-    protocol_name = protocol.receiver.value.split(".")[-1]
+    protocol_name = protocol.receiver_name.split(".")[-1]
     logger.debug(f"({protocol_name}) ({client_ip}:{client_port}) connection opened")
 
+    capture = protocol.capture
+    if capture is not None:
+        conn_id = capture.open_connection(f"{client_ip}:{client_port}")
+        writer = capture.wrap(writer, conn_id)
+
+    session = protocol.create_session(client_ip, client_port, writer)
+    # Set unless the loop ends on a handler error with the peer still connected
+    peer_gone = True
     try:
         while not reader.at_eof():
             data = await reader.read(4096)
             if not data:
                 break
 
-            await protocol.handle(reader, writer, client_ip, client_port, data)
+            session.feed(len(data))
+            if capture is not None:
+                capture.record(conn_id, CAPTURE_IN, data)
+            await protocol.handle(reader, writer, client_ip, client_port, data, session=session)
+            # Replies to every frame in this read leave together
+            await session.flush()
     except Exception as e:
+        peer_gone = isinstance(e, ConnectionError)
         logger.error(f"({protocol_name}) Error while handling connection from {client_ip}:{client_port}: {e}")
     finally:
-        logger.info(f"({protocol_name}) Connection closed by {client_ip}:{client_port}")
-        writer.close()
-        await writer.wait_closed()
+        try:
+            await session.finish_replies(peer_gone)
+        finally:
+            logger.info(f"({protocol_name}) Connection closed by {client_ip}:{client_port}")
+            protocol.close_session(session)
+            if capture is not None:
+                capture.close_connection(conn_id)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from utils.tools import logger
+
+# Datagrams waiting for the handler; beyond this new datagrams are dropped (UDP semantics)
+DATAGRAM_QUEUE_SIZE = 4096
+# Per-peer sessions idle for longer than this are released
+DATAGRAM_SESSION_TTL = 300.0
+SWEEP_INTERVAL = 60.0
+
+
+class DatagramWriter:
+    """StreamWriter-like facade that sends every reply as its own datagram to one peer."""
+
+    def __init__(self, transport: asyncio.DatagramTransport, addr: Tuple[str, int]):
+        self.transport = transport
+        self.addr = addr
+
+    def write(self, data: bytes):
+        self.transport.sendto(data, self.addr)
+
+    def writelines(self, data):
+        for item in data:
+            self.transport.sendto(item, self.addr)
+
+    async def drain(self):
+        return
+
+    def is_closing(self) -> bool:
+        return self.transport.is_closing()
+
+    def get_extra_info(self, name, default=None):
+        if name == "peername":
+            return self.addr
+        return self.transport.get_extra_info(name, default)
+
+    def close(self):
+        # Datagram peers share the endpoint; closing one peer must not close the socket
+        return
+
+    async def wait_closed(self):
+        return
+
+
+class SessionDatagramProtocol(asyncio.DatagramProtocol):
+    """
+    UDP endpoint for a BaseProtocol: one datagram is one frame.
+
+    Each peer address gets a ConnectionSession (counters, reply scheduler)
+    like a TCP connection does. Datagrams are handled in arrival order by a
+    single consumer task, which takes everything queued at once and flushes
+    each peer's replies after the batch, like one TCP read.
+    """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.protocol_name = protocol.receiver_name.split(".")[-1]
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.sessions: Dict[Tuple[str, int], object] = {}
+        self._last_seen: Dict[Tuple[str, int], float] = {}
+        self._last_sweep = time.monotonic()
+        self._queue: asyncio.Queue = asyncio.Queue(DATAGRAM_QUEUE_SIZE)
+        self._consumer: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._consumer = asyncio.get_running_loop().create_task(self._consume())
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            self._queue.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.debug(f"({self.protocol_name}) UDP queue full, datagram from {addr[0]} dropped ({self.dropped})")
+
+    def error_received(self, exc):
+        logger.debug(f"({self.protocol_name}) UDP error: {exc!r}")
+
+    def connection_lost(self, exc):
+        if self._consumer is not None:
+            self._consumer.cancel()
+
+    def _session(self, addr: Tuple[str, int]):
+        session = self.sessions.get(addr)
+        if session is None:
+            session = self.protocol.create_session(addr[0], addr[1], DatagramWriter(self.transport, addr))
+            self.sessions[addr] = session
+        return session
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        for addr, seen in list(self._last_seen.items()):
+            session = self.sessions[addr]
+            if now - seen > DATAGRAM_SESSION_TTL and not len(session.replies):
+                del self._last_seen[addr]
+                del self.sessions[addr]
+                self.protocol.close_session(session)
+
+    async def _consume(self):
+        queue = self._queue
+        try:
+            while True:
+                batch = [await queue.get()]
+                # Everything already queued is handled before any reply is flushed
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                touched = {}
+                now = time.monotonic()
+                for data, addr in batch:
+                    session = self._session(addr)
+                    self._last_seen[addr] = now
+                    session.feed(len(data))
+                    touched[addr] = session
+                    try:
+                        await self.protocol.handle_datagram(session.writer, addr[0], addr[1], data, session=session)
+                    except Exception as e:
+                        logger.error(f"({self.protocol_name}) Error while handling datagram from {addr[0]}:{addr[1]}: {e}")
+                for session in touched.values():
+                    await session.flush()
+                if now - self._last_sweep > SWEEP_INTERVAL:
+                    self._sweep(now)
+        finally:
+            for session in self.sessions.values():
+                self.protocol.close_session(session)
+            self.sessions.clear()
+            self._last_seen.clear()
+
+
+async def create_datagram_endpoint(protocol, host: str = "0.0.0.0", port: Optional[int] = None,
+                                   reuse_port: bool = False) -> asyncio.DatagramTransport:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: SessionDatagramProtocol(protocol),
+        local_addr=(host, protocol.port if port is None else port),
+        reuse_port=reuse_port or None,
+    )
+    return transport
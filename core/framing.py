@@ -0,0 +1,111 @@
+from typing import List, Optional, Tuple
+
+from utils.tools import logger
+
+DEFAULT_MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+class BufferedFramer:
+    """
+    Incremental byte framer owned by one session.
+
+    Reads are appended to one bytearray; the search for the frame end resumes
+    where the previous read stopped (scan offset), and complete frames are
+    consumed by moving a start offset instead of re-slicing the buffer. The
+    consumed head is compacted away only once it outweighs the live tail, so
+    a large frame delivered in many small reads costs linear time.
+
+    A frame that grows past `max_frame_size` without a terminator is
+    discarded up to the next terminator and counted in `discarded`.
+
+    Subclasses with other framing rules override `_find_end`.
+    """
+
+    __slots__ = ("delimiter", "max_frame_size", "name", "discarded", "_buf", "_start", "_scan", "_discarding")
+
+    def __init__(self, delimiter: bytes, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE, name: str = ""):
+        self.delimiter = delimiter
+        self.max_frame_size = max_frame_size
+        self.name = name
+        self.discarded = 0
+        self._buf = bytearray()
+        self._start = 0
+        self._scan = 0
+        self._discarding = False
+
+    def __len__(self) -> int:
+        """Bytes buffered for the frame in progress."""
+        return len(self._buf) - self._start
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append one read and return every frame it completed (terminator included)."""
+        buf = self._buf
+        buf += data
+        frames: List[bytes] = []
+        with memoryview(buf) as view:
+            while True:
+                found = self._find_end(buf, self._scan)
+                if found is None:
+                    break
+                resume, end = found
+                if self._discarding:
+                    self._discarding = False
+                else:
+                    frame_start = self._frame_start(buf, self._start, end)
+                    if frame_start is not None:
+                        frames.append(bytes(view[frame_start:end]))
+                self._start = end
+                self._scan = resume
+        self._after_scan()
+        return frames
+
+    def pending(self) -> bytes:
+        return bytes(self._buf[self._start:])
+
+    def clear(self):
+        self._buf = bytearray()
+        self._start = self._scan = 0
+        self._discarding = False
+
+    # ---------- framing rules ----------
+
+    def _find_end(self, buf: bytearray, scan: int) -> Optional[Tuple[int, int]]:
+        """Return (next scan offset, frame end) for the next complete frame, or None."""
+        pos = buf.find(self.delimiter, scan)
+        if pos < 0:
+            return None
+        end = pos + len(self.delimiter)
+        return end, end
+
+    def _frame_start(self, buf: bytearray, start: int, end: int) -> Optional[int]:
+        """Offset where the frame between start and end begins (None to skip it)."""
+        return start
+
+    def _resume_offset(self, buf: bytearray) -> int:
+        # The terminator may straddle two reads: re-check its possible prefix only
+        return max(self._start, len(buf) - len(self.delimiter) + 1)
+
+    # ---------- buffer management ----------
+
+    def _after_scan(self):
+        buf = self._buf
+        self._scan = max(self._scan, self._resume_offset(buf))
+
+        if len(buf) - self._start > self.max_frame_size:
+            self.discarded += 1
+            logger.warning(
+                f"({self.name}) Frame exceeds {self.max_frame_size} bytes without terminator; "
+                f"discarding until the next one"
+            )
+            keep = self._scan
+            del buf[:keep]
+            self._start = self._scan = 0
+            self._discarding = True
+            return
+
+        # Compact when the consumed head outweighs what is still buffered
+        start = self._start
+        if start and start * 2 >= len(buf):
+            del buf[:start]
+            self._start = 0
+            self._scan -= start
@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import multiprocessing
+import resource
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import protocols as protocol_package
+from core.connection_handler import create_server
+from utils.constants import Receiver
+from utils.logger import logger, disable_queue_logging
+from utils.mode_manager import mode_manager
+from utils.registry_tools import get_protocol_handler, list_protocols
+from utils.stdin_listener import host_stdin_listener
+
+
+def available_receivers() -> List[Receiver]:
+    """
+    Import every protocols/<name>/handler.py, which registers its protocol in
+    utils.registry_tools, and return the Receiver members that have a handler.
+    """
+    for root in protocol_package.__path__:
+        for handler in sorted(Path(root).glob("*/handler.py")):
+            importlib.import_module(f"{protocol_package.__name__}.{handler.parent.name}.handler")
+    registered = set(list_protocols())
+    return [receiver for receiver in Receiver if receiver in registered]
+
+
+def resolve_receivers(names: Iterable[str]) -> List[Receiver]:
+    """Map CLI names ('sia-dcs', 'SIA_DCS', 'masxml', 'all') to registered Receiver members."""
+    available = available_receivers()
+    valid = ", ".join(r.value for r in available)
+    receivers: List[Receiver] = []
+    for name in names:
+        key = name.strip().upper().replace("-", "_")
+        if key == "ALL":
+            return available
+        try:
+            receiver = Receiver(key)
+        except ValueError:
+            raise ValueError(f"Unknown protocol '{name}'. Valid: {valid}") from None
+        if receiver not in available:
+            raise ValueError(f"Protocol '{name}' has no emulator. Valid: {valid}")
+        if receiver not in receivers:
+            receivers.append(receiver)
+    return receivers
+
+
+def load_protocols(receivers: Iterable[Receiver]) -> list:
+    """Instantiate the registered protocols of `receivers`."""
+    available_receivers()
+    return [get_protocol_handler(receiver)() for receiver in receivers]
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def run_host(receivers: Iterable[Receiver], started_at: Optional[float] = None):
+    """
+    Run several protocol emulators on one event loop with one shared
+    logger, config and stdin control plane.
+    """
+    started_at = started_at if started_at is not None else time.perf_counter()
+    protocols = load_protocols(receivers)
+
+    servers = [await create_server(protocol) for protocol in protocols]
+    names = ", ".join(f"{p.receiver_name}:{p.port}" for p in protocols)
+    logger.info(
+        f"[HOST] {len(servers)} receiver(s) ready in {time.perf_counter() - started_at:.3f}s, "
+        f"max RSS {_max_rss_mb():.1f} MB ({names})"
+    )
+
+    targets = {p.receiver_name: getattr(p, "mode_switcher", None) for p in protocols}
+    try:
+        await asyncio.gather(
+            *(server.serve_forever() for server in servers),
+            host_stdin_listener(targets),
+        )
+    finally:
+        for protocol in protocols:
+            protocol.shutdown()
+
+
+def run_workers(receivers: Iterable[Receiver], workers: int, started_at: Optional[float] = None):
+    """
+    Fork `workers` processes that each bind every protocol port with SO_REUSEPORT.
+
+    Emulation modes are moved into shared memory before the fork, so the
+    parent's control plane drives all workers and mode counters (nak N,
+    drop N, time ... N) are consumed once across the whole pool.
+    """
+    started_at = started_at if started_at is not None else time.perf_counter()
+    receivers = list(receivers)
+    ctx = multiprocessing.get_context("fork")
+    for receiver in receivers:
+        mode_manager.share(receiver.value, ctx)
+    protocols = load_protocols(receivers)
+
+    procs = []
+    for index in range(workers):
+        proc = ctx.Process(target=_worker_main, args=(protocols, index), name=f"cms-worker-{index}", daemon=True)
+        proc.start()
+        procs.append(proc)
+
+    # Terminate the pool on SIGTERM as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    logger.info(
+        f"[HOST] {workers} worker(s) forked in {time.perf_counter() - started_at:.3f}s, "
+        f"parent max RSS {_max_rss_mb():.1f} MB, pids: {', '.join(str(p.pid) for p in procs)}"
+    )
+    try:
+        asyncio.run(_control_plane(protocols, procs))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join(timeout=5)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _worker_main(protocols: list, index: int):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        asyncio.run(_serve_worker(protocols, index))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Forked workers skip atexit: write out pending captures, drop open media and drain the log queue here
+        for protocol in protocols:
+            protocol.shutdown()
+        disable_queue_logging(logger)
+
+
+async def _serve_worker(protocols: list, index: int):
+    servers = [await create_server(protocol, reuse_port=True) for protocol in protocols]
+    logger.info(f"[HOST] worker {index} ready (max RSS {_max_rss_mb():.1f} MB)")
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+
+async def _control_plane(protocols: list, procs: list):
+    targets = {p.receiver_name: getattr(p, "mode_switcher", None) for p in protocols}
+    listener = asyncio.create_task(host_stdin_listener(targets))
+    try:
+        while any(proc.is_alive() for proc in procs):
+            await asyncio.sleep(1)
+        logger.error("[HOST] All workers exited")
+    finally:
+        listener.cancel()
@@ -0,0 +1,288 @@
+import asyncio
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Tuple, Union
+
+from core.capture import (
+    CAPTURE_CLOSE,
+    CAPTURE_IN,
+    CAPTURE_OPEN,
+    CAPTURE_OUT,
+    SEGMENT_SUFFIX,
+    iter_records,
+    read_segment_header,
+)
+from utils.tools import logger
+
+# Seconds without reply bytes after the last send before a connection is given up
+DEFAULT_REPLY_TIMEOUT = 2.0
+READ_SIZE = 64 * 1024
+
+# Reply fields that differ on every run, masked in recorded and live replies before comparing
+REPLY_NORMALIZERS: Dict[str, List[Tuple[Pattern, bytes]]] = {
+    # Receiver timestamp "_HH:MM:SS,MM-DD-YYYY" and the CRC that covers it (CRC + 0LLL + '"ACK"')
+    "SIA_DCS": [
+        (re.compile(rb"_\d\d:\d\d:\d\d,\d\d-\d\d-\d{4}"), b"_??:??:??,??-??-????"),
+        (re.compile(rb'[0-9A-F]{4}(?=[0-9A-F]{4}"\*?[A-Z]+")'), b"????"),
+    ],
+    # Random RawNo issued in every ACK, random Index of a NAK
+    "MANITOU": [
+        (re.compile(rb"<RawNo>[^<]*</RawNo>"), b"<RawNo>?</RawNo>"),
+        (re.compile(rb'Index="[^"]*"'), b'Index="?"'),
+    ],
+}
+
+
+def normalize_replies(protocol: Optional[str], data: bytes) -> bytes:
+    """Reply bytes with the per-run fields of `protocol` masked."""
+    for pattern, mask in REPLY_NORMALIZERS.get(protocol or "", ()):
+        data = pattern.sub(mask, data)
+    return data
+
+
+class RecordedConnection:
+    """
+    One client connection as captured: when it opened and closed, the
+    inbound chunks with their wall-clock times, and the replies sent.
+    """
+
+    __slots__ = ("conn_id", "protocol", "peer", "opened_at", "closed_at", "inbound", "replies")
+
+    def __init__(self, conn_id: str, protocol: str, opened_at: float):
+        self.conn_id = conn_id
+        self.protocol = protocol
+        self.peer = "?"
+        self.opened_at = opened_at
+        self.closed_at: Optional[float] = None
+        self.inbound: List[Tuple[float, bytes]] = []
+        self.replies: List[bytes] = []
+
+    @property
+    def expected(self) -> bytes:
+        return b"".join(self.replies)
+
+
+class ReplayResult:
+    """
+    Outcome of replaying one recorded connection. Replies are compared
+    after normalize_replies() unless `exact` is set.
+    """
+
+    __slots__ = ("recorded", "exact", "sent", "received", "error")
+
+    def __init__(self, recorded: RecordedConnection, exact: bool = False):
+        self.recorded = recorded
+        self.exact = exact
+        self.sent = 0
+        self.received = bytearray()
+        self.error: Optional[str] = None
+
+    def compared(self) -> Tuple[bytes, bytes]:
+        """(recorded, live) replies as compared."""
+        expected, received = self.recorded.expected, bytes(self.received)
+        if self.exact:
+            return expected, received
+        protocol = self.recorded.protocol
+        return normalize_replies(protocol, expected), normalize_replies(protocol, received)
+
+    @property
+    def matched(self) -> bool:
+        if self.error is not None:
+            return False
+        expected, received = self.compared()
+        return expected == received
+
+    def mismatch_offset(self) -> Optional[int]:
+        """Offset of the first byte where the compared replies differ."""
+        expected, received = self.compared()
+        for offset, (a, b) in enumerate(zip(expected, received)):
+            if a != b:
+                return offset
+        if len(expected) != len(received):
+            return min(len(expected), len(received))
+        return None
+
+
+class ReplayReport:
+    __slots__ = ("results", "elapsed", "speed")
+
+    def __init__(self, results: List[ReplayResult], elapsed: float, speed: float):
+        self.results = results
+        self.elapsed = elapsed
+        self.speed = speed
+
+    @property
+    def matched(self) -> int:
+        return sum(r.matched for r in self.results)
+
+    @property
+    def ok(self) -> bool:
+        return self.matched == len(self.results)
+
+    def summary(self) -> str:
+        chunks = sum(len(r.recorded.inbound) for r in self.results)
+        sent = sum(r.sent for r in self.results)
+        speed = "as fast as possible" if self.speed <= 0 else f"speed {self.speed:g}x"
+        return (
+            f"{len(self.results)} connection(s), {chunks} chunk(s), {sent} bytes sent in {self.elapsed:.3f}s "
+            f"({speed}): {self.matched} matched, {len(self.results) - self.matched} mismatched"
+        )
+
+
+def _segment_paths(paths: Iterable) -> List[Path]:
+    """Expand directories to their segments, in file name (= writer, then rotation) order."""
+    segments: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            segments.extend(sorted(path.glob(f"*{SEGMENT_SUFFIX}")))
+        else:
+            segments.append(path)
+    return segments
+
+
+def load_capture(paths: Iterable) -> Tuple[List[str], List[RecordedConnection]]:
+    """
+    Group the records of capture segments (files or directories) by
+    connection. Connection ids are only unique per capture writer, so they
+    are qualified with the segment name minus its rotation index.
+    Timestamps are converted to wall clock through each segment header,
+    which also gives each connection its protocol.
+
+    Returns the protocol names found, in order of first segment, and the
+    connections in order of opening.
+    """
+    protocols: List[str] = []
+    connections: Dict[Tuple[str, int], RecordedConnection] = {}
+    for path in _segment_paths(paths):
+        with open(path, "rb") as f:
+            name, wall, mono, _ = read_segment_header(f.read(4096))
+        if name not in protocols:
+            protocols.append(name)
+        run = path.stem.rsplit("_", 1)[0]
+        for record in iter_records(path):
+            at = wall + (record.timestamp - mono)
+            key = (run, record.conn_id)
+            conn = connections.get(key)
+            if conn is None:
+                conn = connections[key] = RecordedConnection(f"{run}#{record.conn_id}", name, at)
+            if record.direction == CAPTURE_IN:
+                conn.inbound.append((at, record.data))
+            elif record.direction == CAPTURE_OUT:
+                conn.replies.append(record.data)
+            elif record.direction == CAPTURE_OPEN:
+                conn.peer = record.data.decode(errors="replace")
+                conn.opened_at = at
+            elif record.direction == CAPTURE_CLOSE:
+                conn.closed_at = at
+    return protocols, sorted(connections.values(), key=lambda c: c.opened_at)
+
+
+async def replay(
+    connections: List[RecordedConnection],
+    host: str,
+    port: Union[int, Mapping[str, int]],
+    speed: float = 1.0,
+    reply_timeout: float = DEFAULT_REPLY_TIMEOUT,
+    exact: bool = False,
+) -> ReplayReport:
+    """
+    Replay recorded connections against a running emulator, one TCP
+    connection each, all concurrently. `port` is either one port for every
+    connection or a mapping of protocol name to port, so a capture of
+    several receivers goes to each receiver's own port.
+
+    Connections open and inbound chunks are sent at their original offsets
+    from the first recorded connection divided by `speed` (0 = no pauses).
+    Replies are read throughout; once everything is sent, a connection
+    waits for as many reply bytes as were recorded (or `reply_timeout`
+    seconds of silence, or EOF) and is closed. Replies are compared with
+    per-run fields (SIA timestamps, Manitou RawNo) masked, or byte for
+    byte with `exact`.
+    """
+    loop = asyncio.get_running_loop()
+    origin = min((c.opened_at for c in connections), default=0.0)
+    started = loop.time()
+
+    def at(timestamp: float) -> Optional[float]:
+        return None if speed <= 0 else started + (timestamp - origin) / speed
+
+    def port_of(recorded: RecordedConnection) -> int:
+        return port if isinstance(port, int) else port[recorded.protocol]
+
+    results = [ReplayResult(c, exact) for c in connections]
+    began = time.perf_counter()
+    await asyncio.gather(*(_replay_connection(r, host, port_of(r.recorded), at, reply_timeout) for r in results))
+    return ReplayReport(results, time.perf_counter() - began, speed)
+
+
+async def _sleep_until(deadline: Optional[float]):
+    if deadline is not None:
+        delay = deadline - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _replay_connection(result: ReplayResult, host: str, port: int, at, reply_timeout: float):
+    recorded = result.recorded
+    await _sleep_until(at(recorded.opened_at))
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        result.error = f"connect failed: {e}"
+        return
+
+    progress = asyncio.Event()
+
+    async def collect():
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                break
+            result.received += chunk
+            progress.set()
+        progress.set()
+
+    collector = asyncio.create_task(collect())
+    try:
+        for timestamp, data in recorded.inbound:
+            await _sleep_until(at(timestamp))
+            writer.write(data)
+            await writer.drain()
+            result.sent += len(data)
+
+        expected = sum(map(len, recorded.replies))
+        while len(result.received) < expected and not collector.done():
+            progress.clear()
+            try:
+                await asyncio.wait_for(progress.wait(), reply_timeout)
+            except asyncio.TimeoutError:
+                break
+    except (ConnectionError, OSError) as e:
+        result.error = f"connection lost: {e}"
+    finally:
+        collector.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def log_report(report: ReplayReport, limit: int = 32):
+    """Log the summary and, for mismatched connections, where the replies diverge."""
+    logger.info(f"[REPLAY] {report.summary()}")
+    for result in report.results:
+        if result.matched:
+            continue
+        recorded = result.recorded
+        if result.error is not None:
+            logger.warning(f"[REPLAY] {recorded.conn_id} ({recorded.peer}): {result.error}")
+            continue
+        offset = result.mismatch_offset()
+        expected, received = result.compared()
+        logger.warning(
+            f"[REPLAY] {recorded.conn_id} ({recorded.peer}): replies differ at byte {offset} "
+            f"(recorded {len(expected)}, live {len(received)}): "
+            f"expected {expected[offset:offset + limit]!r}, got {received[offset:offset + limit]!r}"
+        )
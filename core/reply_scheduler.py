@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import itertools
+from typing import List, Optional, Tuple
+
+REPLY_ORDERINGS = ("preserve", "ready")
+
+
+class ReplyScheduler:
+    """
+    Per-connection timer heap for delayed replies (DELAY mode).
+
+    Replies are written from a loop timer instead of sleeping in the read
+    loop, so a panel that pipelines N events waits `delay` once, not N times.
+
+    Immediate replies are collected in an outbox and written together by
+    flush(), which the connection handler calls once per read: one
+    writelines/drain per read instead of one per frame.
+
+    Ordering:
+      - "preserve": replies leave in the order they were scheduled; an
+        immediate reply queues behind pending delayed ones.
+      - "ready": every reply is written as soon as its own delay expires.
+    """
+
+    def __init__(self, writer, ordering: str = "preserve"):
+        if ordering not in REPLY_ORDERINGS:
+            raise ValueError(f"Unknown reply ordering '{ordering}'. Valid: {', '.join(REPLY_ORDERINGS)}")
+        self.writer = writer
+        self.ordering = ordering
+        self._outbox: List[bytes] = []
+        self._heap: List[Tuple[float, int, bytes]] = []
+        self._seq = itertools.count()
+        self._last_due = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def send(self, data: bytes, delay: float = 0.0):
+        """Queue for the next flush(), or write after `delay` seconds without blocking the caller."""
+        if delay <= 0 and not (self.ordering == "preserve" and self._heap):
+            self._outbox.append(data)
+            return
+
+        loop = asyncio.get_running_loop()
+        due = loop.time() + max(delay, 0.0)
+        if self.ordering == "preserve":
+            due = max(due, self._last_due)
+            self._last_due = due
+        heapq.heappush(self._heap, (due, next(self._seq), data))
+        self._idle.clear()
+        if self._timer is None or self._timer.when() > due:
+            self._arm(loop)
+
+    def flush(self) -> int:
+        """Write every queued immediate reply in one writelines() call; returns the count."""
+        outbox = self._outbox
+        if not outbox:
+            return 0
+        self._outbox = []
+        if not self.writer.is_closing():
+            self.writer.writelines(outbox)
+        return len(outbox)
+
+    async def wait_idle(self, timeout: Optional[float] = None):
+        """Wait until every scheduled reply has been written (or timeout)."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._outbox.clear()
+        self._heap.clear()
+        self._idle.set()
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(self._heap[0][0], self._fire, loop)
+
+    def _fire(self, loop: asyncio.AbstractEventLoop):
+        self._timer = None
+        # Replies queued before this timer fired go first to keep frame order
+        self.flush()
+        now = loop.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        if due and not self.writer.is_closing():
+            self.writer.writelines(due)
+        if self._heap:
+            self._arm(loop)
+        else:
+            self._idle.set()
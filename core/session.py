@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, Optional, Union
+
+from core.reply_scheduler import ReplyScheduler
+
+# Longest wait for delayed replies when a connection ends while the peer is still there
+REPLY_LINGER_TIMEOUT = 5.0
+
+
+class ConnectionSession:
+    """
+    Per-connection state created by the connection handler for every accepted socket.
+
+    Owns the framing buffer, traffic counters and any protocol decoder state,
+    so frames from different panels never share a buffer. The session is
+    dropped together with the socket.
+    """
+
+    __slots__ = (
+        "client_ip",
+        "client_port",
+        "buffer",
+        "state",
+        "writer",
+        "replies",
+        "opened_at",
+        "bytes_in",
+        "reads",
+        "frames_in",
+        "replies_out",
+    )
+
+    def __init__(self, client_ip: str, client_port: int, buffer: Union[str, bytes] = b"",
+                 writer=None, reply_ordering: str = "preserve"):
+        self.client_ip = client_ip
+        self.client_port = client_port
+        self.buffer = buffer
+        # Free-form decoder state owned by the protocol (e.g. parser objects)
+        self.state: Dict[str, Any] = {}
+
+        self.writer = writer
+        self.replies: Optional[ReplyScheduler] = (
+            ReplyScheduler(writer, reply_ordering) if writer is not None else None
+        )
+
+        self.opened_at = time.monotonic()
+        self.bytes_in = 0
+        self.reads = 0
+        self.frames_in = 0
+        self.replies_out = 0
+
+    @property
+    def peer(self) -> str:
+        return f"{self.client_ip}:{self.client_port}"
+
+    def feed(self, nbytes: int):
+        """Account one raw read of `nbytes` from the socket."""
+        self.reads += 1
+        self.bytes_in += nbytes
+
+    def send(self, data: bytes, delay: float = 0.0):
+        """Queue a reply: written on the next flush(), or from a timer after `delay` seconds (DELAY mode)."""
+        self.replies_out += 1
+        self.replies.send(data, delay)
+
+    async def flush(self):
+        """Write all replies produced by the current read with one writelines() and one drain()."""
+        if self.replies is not None and self.replies.flush():
+            await self.writer.drain()
+
+    async def finish_replies(self, peer_gone: bool, timeout: float = REPLY_LINGER_TIMEOUT):
+        """
+        Connection is ending: write queued replies and give delayed ones (DELAY
+        mode) up to `timeout` seconds. When the peer has disconnected nobody
+        would read them, so pending replies are dropped instead.
+        """
+        if self.replies is None:
+            return
+        if peer_gone or self.writer.is_closing():
+            self.replies.cancel()
+            return
+        self.replies.flush()
+        await self.replies.wait_idle(timeout)
+
+    def summary(self) -> str:
+        duration = time.monotonic() - self.opened_at
+        return (
+            f"reads={self.reads} bytes_in={self.bytes_in} frames_in={self.frames_in} "
+            f"replies_out={self.replies_out} duration={duration:.1f}s"
+        )
+
+    def close(self):
+        """Release buffered data, decoder state and pending timers."""
+        self.buffer = self.buffer[:0]
+        self.state.clear()
+        if self.replies is not None:
+            self.replies.cancel()
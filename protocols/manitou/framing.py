@@ -0,0 +1,67 @@
+from typing import List, Optional
+
+from core.framing import BufferedFramer, DEFAULT_MAX_FRAME_SIZE
+
+STX = b"\x02"
+ETX = b"\x03"
+
+
+class StxEtxFramer(BufferedFramer):
+    """
+    Manitou framing: a frame ends at ETX and starts at the first STX before it.
+
+    Bytes between the previous ETX and the STX (line noise, keep-alive
+    newlines) are skipped; a frame without STX is passed on as is, the
+    parser strips STX/ETX either way.
+
+    `feed` is specialised for the one-byte terminator: a read without ETX
+    costs one append and one find, which keeps byte-at-a-time delivery cheap.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE, name: str = ""):
+        super().__init__(ETX, max_frame_size=max_frame_size, name=name)
+
+    def feed(self, data: bytes) -> List[bytes]:
+        buf = self._buf
+        buf += data
+        # Everything before this read has been scanned already (one-byte terminator)
+        end = buf.find(ETX, len(buf) - len(data))
+        if end < 0:
+            if len(buf) - self._start > self.max_frame_size:
+                self._scan = len(buf)
+                self._after_scan()
+            return []
+
+        # Locate every frame first, then copy the completed region out once
+        spans = []
+        start = first = self._start
+        find = buf.find
+        while end >= 0:
+            end += 1
+            if self._discarding:
+                self._discarding = False
+                first = end
+            else:
+                stx_pos = find(STX, start, end)
+                spans.append((stx_pos if stx_pos >= 0 else start, end))
+            start = end
+            end = find(ETX, start)
+
+        frames: List[bytes] = []
+        if spans:
+            with memoryview(buf) as view:
+                block = bytes(view[first:start])
+            if len(spans) == 1:
+                frames.append(block[spans[0][0] - first:])
+            else:
+                frames = [block[a - first:b - first] for a, b in spans]
+        self._start = start
+        self._scan = len(buf)
+        self._after_scan()
+        return frames
+
+    def _frame_start(self, buf: bytearray, start: int, end: int) -> Optional[int]:
+        stx_pos = buf.find(STX, start, end)
+        return stx_pos if stx_pos >= 0 else start
@@ -1,27 +1,28 @@
 import asyncio
 import logging
-import re
+from functools import partial
 from typing import Dict
 
 from core.connection_handler import BaseProtocol
 from utils.constants import Receiver
 from utils.mode_manager import mode_manager, EmulationMode
 from utils.stdin_listener import stdin_listener
-from utils.logger import logger
+from utils.logger import logger, log_traffic, TRAFFIC_IN, TRAFFIC_OUT
 from utils.registry_tools import register_protocol
 from utils.media_logger import save_base64_media
+from utils.media_assembler import MediaAssembler, DEFAULT_ASSEMBLY_TTL
+from utils.tools import LRUDict
+from utils.config_loader import get_protocol_config
+from core.framing import DEFAULT_MAX_FRAME_SIZE
 
-from .parser import (
-    strip_stx_etx,
-    sanitize_for_log,
-    parse_manitou_message,
-    is_binary_payload,
-    is_ping,
-    extract_heartbeat_passkey,
-)
+from .framing import StxEtxFramer
+from .parser import ManitouFrame
 from .responses import convert_ack, convert_nak
 from .mode_switcher import ManitouModeSwitcher
 
+# Signals whose RawNo is remembered for tagging the photos that follow
+RAWNO_CACHE_SIZE = 1024
+
 
 @register_protocol(Receiver.MANITOU)
 class ManitouProtocol(BaseProtocol):
@@ -32,14 +33,24 @@ class ManitouProtocol(BaseProtocol):
       - Everything else (PING/EVENT/LINK/UNKNOWN): full incoming XML in INFO.
     """
 
+    frame_delimiter = b"\x03"
+
     def __init__(self):
         super().__init__(receiver=Receiver.MANITOU)
         self.protocol_mode = mode_manager.get(self.receiver.value)
         self.mode_switcher = ManitouModeSwitcher(self.protocol_mode)
-        self._recv_buffer: bytes = b""
+        settings = get_protocol_config(self.receiver)
+        # Bytes without ETX beyond this are dropped as garbage instead of buffered
+        self.max_frame_size = settings.get("max_frame_size", DEFAULT_MAX_FRAME_SIZE)
 
         # RawNo issued in our last ACK for a Signal; used to tag Binary -> event code
-        self._rawno_eventcode: Dict[str, str] = {}
+        self._rawno_eventcode: Dict[str, str] = LRUDict(RAWNO_CACHE_SIZE)
+        # Binary frames of one RawNo are streamed into one image, complete at Length bytes
+        self._image_assembler = MediaAssembler(
+            self.receiver.value,
+            self.port,
+            ttl=settings.get("photo_ttl", DEFAULT_ASSEMBLY_TTL),
+        )
 
     async def run(self):
         await asyncio.gather(
@@ -47,74 +58,85 @@ class ManitouProtocol(BaseProtocol):
             stdin_listener(self.receiver.value, self.mode_switcher),
         )
 
-    async def handle(self, reader, writer, client_ip, client_port, data):
-        """Consume raw TCP chunks, split by ETX, and process complete XML frames."""
-        chunk = data.encode() if isinstance(data, str) else data
-        self._recv_buffer += chunk
-
-        while True:
-            etx_pos = self._recv_buffer.find(b"\x03")
-            if etx_pos < 0:
-                break
+    def create_session(self, client_ip, client_port, writer=None):
+        session = super().create_session(client_ip, client_port, writer)
+        session.state["framer"] = StxEtxFramer(max_frame_size=self.max_frame_size, name=self.receiver.value)
+        return session
 
-            frame = self._recv_buffer[: etx_pos + 1]
-            self._recv_buffer = self._recv_buffer[etx_pos + 1 :]
+    def close_session(self, session):
+        super().close_session(session)
+        # Abandon images whose remaining frames never arrived
+        self._image_assembler.sweep()
 
-            stx_pos = frame.find(b"\x02")
-            frame = frame[stx_pos:] if stx_pos >= 0 else b"\x02" + frame
+    def shutdown(self):
+        super().shutdown()
+        self._image_assembler.close()
 
-            await self._handle_frame(frame, writer, client_ip)
+    async def handle(self, reader, writer, client_ip, client_port, data, session):
+        """Consume raw TCP chunks, split by ETX, and process complete XML frames."""
+        chunk = data.encode() if isinstance(data, str) else data
+        for frame in session.state["framer"].feed(chunk):
+            session.frames_in += 1
+            await self._handle_frame(frame, session, client_ip)
 
     # ---------- core ----------
 
-    async def _handle_frame(self, frame: bytes, writer, client_ip: str):
-        xml_text = strip_stx_etx(frame)
-        safe_text = sanitize_for_log(frame)
+    async def _handle_frame(self, frame: bytes, session, client_ip: str):
+        writer = session.writer
+        msg = ManitouFrame(frame)
 
         # logging: фото — компакт, інше — повний XML
-        is_bin = is_binary_payload(xml_text)
-        label, meta = self._label_incoming(xml_text)
-        if is_bin:
-            logger.info(f"({self.receiver.value}) ({client_ip}) <<-- [{label}] {meta}")
-            logger.debug(f"RAW XML: {safe_text}")
+        proto = self.receiver.value
+        if msg.is_binary:
+            log_traffic(TRAFFIC_IN, proto, client_ip, lambda: msg.label[0], lambda: msg.label[1])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"RAW XML: {msg.sanitized}")
         else:
-            logger.info(f"({self.receiver.value}) ({client_ip}) <<-- [{label}] {safe_text}")
+            log_traffic(TRAFFIC_IN, proto, client_ip, lambda: msg.label[0], lambda: msg.sanitized)
 
         mode = self.protocol_mode.mode
         if mode == EmulationMode.NO_RESPONSE:
             return
 
-        if is_ping(xml_text):
-            await self._reply_ping(writer, client_ip)
+        if msg.is_ping:
+            await self._reply_ping(session, client_ip)
             return
 
         if mode == EmulationMode.ONLY_PING:
             return
 
         if mode == EmulationMode.DROP_N:
-            if self.protocol_mode.drop_count > 0:
-                self.protocol_mode.drop_count -= 1
+            if self.protocol_mode.take_drop():
                 logger.info(f"({self.receiver.value}) Dropped message (remaining: {self.protocol_mode.drop_count})")
                 return
             else:
                 self.protocol_mode.set_mode(EmulationMode.ACK)
 
+        # DELAY mode: reply from a timer, keep reading and parsing meanwhile
+        reply_delay = 0
         if mode == EmulationMode.DELAY_N:
-            await asyncio.sleep(self.protocol_mode.delay_seconds)
+            reply_delay = self.protocol_mode.delay_seconds
+            logger.info(f"({self.receiver.value}) Delaying response by {reply_delay}s")
 
-        msg = parse_manitou_message(frame)
+        # Unknown frames are silently ignored in NAK mode
+        if msg.kind not in ("signal", "binary") and mode == EmulationMode.NAK:
+            return
+
+        # Claim the reply mode atomically (shared across worker processes)
+        reply_mode = self.protocol_mode.claim_packet()
 
         # --- SIGNAL ---
-        if msg.get("type") == "signal":
+        if msg.kind == "signal":
             event_code = msg.get("event_code")
-            if mode == EmulationMode.NAK:
+            if reply_mode == EmulationMode.NAK:
                 # Explicit Nak with Index+Code, then drop connection
-                nak_code = getattr(self.protocol_mode, "nak_result_code", 10)
+                nak_code = self.protocol_mode.nak_result_code or 10
                 nak, idx = convert_nak(code=nak_code, return_index=True)
-                writer.write(nak)
-                logger.info(f"({self.receiver.value}) ({client_ip}) -->> [NAK {event_code}] Index={idx} Code={nak_code} {nak!r}")
-                await writer.drain()
-                self.protocol_mode.consume_packet()
+                session.send(nak)
+                log_traffic(TRAFFIC_OUT, proto, client_ip, f"NAK {event_code}", lambda: f"Index={idx} Code={nak_code} {nak!r}")
+                # Flush pending replies (delayed ones get REPLY_LINGER_TIMEOUT) before the hard close
+                await session.finish_replies(peer_gone=False)
+                await session.flush()
                 # hard close to satisfy test "Connection dropped"
                 try:
                     writer.close()
@@ -127,21 +149,20 @@ class ManitouProtocol(BaseProtocol):
             ack, rawno = convert_ack(return_rawno=True)
             if event_code and rawno:
                 self._rawno_eventcode[rawno] = event_code
-            writer.write(ack)
-            logger.info(f"({self.receiver.value}) ({client_ip}) -->> [ACK {event_code or 'EVENT'}] {ack!r}")
-            await writer.drain()
-            self.protocol_mode.consume_packet()
+            session.send(ack, reply_delay)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, f"ACK {event_code or 'EVENT'}", partial(repr, ack))
             return
 
         # --- BINARY ---
-        if msg.get("type") == "binary":
-            if mode == EmulationMode.NAK:
-                nak_code = getattr(self.protocol_mode, "nak_result_code", 10)
+        if msg.kind == "binary":
+            if reply_mode == EmulationMode.NAK:
+                nak_code = self.protocol_mode.nak_result_code or 10
                 nak, idx = convert_nak(code=nak_code, return_index=True)
-                writer.write(nak)
-                logger.info(f"({self.receiver.value}) ({client_ip}) -->> [NAK BINARY] Index={idx} Code={nak_code} {nak!r}")
-                await writer.drain()
-                self.protocol_mode.consume_packet()
+                session.send(nak)
+                log_traffic(TRAFFIC_OUT, proto, client_ip, "NAK BINARY", lambda: f"Index={idx} Code={nak_code} {nak!r}")
+                # Flush pending replies (delayed ones get REPLY_LINGER_TIMEOUT) before the hard close
+                await session.finish_replies(peer_gone=False)
+                await session.flush()
                 try:
                     writer.close()
                     await writer.wait_closed()
@@ -149,74 +170,60 @@ class ManitouProtocol(BaseProtocol):
                     logger.info(f"({self.receiver.value}) Connection closed by emulator (NAK policy).")
                 return
 
-            # Normal: save each frame and ACK
-            m = re.search(r"<Data\b[^>]*>(.*?)</Data>", xml_text, flags=re.DOTALL | re.IGNORECASE)
-            if m:
-                b64 = "".join(m.group(1).split())
-                rawno = msg.get("rawno") or "-"
-                frame_no = msg.get("frame_no") or "0"
-                event_code = self._rawno_eventcode.get(rawno)
-                try:
-                    path = save_base64_media(
-                        b64,
-                        protocol=self.receiver.value,
-                        port=self.port,
-                        sequence=frame_no,
-                        event_code=event_code,
-                    )
-                    logger.info(f"[MANITOU PHOTO SAVED] RawNo={rawno} Frame={frame_no} Path={path}")
-                except Exception as e:
-                    logger.error(f"[MANITOU PHOTO SAVE ERROR] RawNo={rawno} Frame={frame_no} err={e}")
+            # Normal: stream the frame into its image and ACK
+            b64 = msg.data
+            if b64 is not None:
+                self._save_binary_frame(msg, b64)
 
             ack = convert_ack()
-            writer.write(ack)
-            logger.info(f"({self.receiver.value}) ({client_ip}) -->> [ACK BINARY] {ack!r}")
-            await writer.drain()
-            self.protocol_mode.consume_packet()
+            session.send(ack, reply_delay)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, "ACK BINARY", partial(repr, ack))
             return
 
         # --- UNKNOWN ---
-        if mode != EmulationMode.NAK:
-            ack = convert_ack()
-            writer.write(ack)
-            logger.info(f"({self.receiver.value}) ({client_ip}) -->> [ACK UNKNOWN] {ack!r}")
-            await writer.drain()
-            self.protocol_mode.consume_packet()
-
-    async def _reply_ping(self, writer, client_ip: str):
+        ack = convert_ack()
+        session.send(ack, reply_delay)
+        log_traffic(TRAFFIC_OUT, proto, client_ip, "ACK UNKNOWN", partial(repr, ack))
+
+    def _save_binary_frame(self, msg: ManitouFrame, b64: str):
+        rawno = msg.get("rawno") or "-"
+        frame_no = msg.get("frame_no") or "0"
+        length = msg.get("length")
+        event_code = self._rawno_eventcode.get(rawno)
+        ext = (msg.get("ext") or "jpg").lstrip(".").lower()
+        try:
+            if not (length and length.isdigit() and frame_no.isdigit()):
+                # No image size to assemble against: the frame is saved on its own
+                path = save_base64_media(
+                    b64,
+                    protocol=self.receiver.value,
+                    port=self.port,
+                    sequence=frame_no,
+                    event_code=event_code,
+                    ext=ext,
+                )
+            else:
+                path = self._image_assembler.add(
+                    rawno,
+                    int(frame_no),
+                    b64.encode(),
+                    total_size=int(length),
+                    sequence=rawno,
+                    event_code=event_code,
+                    ext=ext,
+                )
+            if path is not None:
+                logger.info(f"[MANITOU PHOTO SAVED] RawNo={rawno} Frame={frame_no} Path={path}")
+        except Exception as e:
+            logger.error(f"[MANITOU PHOTO SAVE ERROR] RawNo={rawno} Frame={frame_no} err={e}")
+
+    async def _reply_ping(self, session, client_ip: str):
         """Always ACK heartbeat/ping except in NO_RESPONSE mode. Log Passkey if present."""
         if self.protocol_mode.mode == EmulationMode.NO_RESPONSE:
             return
         ack = convert_ack()
-        writer.write(ack)
-        logger.info(f"({self.receiver.value}) ({client_ip}) -->> [ACK PING] {ack!r}")
-        await writer.drain()
+        session.send(ack)
+        log_traffic(TRAFFIC_OUT, self.receiver.value, client_ip, "ACK PING", partial(repr, ack))
 
     def _label_incoming(self, xml: str) -> tuple[str, str]:
-        # PING(+Passkey)
-        if is_ping(xml):
-            pk = extract_heartbeat_passkey(xml)
-            return ("PING AUTH" if pk else "PING", f"Passkey={pk}" if pk else "")
-
-        # Binary / Signal / Fallback як у твоїй версії ...
-        m_bin = re.search(r"<Binary\b([^>]*)>", xml, flags=re.IGNORECASE)
-        if m_bin:
-            attrs = m_bin.group(1)
-            ext = _attr(attrs, "Ext") or "-"
-            rawno = _attr(attrs, "RawNo") or "-"
-            frame_no = _attr(attrs, "FrameNo") or _attr(attrs, "Frame") or "-"
-            length = _attr(attrs, "Length") or "-"
-            return "PHOTO " + ext, f"RawNo={rawno} Frame={frame_no} Len={length}"
-
-        m_sig = re.search(r"<Signal\b([^>]*)>(.*?)</Signal>", xml, flags=re.DOTALL | re.IGNORECASE)
-        if m_sig:
-            attrs, _ = m_sig.group(1), m_sig.group(2)
-            code = _attr(attrs, "Event") or "UNKNOWN"
-            return f"EVENT {code}", ""
-
-        return "UNKNOWN", ""
-
-
-def _attr(attrs: str, name: str) -> str | None:
-    m = re.search(rf'\b{name}="([^"]+)"', attrs, flags=re.IGNORECASE)
-    return m.group(1) if m else None
+        return ManitouFrame(xml).label
@@ -1,9 +1,21 @@
 import re
-from typing import Dict, Optional, Union
+from typing import Dict, Optional, Tuple, Union
 
 STX = "\x02"
 ETX = "\x03"
 
+_BINARY_OPEN = re.compile(r"<Binary\b([^>]*)>", flags=re.IGNORECASE)
+_SIGNAL = re.compile(r"<Signal\b([^>]*)>(.*?)</Signal>", flags=re.IGNORECASE | re.DOTALL)
+_DATA_OPEN = re.compile(r"<Data\b([^>]*)>", flags=re.IGNORECASE)
+_DATA_CLOSE = re.compile(r"</Data>", flags=re.IGNORECASE)
+_DATA_ELEMENT = re.compile(r"(<Data\b[^>]*>)(.*?)(</Data>)", flags=re.DOTALL | re.IGNORECASE)
+_PING = re.compile(r"<\s*(heartbeat|ping)\b", flags=re.IGNORECASE)
+_PING_TYPE = re.compile(r"<\s*MessageType\s*>\s*HEARTBEAT\s*</\s*MessageType\s*>", flags=re.IGNORECASE)
+_PASSKEY = re.compile(r'<Heartbeat\b[^>]*\bPasskey="([^"]+)"', flags=re.IGNORECASE)
+_LENGTH_ATTR = re.compile(r'Length="(\d+)"', flags=re.IGNORECASE)
+
+_UNSET = object()
+
 
 def strip_stx_etx(data: Union[str, bytes]) -> str:
     """Remove leading STX and trailing ETX; return pure XML string."""
@@ -17,26 +29,219 @@ def strip_stx_etx(data: Union[str, bytes]) -> str:
     return s
 
 
+class ManitouFrame:
+    """
+    One Manitou frame, decoded and stripped of STX/ETX once.
+
+    The heartbeat passkey is read at parse time (binary frames never carry
+    one). Everything else (kind, attributes, <Data> span, sanitized log
+    text, labels) is computed on first access and cached, so a binary photo
+    frame is scanned for its <Data> body a single time however many times
+    the handler asks about it. Instances are read-only.
+    """
+
+    __slots__ = (
+        "text",
+        "passkey",
+        "_is_ping",
+        "_binary_attrs",
+        "_signal",
+        "_fields",
+        "_data_span",
+        "_sanitized",
+    )
+
+    def __init__(self, data: Union[str, bytes]):
+        set_slot = object.__setattr__
+        text = strip_stx_etx(data)
+        set_slot(self, "text", text)
+        # Passkey from <Heartbeat Passkey="..."/> if present
+        match = None if "<Binary" in text else _PASSKEY.search(text)
+        set_slot(self, "passkey", match.group(1) if match else None)
+        for name in self.__slots__[2:]:
+            set_slot(self, name, _UNSET)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ManitouFrame is immutable")
+
+    def _cache(self, name: str, value):
+        object.__setattr__(self, name, value)
+        return value
+
+    # ---------- kind ----------
+
+    @property
+    def is_ping(self) -> bool:
+        """<Heartbeat/>, <Ping/> or <MessageType>HEARTBEAT</MessageType> (case-insensitive)."""
+        if self._is_ping is _UNSET:
+            text = self.text
+            span = self.data_span if self.is_binary else None
+            if span is None:
+                found = _PING.search(text) or _PING_TYPE.search(text)
+            else:
+                # Markup only: the base64 body cannot contain a tag
+                found = any(
+                    pattern.search(text, start, end)
+                    for pattern in (_PING, _PING_TYPE)
+                    for start, end in ((0, span[1]), (span[2], len(text)))
+                )
+            return self._cache("_is_ping", bool(found))
+        return self._is_ping
+
+    @property
+    def is_binary(self) -> bool:
+        return "<Binary" in self.text
+
+    @property
+    def binary_attrs(self) -> Optional[str]:
+        """Attribute string of the <Binary ...> tag, None for other frames."""
+        if self._binary_attrs is _UNSET:
+            if not self.is_binary:
+                return self._cache("_binary_attrs", None)
+            match = _BINARY_OPEN.search(self.text)
+            return self._cache("_binary_attrs", match.group(1) if match else "")
+        return self._binary_attrs
+
+    @property
+    def signal(self) -> Optional[Tuple[str, str]]:
+        """(attributes, inner XML) of <Signal ...>...</Signal>, None if absent."""
+        if self._signal is _UNSET:
+            match = None if self.is_binary else _SIGNAL.search(self.text)
+            return self._cache("_signal", match.groups() if match else None)
+        return self._signal
+
+    @property
+    def kind(self) -> str:
+        """'binary' | 'signal' | 'unknown' (a heartbeat is 'unknown'; see is_ping)."""
+        if self.is_binary:
+            return "binary"
+        if self.signal is not None:
+            return "signal"
+        return "unknown"
+
+    # ---------- fields ----------
+
+    @property
+    def fields(self) -> Dict[str, Optional[str]]:
+        """Typed fields as returned by parse_manitou_message (without raw_text)."""
+        if self._fields is _UNSET:
+            kind = self.kind
+            if kind == "binary":
+                attrs = self.binary_attrs
+                span = self.data_span
+                data_open = _DATA_OPEN.match(self.text, span[0]) if span else _DATA_OPEN.search(self.text)
+                fields = {
+                    "type": "binary",
+                    "ext": _extract_attr(attrs, "Ext"),
+                    "rawno": _extract_attr(attrs, "RawNo"),
+                    "frame_no": _extract_attr(attrs, "FrameNo") or _extract_attr(attrs, "Frame"),
+                    "length": _extract_attr(attrs, "Length"),
+                    "data_len": _extract_attr(data_open.group(1), "Length") if data_open else None,
+                }
+            elif kind == "signal":
+                attrs, inner = self.signal
+                fields = {
+                    "type": "signal",
+                    "evtype": _extract_attr(attrs, "EvType"),
+                    "event_code": _extract_attr(attrs, "Event"),  # ← attribute, not inner tag
+                    "area": _extract_inner(inner, "Area"),
+                    "area_info": _extract_inner(inner, "AreaInfo"),
+                    "zone": _extract_inner(inner, "Zone"),
+                    "point_id": _extract_inner(inner, "PointID"),
+                    "url": _extract_inner(inner, "URL"),
+                }
+            else:
+                fields = {"type": "unknown"}
+            return self._cache("_fields", fields)
+        return self._fields
+
+    def get(self, key: str, default=None):
+        return self.fields.get(key, default)
+
+    # ---------- <Data> body ----------
+
+    @property
+    def data_span(self) -> Optional[Tuple[int, int, int, int]]:
+        """(open tag start, body start, body end, close tag end) of the first <Data> element."""
+        if self._data_span is _UNSET:
+            span = None
+            text = self.text
+            data_open = _DATA_OPEN.search(text)
+            if data_open:
+                data_close = _DATA_CLOSE.search(text, data_open.end())
+                if data_close:
+                    span = (data_open.start(), data_open.end(), data_close.start(), data_close.end())
+            return self._cache("_data_span", span)
+        return self._data_span
+
+    @property
+    def data(self) -> Optional[str]:
+        """Base64 body of <Data> with whitespace removed, None if there is none."""
+        span = self.data_span
+        if span is None:
+            return None
+        return "".join(self.text[span[1]:span[2]].split())
+
+    @property
+    def sanitized(self) -> str:
+        """Frame text with every <Data> body replaced by a length marker (safe for logs)."""
+        if self._sanitized is _UNSET:
+            text = self.text
+            span = self.data_span
+            if span is None:
+                return self._cache("_sanitized", text)
+            open_tag = text[span[0]:span[1]]
+            tail = text[span[3]:]
+            if "<" in tail:
+                tail = _DATA_ELEMENT.sub(_redact, tail)
+            return self._cache("_sanitized", text[:span[0]] + _redact_tag(open_tag) + tail)
+        return self._sanitized
+
+    # ---------- logging ----------
+
+    @property
+    def label(self) -> Tuple[str, str]:
+        """(label, meta) for the incoming log line."""
+        if self.is_ping:
+            pk = self.passkey
+            return ("PING AUTH" if pk else "PING", f"Passkey={pk}" if pk else "")
+
+        if self.is_binary and _BINARY_OPEN.search(self.text):
+            attrs = self.binary_attrs
+            ext = _extract_attr(attrs, "Ext") or "-"
+            rawno = _extract_attr(attrs, "RawNo") or "-"
+            frame_no = _extract_attr(attrs, "FrameNo") or _extract_attr(attrs, "Frame") or "-"
+            length = _extract_attr(attrs, "Length") or "-"
+            return "PHOTO " + ext, f"RawNo={rawno} Frame={frame_no} Len={length}"
+
+        signal = self.signal
+        if signal is not None:
+            code = _extract_attr(signal[0], "Event") or "UNKNOWN"
+            return f"EVENT {code}", ""
+
+        return "UNKNOWN", ""
+
+
+def _redact_tag(open_tag: str) -> str:
+    length_attr = _LENGTH_ATTR.search(open_tag)
+    length_val = length_attr.group(1) if length_attr else "?"
+    return f"{open_tag}[BINARY REDACTED len={length_val}]</Data>"
+
+
+def _redact(m: re.Match) -> str:
+    return _redact_tag(m.group(1))
+
+
 def sanitize_for_log(data: Union[str, bytes]) -> str:
     """
     Redact <Data>...</Data> body from Binary packets for safe logging.
     Keeps attributes (Ext, Length, RawNo, FrameNo, Data Length), replaces body with marker.
     """
-    s = strip_stx_etx(data)
-
-    def _repl(m: re.Match) -> str:
-        open_tag = m.group(1)
-        length_attr = re.search(r'Length="(\d+)"', open_tag, flags=re.IGNORECASE)
-        length_val = length_attr.group(1) if length_attr else "?"
-        return f"{open_tag}[BINARY REDACTED len={length_val}]</Data>"
-
-    s = re.sub(r"(<Data\b[^>]*>)(.*?)(</Data>)", _repl, s, flags=re.DOTALL | re.IGNORECASE)
-    return s
+    return ManitouFrame(data).sanitized
 
 
 def is_binary_payload(message: Union[str, bytes]) -> bool:
-    s = strip_stx_etx(message)
-    return "<Binary" in s
+    return ManitouFrame(message).is_binary
 
 
 def is_ping(message: Union[str, bytes]) -> bool:
@@ -45,12 +250,7 @@ def is_ping(message: Union[str, bytes]) -> bool:
     Typical frames:
       <Heartbeat/>   OR   <Ping/>   OR   <MessageType>HEARTBEAT</MessageType>
     """
-    s = strip_stx_etx(message)
-    if re.search(r"<\s*(heartbeat|ping)\b", s, flags=re.IGNORECASE):
-        return True
-    if re.search(r"<\s*MessageType\s*>\s*HEARTBEAT\s*</\s*MessageType\s*>", s, flags=re.IGNORECASE):
-        return True
-    return False
+    return ManitouFrame(message).is_ping
 
 
 def parse_manitou_message(data: Union[str, bytes]) -> Dict[str, Optional[str]]:
@@ -65,56 +265,10 @@ def parse_manitou_message(data: Union[str, bytes]) -> Dict[str, Optional[str]]:
       # binary:
       rawno, ext, frame_no (str), length (str), data_len (str)
     """
-    xml = strip_stx_etx(data)
-
-    # Binary
-    if "<Binary" in xml:
-        bin_open = re.search(r"<Binary\b([^>]*)>", xml, flags=re.IGNORECASE)
-        attrs = bin_open.group(1) if bin_open else ""
-        ext = _extract_attr(attrs, "Ext")
-        rawno = _extract_attr(attrs, "RawNo")
-        frame_no = _extract_attr(attrs, "FrameNo") or _extract_attr(attrs, "Frame")
-        length = _extract_attr(attrs, "Length")
-
-        data_open = re.search(r"<Data\b([^>]*)>", xml, flags=re.IGNORECASE)
-        data_len = _extract_attr(data_open.group(1), "Length") if data_open else None
-
-        return {
-            "type": "binary",
-            "raw_text": sanitize_for_log(xml),
-            "ext": ext,
-            "rawno": rawno,
-            "frame_no": frame_no,
-            "length": length,
-            "data_len": data_len,
-        }
-
-    # Signal
-    sig = re.search(r"<Signal\b([^>]*)>(.*?)</Signal>", xml, flags=re.IGNORECASE | re.DOTALL)
-    if sig:
-        sig_attrs = sig.group(1)
-        inner = sig.group(2)
-        evtype = _extract_attr(sig_attrs, "EvType")
-        event = _extract_attr(sig_attrs, "Event")  # ← attribute, not inner tag
-        area = _extract_inner(inner, "Area")
-        area_info = _extract_inner(inner, "AreaInfo")
-        zone = _extract_inner(inner, "Zone")
-        point_id = _extract_inner(inner, "PointID")
-        url = _extract_inner(inner, "URL")
-
-        return {
-            "type": "signal",
-            "raw_text": sanitize_for_log(xml),
-            "evtype": evtype,
-            "event_code": event,
-            "area": area,
-            "area_info": area_info,
-            "zone": zone,
-            "point_id": point_id,
-            "url": url,
-        }
-
-    return {"type": "unknown", "raw_text": sanitize_for_log(xml)}
+    frame = data if isinstance(data, ManitouFrame) else ManitouFrame(data)
+    fields = dict(frame.fields)
+    fields["raw_text"] = frame.sanitized
+    return fields
 
 
 def _extract_attr(attrs: str, name: str) -> Optional[str]:
@@ -128,6 +282,4 @@ def _extract_inner(blob: str, tag: str) -> Optional[str]:
 
 def extract_heartbeat_passkey(message: Union[str, bytes]) -> Optional[str]:
     """Return Passkey from <Heartbeat Passkey="..."/> if present."""
-    s = strip_stx_etx(message)
-    m = re.search(r'<Heartbeat\b[^>]*\bPasskey="([^"]+)"', s, flags=re.IGNORECASE)
-    return m.group(1) if m else None
\ No newline at end of file
+    return ManitouFrame(message).passkey
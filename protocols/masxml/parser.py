@@ -1,2 +1,179 @@
+import re
+from typing import Dict, Optional, Tuple
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+_PACKET_DATA_OPEN = b"<PacketData>"
+_PACKET_DATA_CLOSE = b"</PacketData>"
+_SEQUENCE_FALLBACK = re.compile(rb"<MessageSequenceNo>(\d+)</MessageSequenceNo>")
+
+
 def is_ping(message: str) -> bool:
     return '"NULL"' in message or "<MessageType>HEARTBEAT</MessageType>" in message
+
+
+class MasxmlPayload:
+    """<Payload> block of a (possibly multipart) photo; PacketData stays in the raw frame as a span."""
+
+    __slots__ = ("payload_id", "packet_number", "file_name", "last_file")
+
+    def __init__(self):
+        self.payload_id: Optional[str] = None
+        self.packet_number: Optional[str] = None
+        self.file_name: Optional[str] = None
+        self.last_file = False
+
+    @property
+    def index(self) -> int:
+        """Chunk order: leading number of FileName ('3_x.jpg'), else PacketNumber, else 0."""
+        if self.file_name:
+            match = re.match(r"^(\d+)_", self.file_name)
+            if match:
+                return int(match.group(1))
+        if self.packet_number and self.packet_number.isdigit():
+            return int(self.packet_number)
+        return 0
+
+
+class MasxmlMessage:
+    """
+    One <XMLMessageClass> frame parsed once with XMLPullParser.
+
+    The base64 <PacketData> body is not fed to the XML parser: its byte span
+    in `raw` is located once and exposed via `packet_data`, so multi-megabyte
+    photos are neither tokenized nor copied into element text.
+    """
+
+    __slots__ = (
+        "raw",
+        "message_type",
+        "sequence",
+        "fields",
+        "payload",
+        "data_span",
+        "error",
+    )
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self.message_type: Optional[str] = None
+        self.sequence: Optional[str] = None
+        # <KeyValuePair><Key>..</Key><Value>..</Value></KeyValuePair> in arrival order
+        self.fields: Dict[str, str] = {}
+        self.payload: Optional[MasxmlPayload] = None
+        self.data_span: Optional[Tuple[int, int]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def event_code(self) -> Optional[str]:
+        return self.fields.get("EventCode")
+
+    @property
+    def is_ping(self) -> bool:
+        return self.message_type == "HEARTBEAT"
+
+    @property
+    def packet_data(self) -> Optional[bytes]:
+        if self.data_span is None:
+            return None
+        start, end = self.data_span
+        return self.raw[start:end]
+
+    @property
+    def label(self) -> str:
+        """PING, PHOTO/LINK/EVENT <EventCode or MessageType>, UNKNOWN."""
+        if self.is_ping:
+            return "PING"
+        if not self.message_type:
+            return "UNKNOWN"
+        typ = self.event_code or self.message_type
+        if self.data_span is not None:
+            return f"PHOTO {typ}"
+        if "URL" in self.fields:
+            return f"LINK {typ}"
+        return f"EVENT {typ}"
+
+    def response_label(self, result_code: int) -> str:
+        if self.event_code:
+            code_label = f"EVENT {self.event_code}"
+        elif self.is_ping:
+            code_label = "PING"
+        else:
+            code_label = ""
+        return f"{'ACK' if result_code == 0 else 'NAK'} {code_label}".strip()
+
+    def display_text(self, placeholder: str = "PHOTO BASE64") -> str:
+        """Frame text for the log with the PacketData body replaced by its length."""
+        raw = self.raw
+        if self.data_span is None:
+            return raw.decode(errors="replace").strip()
+        start, end = self.data_span
+        return (
+            raw[:start].decode(errors="replace")
+            + f"[{placeholder}, len={end - start}]"
+            + raw[end:].decode(errors="replace")
+        ).strip()
+
+
+def parse_masxml_frame(frame: bytes) -> MasxmlMessage:
+    """Parse one complete frame (up to and including </XMLMessageClass>)."""
+    # Skip anything before the XML declaration / root (e.g. newline left by the previous frame)
+    begin = frame.find(b"<")
+    raw = frame[begin:] if begin > 0 else frame
+    msg = MasxmlMessage(raw)
+
+    data_open = raw.find(_PACKET_DATA_OPEN)
+    if data_open >= 0:
+        data_start = data_open + len(_PACKET_DATA_OPEN)
+        data_end = raw.find(_PACKET_DATA_CLOSE, data_start)
+        if data_end >= 0:
+            msg.data_span = (data_start, data_end)
+
+    parser = XMLPullParser(events=("start", "end"))
+    try:
+        if msg.data_span is None:
+            parser.feed(raw)
+        else:
+            parser.feed(raw[:msg.data_span[0]])
+            parser.feed(raw[msg.data_span[1]:])
+        _collect(parser, msg)
+        parser.close()
+    except ParseError as e:
+        msg.error = str(e)
+        if msg.sequence is None:
+            match = _SEQUENCE_FALLBACK.search(raw)
+            msg.sequence = match.group(1).decode() if match else None
+    return msg
+
+
+def _collect(parser: XMLPullParser, msg: MasxmlMessage):
+    key: Optional[str] = None
+    for event, elem in parser.read_events():
+        tag = elem.tag
+        if event == "start":
+            if tag == "Payload":
+                msg.payload = MasxmlPayload()
+            continue
+
+        if tag == "MessageSequenceNo":
+            # Digits only, as the <MessageSequenceNo>(\d+)< regex accepted: anything else is echoed as "0000"
+            sequence = elem.text or ""
+            msg.sequence = sequence if sequence.isdecimal() else None
+            continue
+
+        text = (elem.text or "").strip()
+        if tag == "MessageType":
+            msg.message_type = text
+        elif tag == "Key":
+            key = text
+        elif tag == "Value" and key is not None:
+            msg.fields[key] = text
+            key = None
+        elif msg.payload is not None:
+            if tag == "PayloadID":
+                msg.payload.payload_id = text
+            elif tag == "PacketNumber":
+                msg.payload.packet_number = text
+            elif tag == "FileName":
+                msg.payload.file_name = text
+            elif tag == "LastFile":
+                msg.payload.last_file = text.lower() == "true"
@@ -1,45 +1,60 @@
 from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom import minidom
-from typing import Union
+from typing import Optional, Union
+
+# Pre-rendered AckNakClass, byte-for-byte what minidom.toprettyxml(indent="    ") produced, then encoded
+_REPLY_HEAD = b'<?xml version="1.0" ?>\n<AckNakClass>\n'
+_REPLY_TAIL = b"</AckNakClass>\n"
+_ACK_TEMPLATE = _REPLY_HEAD + b"%b    <ResultCode>0</ResultCode>\n    <ResultText>ok</ResultText>\n" + _REPLY_TAIL
+
+# minidom text escaping (after the XML parser has normalized CR / CRLF to LF)
+_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", '"': "&quot;", ">": "&gt;"})
 
 
 def _prettify_xml(elem) -> str:
-    """Returns a pretty-printed XML string for the Element."""
+    """Returns a pretty-printed XML string for the Element (reference for the templates below)."""
     rough_string = tostring(elem, encoding="utf-8")
     reparsed = minidom.parseString(rough_string)
     return reparsed.toprettyxml(indent="    ")
 
 
-def convert_masxml_ack(data: Union[str, bytes]) -> str:
-    if isinstance(data, bytes):
-        data = data.decode()
+def _escape(text: str) -> str:
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.translate(_ESCAPE_TABLE)
+
 
-    seq_no = _extract_sequence_no(data)
+def _element(tag: bytes, text: str) -> bytes:
+    if not text:
+        return b"    <%b/>\n" % tag
+    return b"    <%b>%b</%b>\n" % (tag, _escape(text).encode(), tag)
 
-    root = Element("AckNakClass")
-    SubElement(root, "MessageSequenceNo").text = seq_no
-    SubElement(root, "ResultCode").text = "0"
-    SubElement(root, "ResultText").text = "ok"
 
-    return _prettify_xml(root)
+def convert_masxml_ack(data: Union[str, bytes] = "", sequence: Optional[str] = None) -> bytes:
+    if isinstance(data, bytes):
+        data = data.decode()
+
+    seq_no = sequence or _extract_sequence_no(data)
+    return _ACK_TEMPLATE % _element(b"MessageSequenceNo", seq_no)
 
 
 def convert_masxml_nak(
-    data: Union[str, bytes],
+    data: Union[str, bytes] = "",
     text: str = "Poorly formed XML",
     code: Union[int, str] = 10,
-) -> str:
+    sequence: Optional[str] = None,
+) -> bytes:
     if isinstance(data, bytes):
         data = data.decode()
 
-    seq_no = _extract_sequence_no(data)
-
-    root = Element("AckNakClass")
-    SubElement(root, "MessageSequenceNo").text = seq_no
-    SubElement(root, "ResultCode").text = str(code)
-    SubElement(root, "ResultText").text = text
-
-    return _prettify_xml(root)
+    seq_no = sequence or _extract_sequence_no(data)
+    return b"".join((
+        _REPLY_HEAD,
+        _element(b"MessageSequenceNo", seq_no),
+        _element(b"ResultCode", str(code)),
+        _element(b"ResultText", text),
+        _REPLY_TAIL,
+    ))
 
 
 def _extract_sequence_no(xml_string: str) -> str:
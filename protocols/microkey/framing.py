@@ -0,0 +1,42 @@
+import re
+from typing import Optional, Tuple
+
+from core.framing import BufferedFramer, DEFAULT_MAX_FRAME_SIZE
+
+SIGNALS_OPEN = b"<Signals"
+SIGNALS_CLOSE = b"</Signals>"
+# Frame end: </Signals><Checksum>XXXX</Checksum> (whitespace allowed before <Checksum>)
+_FRAME_END_RE = re.compile(rb"</Signals>\s*<Checksum>[0-9A-Fa-f]{4}</Checksum>")
+
+
+class MicrokeyFramer(BufferedFramer):
+    """
+    Incremental Micro Key splitter: <Signals ...>...</Signals><Checksum>XXXX</Checksum>.
+
+    The end pattern is searched for in newly arrived bytes only: a read
+    without a complete tail resumes at the last </Signals> (its checksum may
+    still be on the way) or just before the end of the buffer. Bytes before
+    the first <Signals of a frame are skipped, as the regex splitter did.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE, name: str = ""):
+        super().__init__(SIGNALS_CLOSE, max_frame_size=max_frame_size, name=name)
+
+    def _find_end(self, buf: bytearray, scan: int) -> Optional[Tuple[int, int]]:
+        match = _FRAME_END_RE.search(buf, scan)
+        if match is None:
+            return None
+        return match.end(), match.end()
+
+    def _frame_start(self, buf: bytearray, start: int, end: int) -> Optional[int]:
+        pos = buf.find(SIGNALS_OPEN, start, end)
+        return pos if pos >= 0 else None
+
+    def _resume_offset(self, buf: bytearray) -> int:
+        # An incomplete tail can only follow the last </Signals> of the unscanned bytes
+        close = buf.rfind(SIGNALS_CLOSE, max(self._start, self._scan))
+        if close >= 0:
+            return close
+        return max(self._start, len(buf) - len(SIGNALS_CLOSE) + 1)
@@ -1,6 +1,7 @@
 import asyncio
 import re
 import logging
+from functools import partial
 from core.connection_handler import BaseProtocol
 from utils.constants import Receiver
 from utils.mode_manager import mode_manager, EmulationMode
@@ -8,22 +9,43 @@ from utils.stdin_listener import stdin_listener
 from .parser import (
     parse_microkey_sequence,
     is_ping_microkey,
-    build_labels_for_message,
+    build_labels,
+    build_reply_label,
     extract_signals,
-    classify_signals,       
-    split_complete_frames,
-    shrink_media_for_log,   
+    classify_signals,
+    shrink_media_for_log,
+    _to_text,
+    check_microkey_checksum,
 )
+from .framing import MicrokeyFramer
 from .responses import generate_ack, generate_nak
-from utils.logger import logger
+from utils.logger import logger, log_traffic, TRAFFIC_IN, TRAFFIC_OUT
 from utils.registry_tools import register_protocol
+from utils.config_loader import get_protocol_config
+from core.framing import DEFAULT_MAX_FRAME_SIZE
+
+# microkey.checksum values
+CHECKSUM_MODES = ("FIXED", "ARC")
+
 
 @register_protocol(Receiver.MICROKEY)
 class MicrokeyProtocol(BaseProtocol):
+    frame_delimiter = b"</Checksum>"
+
     def __init__(self):
         super().__init__(receiver=Receiver.MICROKEY)
         self.protocol_mode = mode_manager.get(self.receiver.value)
-        self._buffers: dict[str, str] = {}
+        settings = get_protocol_config(self.receiver)
+        # Bytes buffered without a complete </Signals><Checksum> tail before they are dropped
+        self.max_frame_size = settings.get("max_frame_size", DEFAULT_MAX_FRAME_SIZE)
+        # <Checksum>: "fixed" sends the constants panels accept today (ACK 4FE9, NAK 0000);
+        # "ARC" computes and verifies CRC-16/ARC, which is not yet confirmed against real receivers
+        checksum = str(settings.get("checksum", "fixed")).upper()
+        if checksum not in CHECKSUM_MODES:
+            raise ValueError(f"Unknown microkey.checksum '{checksum}'. Valid: {', '.join(CHECKSUM_MODES)}")
+        self.compute_checksum = checksum == "ARC"
+        self.validate_checksum = self.compute_checksum and settings.get("validate_checksum", True)
+        self.nak_on_bad_checksum = settings.get("nak_on_bad_checksum", False)
 
     async def run(self):
         await asyncio.gather(
@@ -31,137 +53,124 @@ class MicrokeyProtocol(BaseProtocol):
             stdin_listener(self.receiver.value),
         )
 
-    async def handle(self, reader, writer, client_ip, client_port, data: bytes):
-        # --- Decode incoming bytes to text once ---
-        if isinstance(data, bytes):
-            try:
-                chunk = data.decode("utf-8")
-            except UnicodeDecodeError:
-                chunk = data.decode("cp1252", errors="replace")
-        else:
-            chunk = data
+    def _ack(self, sequence: str) -> bytes:
+        return generate_ack(sequence, compute=self.compute_checksum)
 
-        # Accumulate buffer per connection
-        key = f"{client_ip}:{client_port}"
-        buf = self._buffers.get(key, "") + chunk
+    def _nak(self, sequence: str, error: str = "Checksum error") -> bytes:
+        return generate_nak(sequence, error, compute=self.compute_checksum)
 
-        # Extract only COMPLETE frames, keep remainder for next read()
-        frames, remainder = split_complete_frames(buf)
-        self._buffers[key] = remainder  # save partial tail (if any)
+    def create_session(self, client_ip, client_port, writer=None):
+        session = super().create_session(client_ip, client_port, writer)
+        session.state["framer"] = MicrokeyFramer(max_frame_size=self.max_frame_size, name=self.receiver.value)
+        return session
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session):
+        # Extract only COMPLETE frames; the partial tail stays in the session framer
+        chunk = data.encode() if isinstance(data, str) else data
+        frames = session.state["framer"].feed(chunk)
+        session.frames_in += len(frames)
 
         if not frames:
             # No complete frame yet — wait for more data
             return
 
-        # Process each full frame once
+        # Process each full frame once (decoded per frame, so multi-byte characters never straddle reads)
         for frame in frames:
-            f = frame.strip()
-            if not f:
-                continue
+            self._process_frame(frame, session, client_ip, client_port)
+
+    def _process_frame(self, frame: bytes, session, client_ip, client_port):
+        f = _to_text(frame).strip()
+        if not f:
+            return
+
+        # --- One parse per frame: signal records feed both labels, and only when they are logged ---
+        is_ping = is_ping_microkey(f)
+        buckets = None
 
-            # --- Labeled inbound logging (single source of truth) ---
-            label = build_labels_for_message(f)
-            label_prefix = (label + " ") if label else ""
+        # --- Labeled inbound logging (single source of truth) ---
+        proto = self.receiver.value
+        if logger.isEnabledFor(logging.INFO):
+            if is_ping:
+                label = "[PING]"
+            else:
+                buckets = classify_signals(extract_signals(f))
+                label = build_labels(*buckets) if any(buckets) else ""
             if logger.isEnabledFor(logging.DEBUG):
-                display = f.strip()                   
+                display = f
             else:
-                display = shrink_media_for_log(f, keep_per_signal=1, max_chars=1200)
-            logger.info(f"({self.receiver.value}) ({client_ip}) <<-- {label_prefix}{display}")
+                display = partial(shrink_media_for_log, f, keep_per_signal=1, max_chars=1200)
+            log_traffic(TRAFFIC_IN, proto, client_ip, label, display)
 
-            current_mode = self.protocol_mode.mode  # snapshot BEFORE reply
+        current_mode = self.protocol_mode.mode  # snapshot BEFORE reply
 
-            # NO_RESPONSE: never reply
-            if current_mode == EmulationMode.NO_RESPONSE:
-                logger.info(f"({self.receiver.value}) NO_RESPONSE mode: skipping reply")
-                continue
+        # NO_RESPONSE: never reply
+        if current_mode == EmulationMode.NO_RESPONSE:
+            logger.info(f"({self.receiver.value}) NO_RESPONSE mode: skipping reply")
+            return
 
-            # Parse sequence (mandatory)
-            sequence = parse_microkey_sequence(f)
-            if sequence is None:
-                logger.warning(
-                    f"({self.receiver.value}) Invalid message format from {client_ip}:{client_port}: {f!r}"
-                )
-                continue
-
-            # PING branch
-            if is_ping_microkey(f):
-                if current_mode in [EmulationMode.ONLY_PING, EmulationMode.ACK, EmulationMode.NAK]:
-                    pkt = generate_nak(sequence) if current_mode == EmulationMode.NAK else generate_ack(sequence)
-                    try:
-                        preview = pkt.decode("utf-8").strip()
-                    except UnicodeDecodeError:
-                        preview = pkt.decode("cp1252", errors="replace").strip()
-                    label_word = "NAK" if current_mode == EmulationMode.NAK else "ACK"
-                    logger.info(f"({self.receiver.value}) ({client_ip}) -->> [{label_word} PING] {preview}")
-                    writer.write(pkt)
-                    await writer.drain()
-                    self.protocol_mode.consume_packet()
-                else:
-                    logger.info(
-                        f"({self.receiver.value}) ({client_ip}) PING received — skipped due to mode: {current_mode.value}"
-                    )
-                continue
-
-            # Non-ping traffic in ONLY_PING: skip
-            if current_mode == EmulationMode.ONLY_PING:
-                logger.info(f"({self.receiver.value}) ONLY_PING mode: skipping event")
-                continue
-
-            # DROP_N handling
-            if current_mode == EmulationMode.DROP_N and getattr(self.protocol_mode, "drop_count", 0) > 0:
-                self.protocol_mode.drop_count -= 1
+        # Parse sequence (mandatory)
+        sequence = parse_microkey_sequence(f)
+        if sequence is None:
+            logger.warning(
+                f"({self.receiver.value}) Invalid message format from {client_ip}:{client_port}: {f!r}"
+            )
+            return
+
+        # Incoming <Checksum>: mismatches are logged, and NAKed if configured
+        checksum_error = check_microkey_checksum(frame) if self.validate_checksum else None
+        if checksum_error:
+            logger.warning(f"({self.receiver.value}) ({client_ip}) {checksum_error}")
+            if self.nak_on_bad_checksum:
+                pkt = self._nak(sequence, error="Checksum error")
+                log_traffic(TRAFFIC_OUT, proto, client_ip, "NAK CHECKSUM", partial(_to_text, pkt.strip()))
+                session.send(pkt)
+                return
+
+        # PING branch
+        if is_ping:
+            if current_mode in [EmulationMode.ONLY_PING, EmulationMode.ACK, EmulationMode.NAK]:
+                reply_mode = self.protocol_mode.claim_packet()
+                pkt = self._nak(sequence) if reply_mode == EmulationMode.NAK else self._ack(sequence)
+                label_word = "NAK" if reply_mode == EmulationMode.NAK else "ACK"
+                log_traffic(TRAFFIC_OUT, proto, client_ip, f"{label_word} PING", partial(_to_text, pkt.strip()))
+                session.send(pkt)
+            else:
                 logger.info(
-                    f"({self.receiver.value}) Dropped message (remaining: {self.protocol_mode.drop_count})"
+                    f"({self.receiver.value}) ({client_ip}) PING received — skipped due to mode: {current_mode.value}"
                 )
-                if self.protocol_mode.drop_count == 0:
-                    # Optionally revert to previous/next mode if your ModeManager supports it
-                    self.protocol_mode.set_mode(EmulationMode.ACK)
-                continue
-
-            # DELAY_N handling
-            if current_mode == EmulationMode.DELAY_N:
-                delay = getattr(self.protocol_mode, "delay_seconds", 0)
-                if delay:
-                    logger.info(f"({self.receiver.value}) Delaying response by {delay}s")
-                    await asyncio.sleep(delay)
-
-            # Compose and send reply (ACK/NAK)
-            pkt = generate_nak(sequence) if current_mode == EmulationMode.NAK else generate_ack(sequence)
-            try:
-                preview = pkt.decode("utf-8").strip()
-            except UnicodeDecodeError:
-                preview = pkt.decode("cp1252", errors="replace").strip()
-
-            # Pretty ACK/NAK label for single-signal frames
-            label_word = "NAK" if current_mode == EmulationMode.NAK else "ACK"
-            ack_label = ""
-            try:
-                sigs = extract_signals(f)
-                photo_by_code, link_by_code, event_by_code = classify_signals(sigs)
-
-                # pick dominant label if only one category is present
-                non_empty = [( "PHOTO", photo_by_code ), ( "LINK", link_by_code ), ( "EVENT", event_by_code )]
-                non_empty = [(name, d) for name, d in non_empty if d]
-
-                if len(non_empty) == 1:
-                    cat_name, d = non_empty[0]
-                    if len(d) == 1:
-                        code, count = next(iter(d.items()))
-                        suffix = f" x{count}" if count > 1 else ""
-                        ack_label = f"[{label_word} {cat_name} {code}{suffix}] "
-                    else:
-                        # multiple codes within the same category
-                        codes = ",".join(d.keys())
-                        ack_label = f"[{label_word} {cat_name} {codes}] "
-                else:
-                    # mixed content frame; keep it short
-                    ack_label = f"[{label_word} MIXED] "
-            except Exception:
-                ack_label = ""
-
-            logger.info(f"({self.receiver.value}) ({client_ip}) -->> {ack_label}{preview}")
-            writer.write(pkt)
-            await writer.drain()
-            self.protocol_mode.consume_packet()
-
-        return
+            return
+
+        # Non-ping traffic in ONLY_PING: skip
+        if current_mode == EmulationMode.ONLY_PING:
+            logger.info(f"({self.receiver.value}) ONLY_PING mode: skipping event")
+            return
+
+        # DROP_N handling
+        if current_mode == EmulationMode.DROP_N and self.protocol_mode.take_drop():
+            logger.info(
+                f"({self.receiver.value}) Dropped message (remaining: {self.protocol_mode.drop_count})"
+            )
+            if self.protocol_mode.drop_count == 0:
+                # Optionally revert to previous/next mode if your ModeManager supports it
+                self.protocol_mode.set_mode(EmulationMode.ACK)
+            return
+
+        # DELAY_N handling: reply from a timer, keep reading and parsing meanwhile
+        reply_delay = 0
+        if current_mode == EmulationMode.DELAY_N:
+            reply_delay = self.protocol_mode.delay_seconds
+            if reply_delay:
+                logger.info(f"({self.receiver.value}) Delaying response by {reply_delay}s")
+
+        # Compose and send reply (ACK/NAK); reply mode claimed atomically across workers
+        reply_mode = self.protocol_mode.claim_packet()
+        pkt = self._nak(sequence) if reply_mode == EmulationMode.NAK else self._ack(sequence)
+
+        # Pretty ACK/NAK label for single-signal frames
+        if logger.isEnabledFor(logging.INFO):
+            label_word = "NAK" if reply_mode == EmulationMode.NAK else "ACK"
+            if buckets is None:
+                buckets = classify_signals(extract_signals(f))
+            label = build_reply_label(label_word, *buckets)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, label, partial(_to_text, pkt.strip()))
+        session.send(pkt, reply_delay)
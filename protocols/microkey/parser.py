@@ -1,5 +1,8 @@
 import re
-from typing import Union, List, Dict, Tuple
+from functools import lru_cache
+from typing import Union, List, Dict, Optional, Tuple
+
+from utils.crc import crc16_arc_hex
 
 # -------- Normalization --------
 
@@ -37,6 +40,26 @@ def split_complete_frames(buffer_text: str) -> Tuple[List[str], str]:
         remainder = buffer_text[last_end:]
     return frames, remainder
 
+# -------- Checksum --------
+
+_CHECKSUM_RE = re.compile(rb"</Signals>\s*<Checksum>([0-9A-Fa-f]{4})</Checksum>")
+
+def check_microkey_checksum(frame: bytes) -> Optional[str]:
+    """
+    Verify <Checksum> of one complete frame: CRC-16/ARC over <Signals ...>...</Signals>.
+    Returns None when it matches, otherwise a description of the mismatch.
+    """
+    start = frame.find(b"<Signals")
+    close = frame.rfind(b"</Signals>")
+    match = _CHECKSUM_RE.match(frame, close) if start >= 0 and close >= 0 else None
+    if match is None:
+        return "Checksum missing"
+    expected = crc16_arc_hex(frame[start:close + len(b"</Signals>")])
+    received = match.group(1).decode().upper()
+    if received != expected:
+        return f"Checksum mismatch: received {received}, expected {expected} (CRC-16/ARC)"
+    return None
+
 # -------- Simple fields --------
 
 def parse_microkey_sequence(message: Union[str, bytes]) -> str | None:
@@ -62,13 +85,10 @@ def is_ping_microkey(message: Union[str, bytes]) -> bool:
 _SIG_RE = re.compile(r"<Signal>(.*?)</Signal>", re.DOTALL)
 
 # URL detectors:
-#  - any URL (http/https/custom scheme, e.g., ajax://, app://, ajax-pro-desktop://)
-_URL_ANY_SCHEME_RE = re.compile(r"\b(?:[a-z][a-z0-9+.\-]*://\S+)", re.IGNORECASE)
-#  - image URL (has explicit image extension BEFORE optional query)
-_IMAGE_EXT_URL_RE = re.compile(
-    r"\b(?:[a-z][a-z0-9+.\-]*://\S+?\.(?:jpg|jpeg|png|gif|webp|bmp|tif|tiff))(?:\?\S+)?\b",
-    re.IGNORECASE,
-)
+#  - one URL token inside XML text (stops at markup and quotes)
+_URL_TOKEN_RE = re.compile(r"\b[a-z][a-z0-9+.\-]*://[^\s<>\"']+", re.IGNORECASE)
+#  - image URL (explicit image extension on the last path segment, before an optional query)
+_IMAGE_EXTS = {"jpg", "jpeg", "png", "gif", "webp", "bmp", "tif", "tiff"}
 
 # --- Heuristic "image-like" CDN patterns (no extension in URL) ---
 # Consider as image when URL contains an "imagesvc/app_video-svc/app_company-svc" path and:
@@ -79,16 +99,20 @@ _IMAGE_HOST_HINT_RE = re.compile(r"imagesvc", re.IGNORECASE)
 _IMAGE_PATH_HINT_RE = re.compile(r"(?:/s/|image_|/original/)", re.IGNORECASE)
 _SERVICE_HINT_RE     = re.compile(r"(?:app_video-svc|app_company-svc)", re.IGNORECASE)
 
-def _looks_like_image_url(text: str) -> bool:
-    """Best-effort detection of image URLs, even without file extensions."""
-    if _IMAGE_EXT_URL_RE.search(text):
-        return True
-    # Common CDN/service hints (S3 or internal CDN without extensions)
-    if _IMAGE_HOST_HINT_RE.search(text) and _IMAGE_PATH_HINT_RE.search(text):
+def _is_image_url(url: str) -> bool:
+    """Best-effort detection of image URLs, even without file extensions; hints are memoized per host/path prefix."""
+    path = url.split("?", 1)[0]
+    prefix, _, name = path.rpartition("/")
+    name = name.lower()
+    if "." in name and name.rpartition(".")[2] in _IMAGE_EXTS:
         return True
-    if _SERVICE_HINT_RE.search(text) and _IMAGE_PATH_HINT_RE.search(text):
-        return True
-    return False
+    return _has_image_hints(prefix.lower() + "/", "image_" in name)
+
+@lru_cache(maxsize=4096)
+def _has_image_hints(prefix: str, image_token: bool) -> bool:
+    if not (_IMAGE_HOST_HINT_RE.search(prefix) or _SERVICE_HINT_RE.search(prefix)):
+        return False
+    return image_token or bool(_IMAGE_PATH_HINT_RE.search(prefix))
 
 # PHOTO by code (explicit whitelist) — extend as needed
 PHOTO_CODES: set[str] = {"E130"}
@@ -100,34 +124,9 @@ CODE_CATEGORY_OVERRIDES: Dict[str, str] = {
     # "E761": "link",  # intentionally omitted
 }
 
-def extract_signals(message: Union[str, bytes]) -> List[Dict[str, str]]:
+def signal_category(code: str, raw: str) -> str:
     """
-    Extract all <Signal>...</Signal> blocks and return dictionaries with parsed fields.
-    Include 'raw' to allow URL detection across any child tag (VideoFile/Image/Url/Hyperlink/...).
-    """
-    msg = _to_text(message)
-    signals: List[Dict[str, str]] = []
-
-    def get(field: str, src: str) -> str:
-        m = re.search(fr"<{field}>(.*?)</{field}>", src, flags=re.DOTALL)
-        return m.group(1).strip() if m else ""
-
-    for raw in _SIG_RE.findall(msg):
-        signals.append({
-            "raw":    raw,  # keep raw to check URLs anywhere inside signal
-            "account": get("Account", raw),
-            "date":    get("Date", raw),
-            "time":    get("Time", raw),
-            "code":    get("SignalIdentifier", raw),
-            "zone":    get("PhysicalZone", raw),
-            "area":    get("Area", raw),
-            "data":    get("Data", raw),
-        })
-    return signals
-
-def classify_signals(signals: List[Dict[str, str]]) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, int]]:
-    """
-    Split signals into PHOTO/LINK/EVENT buckets (per code) and return counts.
+    "photo" | "link" | "event" for one signal.
 
     Priority (highest first):
       1) CODE_CATEGORY_OVERRIDES (photo/link/event)
@@ -136,82 +135,156 @@ def classify_signals(signals: List[Dict[str, str]]) -> Tuple[Dict[str, int], Dic
       4) Has any URL (web or desktop deep-link, e.g., ajax-pro-desktop://)   -> LINK
       5) Otherwise                                                            -> EVENT
     """
-    photo_by_code: Dict[str, int] = {}
-    link_by_code: Dict[str, int] = {}
-    event_by_code: Dict[str, int] = {}
+    override = CODE_CATEGORY_OVERRIDES.get(code)
+    if override in ("photo", "link", "event"):
+        return override
+    urls = _URL_TOKEN_RE.findall(raw) if "://" in raw else []
+    for url in urls:
+        if _is_image_url(url):
+            return "photo"
+    if code in PHOTO_CODES:
+        return "photo"
+    if urls:
+        return "link"
+    return "event"
+
+# One <Signal> child per match; the first occurrence of each field wins
+_SIGNAL_FIELDS = {
+    "Account": "account",
+    "Date": "date",
+    "Time": "time",
+    "SignalIdentifier": "code",
+    "PhysicalZone": "zone",
+    "Area": "area",
+    "Data": "data",
+}
+_FIELD_RE = re.compile(r"<(" + "|".join(_SIGNAL_FIELDS) + r")>(.*?)</\1>", re.DOTALL)
 
-    for s in signals:
-        code = (s.get("code") or "").strip()
-        raw  = (s.get("raw")  or "").strip()
-
-        # 1) explicit override
-        override = CODE_CATEGORY_OVERRIDES.get(code)
-        if override == "photo":
-            photo_by_code[code] = photo_by_code.get(code, 0) + 1
-            continue
-        elif override == "link":
-            link_by_code[code] = link_by_code.get(code, 0) + 1
-            continue
-        elif override == "event":
-            event_by_code[code] = event_by_code.get(code, 0) + 1
-            continue
-
-        # 2) image-like URL wins over everything
-        if _looks_like_image_url(raw):
-            photo_by_code[code] = photo_by_code.get(code, 0) + 1
-            continue
-
-        # 3) PHOTO by known codes
-        if code in PHOTO_CODES:
-            photo_by_code[code] = photo_by_code.get(code, 0) + 1
-            continue
-
-        # 4) Any URL → LINK (includes desktop schemes)
-        if _URL_ANY_SCHEME_RE.search(raw):
-            link_by_code[code] = link_by_code.get(code, 0) + 1
-            continue
-
-        # 5) Otherwise → EVENT
-        event_by_code[code] = event_by_code.get(code, 0) + 1
-
-    return photo_by_code, link_by_code, event_by_code
+class MicrokeySignal:
+    """
+    One <Signal> block, tokenized in a single pass over its text.
 
-def build_labels_for_message(message: Union[str, bytes]) -> str:
+    Supports the dict-style access of the former signal dicts
+    (signal["code"], signal.get("raw")); `category` is computed on first use.
     """
-    Build labels like:
-      [PING]
-      [EVENT R145]
-      [LINK E761 x3]
-      [PHOTO E130 x3] [LINK E761] [EVENT R145]
+
+    __slots__ = ("raw", "account", "date", "time", "code", "zone", "area", "data", "_category")
+
+    def __init__(self, raw: str):
+        self.raw = raw  # keep raw to check URLs anywhere inside signal
+        self.account = self.date = self.time = self.code = ""
+        self.zone = self.area = self.data = ""
+        self._category: Optional[str] = None
+        seen = set()
+        for m in _FIELD_RE.finditer(raw):
+            tag = m.group(1)
+            if tag not in seen:
+                seen.add(tag)
+                setattr(self, _SIGNAL_FIELDS[tag], m.group(2).strip())
+
+    @property
+    def category(self) -> str:
+        if self._category is None:
+            self._category = signal_category(self.code.strip(), self.raw.strip())
+        return self._category
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self.__slots__ or key.startswith("_"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"MicrokeySignal(code={self.code!r}, account={self.account!r}, category={self.category!r})"
+
+def extract_signals(message: Union[str, bytes]) -> List[MicrokeySignal]:
+    """
+    Extract all <Signal>...</Signal> blocks as MicrokeySignal records.
+    Each keeps 'raw' to allow URL detection across any child tag (VideoFile/Image/Url/Hyperlink/...).
     """
     msg = _to_text(message)
-    if is_ping_microkey(msg):
-        return "[PING]"
+    return [MicrokeySignal(raw) for raw in _SIG_RE.findall(msg)]
 
-    signals = extract_signals(msg)
-    if not signals:
-        return ""  # Keep log clean for malformed/partial buffers
+def classify_signals(signals: List[MicrokeySignal]) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, int]]:
+    """
+    Split signals into PHOTO/LINK/EVENT buckets (per code) and return counts.
+    Accepts MicrokeySignal records or plain dicts with "code" and "raw"; see signal_category.
+    """
+    buckets: Dict[str, Dict[str, int]] = {"photo": {}, "link": {}, "event": {}}
+
+    for s in signals:
+        code = (s.get("code") or "").strip()
+        if isinstance(s, MicrokeySignal):
+            category = s.category
+        else:
+            category = signal_category(code, (s.get("raw") or "").strip())
+        bucket = buckets[category]
+        bucket[code] = bucket.get(code, 0) + 1
 
-    photo_by_code, link_by_code, event_by_code = classify_signals(signals)
+    return buckets["photo"], buckets["link"], buckets["event"]
 
+def _counted(code: str, count: int) -> str:
+    return f"{code}{(' x'+str(count)) if count > 1 else ''}"
+
+def build_labels(photo_by_code: Dict[str, int], link_by_code: Dict[str, int], event_by_code: Dict[str, int]) -> str:
+    """Inbound labels from classify_signals buckets, e.g. "[PHOTO E130 x3] [LINK E761] [EVENT R145]"."""
     labels: List[str] = []
 
     for code, count in photo_by_code.items():
-        labels.append(f"[PHOTO {code}{(' x'+str(count)) if count > 1 else ''}]")
+        labels.append(f"[PHOTO {_counted(code, count)}]")
 
     for code, count in link_by_code.items():
-        labels.append(f"[LINK {code}{(' x'+str(count)) if count > 1 else ''}]")
+        labels.append(f"[LINK {_counted(code, count)}]")
 
     if event_by_code:
         if len(event_by_code) == 1:
             code, count = next(iter(event_by_code.items()))
-            labels.append(f"[EVENT {code}{(' x'+str(count)) if count > 1 else ''}]")
+            labels.append(f"[EVENT {_counted(code, count)}]")
         else:
             codes = ",".join(event_by_code.keys())
             labels.append(f"[EVENT {codes}]")
 
     return " ".join(labels)
 
+def build_reply_label(label_word: str, photo_by_code: Dict[str, int], link_by_code: Dict[str, int],
+                      event_by_code: Dict[str, int]) -> str:
+    """Outbound label ("[ACK PHOTO E130 x2] ", "[NAK MIXED] ") from the same buckets."""
+    non_empty = [(name, d) for name, d in (("PHOTO", photo_by_code), ("LINK", link_by_code), ("EVENT", event_by_code)) if d]
+
+    # pick dominant label if only one category is present
+    if len(non_empty) == 1:
+        cat_name, d = non_empty[0]
+        if len(d) == 1:
+            code, count = next(iter(d.items()))
+            return f"[{label_word} {cat_name} {_counted(code, count)}] "
+        # multiple codes within the same category
+        return f"[{label_word} {cat_name} {','.join(d.keys())}] "
+    # mixed content frame; keep it short
+    return f"[{label_word} MIXED] "
+
+def build_labels_for_message(message: Union[str, bytes]) -> str:
+    """
+    Build labels like:
+      [PING]
+      [EVENT R145]
+      [LINK E761 x3]
+      [PHOTO E130 x3] [LINK E761] [EVENT R145]
+    """
+    msg = _to_text(message)
+    if is_ping_microkey(msg):
+        return "[PING]"
+
+    signals = extract_signals(msg)
+    if not signals:
+        return ""  # Keep log clean for malformed/partial buffers
+
+    return build_labels(*classify_signals(signals))
+
 # -------- Log compactor for huge XML --------
 
 _MEDIA_TAG_RE = re.compile(r"<(VideoFile|Image|Url|Link|Hyperlink)>(.*?)</\1>", re.IGNORECASE | re.DOTALL)
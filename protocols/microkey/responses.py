@@ -1,8 +1,36 @@
+from utils.crc import crc16_arc, crc16_arc_hex
+
 ACK_PATTERN = '\r<Response><Sequence>{}</Sequence><Status>ACK</Status></Response><Checksum>{}</Checksum>\n'
 NAK_PATTERN = '\r<Response><Sequence>{}</Sequence><Status>NAK</Status><Error>{}</Error></Response><Checksum>{}</Checksum>\n'
 
-def generate_ack(sequence: str, checksum: str = '4FE9') -> bytes:
-    return ACK_PATTERN.format(sequence, checksum).encode()
+# Constants real panels accept today (microkey.checksum: fixed)
+FIXED_ACK_CHECKSUM = '4FE9'
+FIXED_NAK_CHECKSUM = '0000'
+
+_ACK_HEAD = b"\r<Response><Sequence>"
+_ACK_TAIL = b"</Sequence><Status>ACK</Status></Response>"
+# CRC register after the constant "<Response><Sequence>" prefix
+_ACK_HEAD_CRC = crc16_arc(_ACK_HEAD[1:])
+
+
+def response_checksum(body: bytes) -> str:
+    """CRC-16/ARC of a <Response>...</Response> body (CR/LF framing excluded)."""
+    return crc16_arc_hex(body)
+
+
+def generate_ack(sequence: str, checksum: str = FIXED_ACK_CHECKSUM, compute: bool = False) -> bytes:
+    """ACK with the fixed `checksum`, or with a computed CRC-16/ARC when `compute` is set."""
+    if not compute:
+        return ACK_PATTERN.format(sequence, checksum).encode()
+    digits = sequence.encode()
+    crc = crc16_arc(_ACK_TAIL, crc16_arc(digits, _ACK_HEAD_CRC))
+    return b"%s%s%s<Checksum>%04X</Checksum>\n" % (_ACK_HEAD, digits, _ACK_TAIL, crc)
+
 
-def generate_nak(sequence: str, error: str = 'Checksum error', checksum: str = '0000') -> bytes:
+def generate_nak(sequence: str, error: str = 'Checksum error', checksum: str = FIXED_NAK_CHECKSUM,
+                 compute: bool = False) -> bytes:
+    """NAK with the fixed `checksum`, or with a computed CRC-16/ARC when `compute` is set."""
+    if compute:
+        body = NAK_PATTERN.format(sequence, error, "").encode()
+        checksum = response_checksum(body[1:body.index(b"<Checksum>")])
     return NAK_PATTERN.format(sequence, error, checksum).encode()
@@ -0,0 +1,41 @@
+import re
+from typing import Optional, Tuple
+
+from core.framing import BufferedFramer, DEFAULT_MAX_FRAME_SIZE
+
+# Link-test handshake sent by the panel; answered with a bare ACK
+PING = b"\x06\x14"
+DC4 = b"\x14"
+# An event ends with DC4 (0x14) or CR
+_TERMINATOR_RE = re.compile(rb"[\x14\r]")
+# Line noise between frames (LF after CR, padding)
+_INTERFRAME = b" \t\n\x00"
+
+
+class SentinelFramer(BufferedFramer):
+    """
+    Incremental Sentinel splitter: every frame ends with DC4 or CR.
+
+    The \\x06\\x14 handshake is a frame of its own, so a read holding a ping
+    and events (or several events) yields one frame each, and an event split
+    across reads is only handed over once its terminator arrives. Frames
+    keep their terminator. Line noise before a frame (the LF of a CR/LF
+    pair) is skipped, and frames holding nothing but a terminator are
+    dropped.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE, name: str = ""):
+        super().__init__(DC4, max_frame_size=max_frame_size, name=name)
+
+    def _find_end(self, buf: bytearray, scan: int) -> Optional[Tuple[int, int]]:
+        match = _TERMINATOR_RE.search(buf, scan)
+        if match is None:
+            return None
+        return match.end(), match.end()
+
+    def _frame_start(self, buf: bytearray, start: int, end: int) -> Optional[int]:
+        while start < end and buf[start] in _INTERFRAME:
+            start += 1
+        return start if end - start > 1 else None
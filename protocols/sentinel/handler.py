@@ -1,15 +1,31 @@
 # protocols/sentinel/handler.py
 
+import logging
 import re
+from functools import partial
 from typing import Optional
+from protocols.sentinel.framing import PING, SentinelFramer
 from protocols.sentinel.mode_switcher import SentinelModeSwitcher
 from protocols.sentinel.parser import parse_event
 from protocols.sentinel.responses import get_ack, get_nak
 from core.connection_handler import BaseProtocol
+from core.framing import DEFAULT_MAX_FRAME_SIZE
 from utils.registry_tools import register_protocol
 from utils.constants import Receiver
+from utils.config_loader import get_protocol_config
 from utils.mode_switcher import mode_manager
 from utils.tools import logger
+from utils.logger import log_traffic, log_traffic_frame, TRAFFIC_IN, TRAFFIC_OUT
+
+# 256-entry rendering tables, indexed by byte value
+# Visible form: printable ASCII as-is, TAB as a space, CR/LF and other bytes as <0xHH>
+_VISIBLE_TABLE = [
+    chr(b) if 0x20 <= b <= 0x7E else " " if b == 0x09 else f"<0x{b:02X}>"
+    for b in range(256)
+]
+# Bytes shown verbatim; deleting them leaves only what needs escaping
+_PLAIN_BYTES = bytes(range(0x20, 0x7F))
+_ANGLE_HEX = [f"0x{b:02X}" for b in range(256)]
 
 
 @register_protocol(Receiver.SENTINEL)
@@ -17,13 +33,25 @@ class SentinelProtocol(BaseProtocol):
     def __init__(self):
         super().__init__(receiver=Receiver.SENTINEL)
         self.protocol_mode = mode_manager.get(self.receiver.value)
-        self.mode_switcher = SentinelModeSwitcher()
+        self.mode_switcher = SentinelModeSwitcher(self.protocol_mode)
+        settings = get_protocol_config(self.receiver)
+        # Bytes without DC4/CR beyond this are dropped as garbage instead of buffered
+        self.max_frame_size = settings.get("max_frame_size", DEFAULT_MAX_FRAME_SIZE)
 
         # Regexes to detect and manipulate URLs inside pipe-delimited fields
         # Example segments: |MediaUrl=https://...|, |LinkUrl=ajax-pro-desktop://...
         self._media_re = re.compile(r'\|MediaUrl=([^|]+)')  # capture value until next '|'
         self._link_re  = re.compile(r'\|LinkUrl=([^|]+)')   # capture value until next '|'
 
+    async def run(self):
+        self.mode_switcher.start_stdin_listener()
+        await super().run()
+
+    def create_session(self, client_ip, client_port, writer=None):
+        session = super().create_session(client_ip, client_port, writer)
+        session.state["framer"] = SentinelFramer(max_frame_size=self.max_frame_size, name=self.receiver.value)
+        return session
+
     # ---------------- helpers ----------------
 
     def _bytes_as_angle_hex(self, data: bytes, limit: int = 64) -> str:
@@ -33,8 +61,7 @@ class SentinelProtocol(BaseProtocol):
         """
         if not data:
             return "<>"
-        shown = data[:limit]
-        body = " ".join(f"0x{b:02X}" for b in shown)
+        body = " ".join(map(_ANGLE_HEX.__getitem__, data[:limit]))
         if len(data) > limit:
             body += " …"
         return f"<{body}>"
@@ -45,16 +72,9 @@ class SentinelProtocol(BaseProtocol):
         - printable ASCII (0x20..0x7E) as-is (newline/tab normalized)
         - control / invisible bytes shown inline as <0xHH>
         """
-        out = []
-        for b in data:
-            if 0x20 <= b <= 0x7E:
-                ch = chr(b)
-                out.append(ch if ch not in '\r\n' else f'<0x{b:02X}>')
-            elif b == 0x09:
-                out.append(' ')
-            else:
-                out.append(f'<0x{b:02X}>')
-        return ''.join(out)
+        if not data.translate(None, _PLAIN_BYTES):
+            return data.decode("ascii")
+        return data.decode("latin-1").translate(_VISIBLE_TABLE)
 
     def _collapse_media_urls_once(self, s: str):
         """
@@ -82,8 +102,7 @@ class SentinelProtocol(BaseProtocol):
         """Return a long hex dump for DEBUG (space-separated, truncated)."""
         if not data:
             return ""
-        shown = data[:limit]
-        hex_str = " ".join(f"{b:02X}" for b in shown)
+        hex_str = data[:limit].hex(" ").upper()
         if len(data) > limit:
             hex_str += f" …(+{len(data) - limit} bytes)"
         return hex_str
@@ -106,7 +125,7 @@ class SentinelProtocol(BaseProtocol):
           - PHOTO (if MediaUrl(s) present per parser)
           - EVENT (with code if present)
         """
-        if data == b"\x06\x14":
+        if data == PING:
             return "PING"
 
         code = parsed.get("event_code") if parsed else None
@@ -134,59 +153,66 @@ class SentinelProtocol(BaseProtocol):
 
     # ---------------- main ----------------
 
-    async def handle(self, reader, writer, client_ip, client_port, data: bytes):
-        # Parse (for code/is_photo) and detect LinkUrl
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session):
+        """Split the read into pings and events; each frame is answered on its own."""
+        for frame in session.state["framer"].feed(data):
+            session.frames_in += 1
+            await self._handle_frame(frame, session, client_ip)
+
+    @staticmethod
+    def _parse_frame(data: bytes):
+        """(decoded text, parsed event or None) of one frame."""
         try:
             decoded = data.decode(errors="ignore")
-            parsed = parse_event(decoded)
+            return decoded, parse_event(decoded)
         except Exception:
-            decoded = ""
-            parsed = None
+            return "", None
+
+    def _describe_incoming(self, data: bytes):
+        """(label, visible string) of one non-ping frame, as logged."""
+        # Parse (for code/is_photo) and detect LinkUrl
+        decoded, parsed = self._parse_frame(data)
 
         # Detect LinkUrl from both decoded and visible forms (robust to control bytes)
-        has_link = bool(self._link_re.search(decoded))
-        if not has_link:
-            has_link = bool(self._link_re.search(self._bytes_to_visible_str(data)))
+        visible_str = self._bytes_to_visible_str(data)
+        has_link = bool(self._link_re.search(decoded)) or bool(self._link_re.search(visible_str))
 
         label = self._label_for_incoming(data, parsed, has_link)
 
+        # Special collapsing for PHOTO only
+        is_photo = parsed.get("is_photo", False) if parsed else False
+        if is_photo:
+            visible_str, count = self._collapse_media_urls_once(visible_str)
+            if count > 1 and not label.endswith(f"x{count}"):
+                label = f"{label} x{count}"
+        return label, visible_str
+
+    async def _handle_frame(self, data: bytes, session, client_ip: str):
+        proto = self.receiver.value
+
         # INFO input line:
-        if data == b"\x06\x14":
+        if data == PING:
             # Control handshake displayed as angle-hex only
-            logger.info(f"(SENTINEL) ({client_ip}) <<-- [PING] {self._bytes_as_angle_hex(data)}")
+            log_traffic(TRAFFIC_IN, proto, client_ip, "PING", partial(self._bytes_as_angle_hex, data))
         else:
-            # Build visible string; special collapsing for PHOTO only
-            visible_str = self._bytes_to_visible_str(data)
-            is_photo = parsed.get("is_photo", False) if parsed else False
-            if is_photo:
-                visible_str, count = self._collapse_media_urls_once(visible_str)
-                if count > 1 and not label.endswith(f"x{count}"):
-                    label = f"{label} x{count}"
-            logger.info(f"(SENTINEL) ({client_ip}) <<-- [{label}] {visible_str}")
-
-        # DEBUG: raw + hex + preview + parsed
-        logger.debug(f"(SENTINEL) ({client_ip}) [IN RAW]  bytes={data!r}")
-        logger.debug(f"(SENTINEL) ({client_ip}) [IN HEX]  {self._bytes_to_hex_block(data)}")
-        logger.debug(f"(SENTINEL) ({client_ip}) [PREVIEW] '{self._preview_bytes(data)}'")
-        if parsed is not None:
-            logger.debug(
-                f"(SENTINEL) ({client_ip}) [PARSED] fields={parsed.get('fields')} "
-                f"is_photo={parsed.get('is_photo')} event_code={parsed.get('event_code')}"
-            )
+            # Parsing, label and rendering run only if the line is logged
+            log_traffic_frame(TRAFFIC_IN, proto, client_ip, self._describe_incoming, data)
+
+        # DEBUG: raw + hex + preview + parsed (dumps are only rendered when DEBUG is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            parsed = self._parse_frame(data)[1]
+            logger.debug(f"(SENTINEL) ({client_ip}) [IN RAW]  bytes={data!r}")
+            logger.debug(f"(SENTINEL) ({client_ip}) [IN HEX]  {self._bytes_to_hex_block(data)}")
+            logger.debug(f"(SENTINEL) ({client_ip}) [PREVIEW] '{self._preview_bytes(data)}'")
+            if parsed is not None:
+                logger.debug(
+                    f"(SENTINEL) ({client_ip}) [PARSED] fields={parsed.get('fields')} "
+                    f"is_photo={parsed.get('is_photo')} event_code={parsed.get('event_code')}"
+                )
 
         # PING (\x06\x14) -> ACK (0x06)
-        if data == b"\x06\x14":
-            response = get_ack()
-            try:
-                writer.write(response)
-                await writer.drain()
-            except Exception as ex:
-                logger.debug(f"(SENTINEL) ({client_ip}) [SEND ERROR] {ex!r}")
-            # INFO outgoing: angle-hex style
-            logger.info(f"(SENTINEL) ({client_ip}) -->> [ACK] {self._bytes_as_angle_hex(response)}")
-            # DEBUG outgoing: raw + hex
-            logger.debug(f"(SENTINEL) ({client_ip}) [OUT RAW] bytes={response!r}")
-            logger.debug(f"(SENTINEL) ({client_ip}) [OUT HEX] {self._bytes_to_hex_block(response)}")
+        if data == PING:
+            self._reply(session, client_ip, "ACK", get_ack())
             return
 
         # Emulation mode
@@ -196,24 +222,16 @@ class SentinelProtocol(BaseProtocol):
             return
 
         if mode == "nak":
-            response = get_nak()
-            try:
-                writer.write(response)
-                await writer.drain()
-            except Exception as ex:
-                logger.debug(f"(SENTINEL) ({client_ip}) [SEND ERROR] {ex!r}")
-            logger.info(f"(SENTINEL) ({client_ip}) -->> [NAK] {self._bytes_as_angle_hex(response)}")
-            logger.debug(f"(SENTINEL) ({client_ip}) [OUT RAW] bytes={response!r}")
-            logger.debug(f"(SENTINEL) ({client_ip}) [OUT HEX] {self._bytes_to_hex_block(response)}")
+            self._reply(session, client_ip, "NAK", get_nak())
             return
 
         # default -> ACK
-        response = get_ack()
-        try:
-            writer.write(response)
-            await writer.drain()
-        except Exception as ex:
-            logger.debug(f"(SENTINEL) ({client_ip}) [SEND ERROR] {ex!r}")
-        logger.info(f"(SENTINEL) ({client_ip}) -->> [ACK] {self._bytes_as_angle_hex(response)}")
-        logger.debug(f"(SENTINEL) ({client_ip}) [OUT RAW] bytes={response!r}")
-        logger.debug(f"(SENTINEL) ({client_ip}) [OUT HEX] {self._bytes_to_hex_block(response)}")
+        self._reply(session, client_ip, "ACK", get_ack())
+
+    def _reply(self, session, client_ip: str, label: str, response: bytes):
+        """Queue the reply; replies to every frame of one read leave with a single write."""
+        session.send(response)
+        log_traffic(TRAFFIC_OUT, self.receiver.value, client_ip, label, partial(self._bytes_as_angle_hex, response))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"(SENTINEL) ({client_ip}) [OUT RAW] bytes={response!r}")
+            logger.debug(f"(SENTINEL) ({client_ip}) [OUT HEX] {self._bytes_to_hex_block(response)}")
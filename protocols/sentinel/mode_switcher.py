@@ -1,12 +1,20 @@
 import threading
+from utils.mode_manager import EmulationMode
+
+# Sentinel console commands -> shared emulation modes
+_COMMAND_MODES = {
+    "ack": EmulationMode.ACK,
+    "nak": EmulationMode.NAK,
+    "no_response": EmulationMode.NO_RESPONSE,
+}
+
 
 class SentinelModeSwitcher:
-    def __init__(self):
-        self._mode = "ack"
-        self._lock = threading.Lock()
-        self._start_stdin_listener()
+    def __init__(self, protocol_mode):
+        # Mode lives in ProtocolMode so it is shared with the host / worker processes
+        self.protocol_mode = protocol_mode
 
-    def _start_stdin_listener(self):
+    def start_stdin_listener(self):
         thread = threading.Thread(target=self._stdin_listener, daemon=True)
         thread.start()
 
@@ -14,20 +22,25 @@ class SentinelModeSwitcher:
         import sys
         print("[Sentinel ModeSwitcher] Type: ack | nak | no_response")
         while True:
-            cmd = sys.stdin.readline().strip().lower()
-            with self._lock:
-                if cmd == "ack":
-                    self._mode = "ack"
-                    print("[ModeSwitcher] Mode set to ACK")
-                elif cmd == "nak":
-                    self._mode = "nak"
-                    print("[ModeSwitcher] Mode set to NAK")
-                elif cmd == "no_response":
-                    self._mode = "no_response"
-                    print("[ModeSwitcher] Mode set to NO_RESPONSE")
-                else:
-                    print("[ModeSwitcher] Unknown command! Use: ack | nak | no_response")
+            self.handle_command(sys.stdin.readline())
+
+    def supports_command(self, command: str) -> bool:
+        """Whether handle_command() knows `command` (host broadcasts skip the rest)."""
+        return command.strip().lower() in _COMMAND_MODES
+
+    def handle_command(self, command: str):
+        cmd = command.strip().lower()
+        mode = _COMMAND_MODES.get(cmd)
+        if mode is None:
+            print("[ModeSwitcher] Unknown command! Use: ack | nak | no_response")
+            return
+        self.protocol_mode.set_mode(mode)
+        print(f"[ModeSwitcher] Mode set to {cmd.upper()}")
 
     def get_mode(self):
-        with self._lock:
-            return self._mode
+        mode = self.protocol_mode.mode
+        if mode == EmulationMode.NAK:
+            return "nak"
+        if mode == EmulationMode.NO_RESPONSE:
+            return "no_response"
+        return "ack"
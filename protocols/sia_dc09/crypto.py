@@ -0,0 +1,84 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from utils.config_loader import get_protocol_config
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # optional: encrypted DC-09 is only needed for panels with a key configured
+    Cipher = None
+
+_ZERO_IV = bytes(16)
+# DC-09 pad bytes may be anything printable except '|', '[' and ']'
+_PAD_ALPHABET = bytes(c for c in range(0x21, 0x7F) if chr(c) not in "|[]")
+_HEX_RE = re.compile(r"[0-9A-Fa-f]+")
+
+
+class SIAEncryptionError(Exception):
+    pass
+
+
+def crypto_available() -> bool:
+    return Cipher is not None
+
+
+def load_account_keys() -> Dict[str, str]:
+    """AES keys (hex, 128/192/256 bit) per account from sia-dcs.encryption_keys."""
+    keys = get_protocol_config("sia-dcs").get("encryption_keys") or {}
+    return {str(account).strip(): str(key).strip() for account, key in keys.items()}
+
+
+@lru_cache(maxsize=256)
+def _cipher(key_hex: str):
+    """Validated AES-CBC cipher for one key; cached so each key is expanded once."""
+    if Cipher is None:
+        raise SIAEncryptionError("Encrypted SIA DC-09 requires the 'cryptography' package")
+    try:
+        key = bytes.fromhex(key_hex)
+    except ValueError:
+        raise SIAEncryptionError("SIA key is not valid hex") from None
+    if len(key) not in (16, 24, 32):
+        raise SIAEncryptionError(f"SIA key must be 128, 192 or 256 bits, got {len(key) * 8}")
+    return Cipher(algorithms.AES(key), modes.CBC(_ZERO_IV))
+
+
+def decrypt_block(hex_data: str, key_hex: str) -> str:
+    """Decrypt the hex part after '[' and drop the leading pad (data starts at the first '|' or ']')."""
+    if not _HEX_RE.fullmatch(hex_data) or len(hex_data) % 32:
+        raise SIAEncryptionError("Encrypted SIA block is not whole AES blocks of hex")
+    decryptor = _cipher(key_hex).decryptor()
+    plain = (decryptor.update(bytes.fromhex(hex_data)) + decryptor.finalize()).decode("latin-1")
+    starts = [pos for pos in (plain.find("|"), plain.find("]")) if pos >= 0]
+    if not starts:
+        raise SIAEncryptionError("Decrypted SIA block has no data (wrong key?)")
+    return plain[min(starts):]
+
+
+def encrypt_block(data: str, key_hex: str) -> str:
+    """Left-pad `data` to whole AES blocks with random pad bytes and return upper-case hex."""
+    raw = data.encode("latin-1")
+    pad_len = -len(raw) % 16
+    pad = bytes(_PAD_ALPHABET[b % len(_PAD_ALPHABET)] for b in os.urandom(pad_len))
+    encryptor = _cipher(key_hex).encryptor()
+    return (encryptor.update(pad + raw) + encryptor.finalize()).hex().upper()
+
+
+def decrypt_sia_message(message: str, keys: Dict[str, str]) -> Tuple[str, str]:
+    """
+    Turn an encrypted frame body ('"*ADM-CID"0001L0#1234[<hex>') into its clear
+    form ('"ADM-CID"0001L0#1234[|...]_ts'). Returns (clear message, key used).
+    """
+    q1 = message.find('"*')
+    bracket = message.find("[", q1)
+    hash_pos = message.rfind("#", q1, bracket)
+    if q1 < 0 or bracket < 0 or hash_pos < 0:
+        raise SIAEncryptionError("Encrypted SIA frame has no account block")
+    account = message[hash_pos + 1:bracket]
+    key_hex: Optional[str] = keys.get(account)
+    if key_hex is None:
+        raise SIAEncryptionError(f"No SIA key configured for account {account}")
+
+    clear = decrypt_block(message[bracket + 1:].strip(), key_hex)
+    return f"{message[:q1 + 1]}{message[q1 + 2:bracket + 1]}{clear}", key_hex
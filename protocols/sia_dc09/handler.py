@@ -1,31 +1,33 @@
 import asyncio
-import re
+from functools import partial
 from core.connection_handler import BaseProtocol
 from utils.constants import Receiver
 from utils.mode_manager import mode_manager, EmulationMode
 from utils.stdin_listener import stdin_listener
-from protocols.sia_dc09.parser import parse_sia_message, is_ping
-from protocols.sia_dc09.responses import convert_sia_ack, convert_sia_nak
-from utils.logger import logger
+from protocols.sia_dc09.message import SIAMessage
+from protocols.sia_dc09.parser import check_sia_frame
+from protocols.sia_dc09.crypto import SIAEncryptionError, crypto_available, decrypt_sia_message, load_account_keys
+from protocols.sia_dc09.responses import convert_sia_ack, convert_sia_nak, convert_sia_duh
+from utils.logger import logger, log_traffic, TRAFFIC_IN, TRAFFIC_OUT
 from utils.registry_tools import register_protocol
-
-def classify_v_link(link: str) -> str:
-    if link.startswith('https://i.ajax.systems/s/'):
-        return 'PHOTO'
-    if link.startswith('https://ajax-cdn-prod.s3.') or '.jpg' in link or '/image_' in link:
-        return 'PHOTO'
-    if link.startswith('https://web.ajax.systems'):
-        return 'WEB'
-    if link.startswith('ajax-pro-desktop://'):
-        return 'DESKTOP'
-    return 'LINK'
+from utils.config_loader import get_protocol_config
 
 @register_protocol(Receiver.SIA_DCS)
 class SIADC09Protocol(BaseProtocol):
+    session_buffer = ""
+    frame_delimiter = b"\r"
+    supports_datagram = True
+
     def __init__(self):
         super().__init__(receiver=Receiver.SIA_DCS)
         self.protocol_mode = mode_manager.get(self.receiver.value)
-        self._recv_buffer = ""
+        settings = get_protocol_config(self.receiver)
+        self.validate_crc = settings.get("validate_crc", True)
+        self.nak_on_bad_crc = settings.get("nak_on_bad_crc", False)
+        self.account_keys = load_account_keys()
+        if self.account_keys and not crypto_available():
+            logger.warning(f"({self.receiver.value}) SIA keys configured but 'cryptography' is not installed; "
+                           f"encrypted frames will be answered with DUH")
 
     async def run(self):
         await asyncio.gather(
@@ -34,124 +36,25 @@ class SIADC09Protocol(BaseProtocol):
         )
 
     def get_sia_label(self, message: str) -> str:
-        if '"NULL"' in message:
-            return "PING"
-
-        if '"SIA-DCS"' in message :
-            event_match = re.search(r'"SIA-DCS".*?([A-Z]{2})', message)
-            code = event_match.group(1)
-            photo_links, web_links, desktop_links, other_links = self.get_link_summary(message)
-            if photo_links:
-                return f"PHOTO {code} x{len(photo_links)}"
-            if web_links:
-                return f"WEB_LINK {code}"
-            if desktop_links:
-                return f"DESKTOP_LINK {code}"
-            if other_links:
-                return f"LINK {code}"
-            return f"EVENT {code}"
-
-        if '"ADM-CID"' in message:
-            event_match = re.search(r'\|(\d{4})\s', message)
-            code = event_match.group(1) if event_match else None
-            photo_links, web_links, desktop_links, other_links = self.get_link_summary(message)
-            if photo_links:
-                return f"PHOTO {code} x{len(photo_links)}"
-            if web_links:
-                return f"WEB_LINK {code}"
-            if desktop_links:
-                return f"DESKTOP_LINK {code}"
-            if other_links:
-                return f"LINK {code}"
-            return f"EVENT {code}"
-
-        return "UNKNOWN"
+        return SIAMessage(message).label
 
     def extract_photo_links(self, message: str):
-        v_links = re.findall(r'\[V([^\]]+)\]', message)
-        photo_links = []
-        for v in v_links:
-            parts = [part.strip() for part in v.split(',')]
-            for part in parts:
-                if (
-                    part.startswith('https://i.ajax.systems/s/')
-                    or part.startswith('https://ajax-cdn-prod.s3.')
-                    or '.jpg' in part
-                    or '/image_' in part
-                ):
-                    photo_links.append(part)
-        return photo_links
+        return SIAMessage(message).photo_links
 
     def get_link_summary(self, message: str):
-        v_links = re.findall(r'\[V([^\]]+)\]', message)
-        photo_links = []
-        web_links = []
-        desktop_links = []
-        other_links = []
-        for v in v_links:
-            parts = [part.strip() for part in v.split(',')]
-            for part in parts:
-                t = classify_v_link(part)
-                if t == 'PHOTO':
-                    photo_links.append(part)
-                elif t == 'WEB' and not web_links:
-                    web_links.append(part)
-                elif t == 'DESKTOP' and not desktop_links:
-                    desktop_links.append(part)
-                elif t == 'LINK' and not other_links:
-                    other_links.append(part)
-        return photo_links, web_links, desktop_links, other_links
+        msg = SIAMessage(message)
+        return msg.photo_links, msg.web_links, msg.desktop_links, msg.other_links
 
     def mask_links_for_log(self, message: str) -> str:
         """
         Leave only the first photo link in each [V...] block, others replaced with [PHOTO_URL], no extra markers.
         """
-        def mask_v_block(match):
-            v_content = match.group(1)
-            parts = [part.strip() for part in v_content.split(',')]
-            photo_links = [
-                part for part in parts if (
-                    part.startswith('https://i.ajax.systems/s/')
-                    or part.startswith('https://ajax-cdn-prod.s3.')
-                    or '.jpg' in part
-                    or '/image_' in part
-                )
-            ]
-            if not photo_links:
-                return f"[V{v_content}]"
-            masked = []
-            seen_photos = 0
-            for part in parts:
-                if (
-                    part.startswith('https://i.ajax.systems/s/')
-                    or part.startswith('https://ajax-cdn-prod.s3.')
-                    or '.jpg' in part
-                    or '/image_' in part
-                ):
-                    if seen_photos == 0:
-                        masked.append(part)
-                    else:
-                        masked.append(" [PHOTO_URL]")
-                    seen_photos += 1
-                else:
-                    masked.append(part)
-            return "[V" + ','.join(masked) + "]"
-
-        masked_message = re.sub(r'\[V([^\]]+)\]', mask_v_block, message)
-        return masked_message
-
-
+        return SIAMessage(message).log_text
 
     def get_sia_response_label(self, response: str, original_message: str = None) -> str:
-        if '"ACK"' in response:
-            code = self.get_sia_label(original_message)
-            return f"ACK {code}" if code != "UNKNOWN" else "ACK"
-        if '"NAK"' in response:
-            code = self.get_sia_label(original_message)
-            return f"NAK {code}" if code != "UNKNOWN" else "NAK"
-        return "RESPONSE"
+        return SIAMessage(original_message or "").response_label(response)
 
-    async def handle(self, reader, writer, client_ip, client_port, data):
+    async def handle(self, reader, writer, client_ip, client_port, data, session):
 
         current_mode = self.protocol_mode.mode
 
@@ -164,70 +67,107 @@ class SIADC09Protocol(BaseProtocol):
         else:
             chunk = data
 
-        self._recv_buffer += chunk
+        session.buffer += chunk
         messages = []
 
-        while '\r' in self._recv_buffer:
-            idx = self._recv_buffer.index('\r')
-            msg = self._recv_buffer[:idx]
+        while '\r' in session.buffer:
+            idx = session.buffer.index('\r')
+            msg = session.buffer[:idx]
             messages.append(msg)
-            self._recv_buffer = self._recv_buffer[idx+1:]
+            session.buffer = session.buffer[idx+1:]
+        session.frames_in += len(messages)
 
         for message in messages:
-            timestamp = self.protocol_mode.get_response_timestamp()
-            parsed = parse_sia_message(message)
-            if not parsed:
-                logger.warning(f"({self.receiver.value}) ({client_ip}) Invalid SIA message: {message.strip()}")
-                return
+            self.process_message(message, current_mode, client_ip, session)
 
-            label_in = self.get_sia_label(message)
-            log_message = self.mask_links_for_log(message)
-            logger.info(f"({self.receiver.value}) ({client_ip}) <<-- [{label_in}] {log_message.strip()}")
-
-            if is_ping(message):
-                if current_mode in [EmulationMode.ONLY_PING, EmulationMode.ACK, EmulationMode.NAK]:
-                    if current_mode == EmulationMode.NAK:
-                        nak = convert_sia_nak(**parsed, timestamp=timestamp)
-                        label_out = self.get_sia_response_label(nak, message)
-                        logger.info(f"({self.receiver.value}) ({client_ip}) -->> [{label_out}] {nak.strip()}")
-                        writer.write(nak.encode() if isinstance(nak, str) else nak)
-                    else:
-                        ack = convert_sia_ack(**parsed, timestamp=timestamp)
-                        label_out = self.get_sia_response_label(ack, message)
-                        logger.info(f"({self.receiver.value}) ({client_ip}) -->> [{label_out}] {ack.strip()}")
-                        writer.write(ack.encode() if isinstance(ack, str) else ack)
-                    await writer.drain()
-                else:
-                    logger.info(f"({self.receiver.value}) ({client_ip}) PING received — skipped due to mode: {current_mode.value}")
-                return
+    async def handle_datagram(self, writer, client_ip, client_port, data, session):
+        """One UDP datagram carries exactly one DC-09 frame: no stream reassembly."""
+        current_mode = self.protocol_mode.mode
+        if current_mode == EmulationMode.NO_RESPONSE:
+            logger.info(f"({self.receiver.value}) NO_RESPONSE mode: skipping reply")
+            return
+        message = data.decode(errors="ignore").rstrip("\r")
+        session.frames_in += 1
+        self.process_message(message, current_mode, client_ip, session)
+
+    def process_message(self, message: str, current_mode, client_ip: str, session):
+        """Parse one frame (CR stripped), apply the emulation mode and queue the reply on the session."""
+        timestamp = self.protocol_mode.get_response_timestamp()
+        # CRC/length cover the frame as sent, i.e. before decryption
+        frame_error = check_sia_frame(message) if self.validate_crc else None
+
+        # Encrypted ("*SIA-DCS" / "*ADM-CID"): decrypt, reply encrypted with the same key
+        key = None
+        decrypt_error = None
+        if '"*' in message:
+            try:
+                message, key = decrypt_sia_message(message, self.account_keys)
+            except SIAEncryptionError as e:
+                decrypt_error = e
+
+        # Tokenize once; labels, log text and reply fields all come from this
+        sia = SIAMessage(message)
+        parsed = sia.reply_fields()
+        proto = self.receiver.value
+        log_traffic(
+            TRAFFIC_IN, proto, client_ip,
+            (lambda: f"{sia.label} ENC") if key else (lambda: sia.label),
+            lambda: sia.log_text,
+        )
 
-            if current_mode == EmulationMode.ONLY_PING:
-                logger.info(f"({self.receiver.value}) ONLY_PING mode: skipping event")
+        if decrypt_error:
+            logger.warning(f"({self.receiver.value}) ({client_ip}) Cannot decrypt SIA frame: {decrypt_error}")
+            duh = convert_sia_duh(**parsed, timestamp=timestamp)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, "DUH", duh.strip)
+            session.send(duh.encode())
+            return
+
+        if frame_error:
+            logger.warning(f"({self.receiver.value}) ({client_ip}) {frame_error}")
+            if self.nak_on_bad_crc:
+                # DC-09: a frame failing CRC/length is answered with NAK, sequence 0000
+                nak = convert_sia_nak(**dict(parsed, sequence="0000"), timestamp=timestamp, key=key)
+                log_traffic(TRAFFIC_OUT, proto, client_ip, "NAK CRC", nak.strip)
+                session.send(nak.encode())
                 return
 
-            if current_mode == EmulationMode.DROP_N:
-                if self.protocol_mode.drop_count > 0:
-                    self.protocol_mode.drop_count -= 1
-                    logger.info(f"({self.receiver.value}) Dropped message (remaining: {self.protocol_mode.drop_count})")
-                    return
+        if sia.is_ping:
+            if current_mode in [EmulationMode.ONLY_PING, EmulationMode.ACK, EmulationMode.NAK]:
+                if current_mode == EmulationMode.NAK:
+                    nak = convert_sia_nak(**parsed, timestamp=timestamp, key=key)
+                    log_traffic(TRAFFIC_OUT, proto, client_ip, partial(sia.response_label, nak), nak.strip)
+                    session.send(nak.encode() if isinstance(nak, str) else nak)
                 else:
-                    self.protocol_mode.set_mode(EmulationMode.ACK)
-
-            if current_mode == EmulationMode.DELAY_N:
-                delay = self.protocol_mode.delay_seconds
-                logger.info(f"({self.receiver.value}) Delaying response by {delay}s")
-                await asyncio.sleep(delay)
-
-            if current_mode == EmulationMode.NAK:
-                nak = convert_sia_nak(**parsed, timestamp=timestamp)
-                label_out = self.get_sia_response_label(nak, message)
-                logger.info(f"({self.receiver.value}) ({client_ip}) -->> [{label_out}] {nak.strip()}")
-                writer.write(nak.encode() if isinstance(nak, str) else nak)
+                    ack = convert_sia_ack(**parsed, timestamp=timestamp, key=key)
+                    log_traffic(TRAFFIC_OUT, proto, client_ip, partial(sia.response_label, ack), ack.strip)
+                    session.send(ack.encode() if isinstance(ack, str) else ack)
             else:
-                ack = convert_sia_ack(**parsed, timestamp=timestamp)
-                label_out = self.get_sia_response_label(ack, message)
-                logger.info(f"({self.receiver.value}) ({client_ip}) -->> [{label_out}] {ack.strip()}")
-                writer.write(ack.encode() if isinstance(ack, str) else ack)
+                logger.info(f"({self.receiver.value}) ({client_ip}) PING received — skipped due to mode: {current_mode.value}")
+            return
 
-            await writer.drain()
-            self.protocol_mode.consume_packet()
+        if current_mode == EmulationMode.ONLY_PING:
+            logger.info(f"({self.receiver.value}) ONLY_PING mode: skipping event")
+            return
+
+        if current_mode == EmulationMode.DROP_N:
+            if self.protocol_mode.take_drop():
+                logger.info(f"({self.receiver.value}) Dropped message (remaining: {self.protocol_mode.drop_count})")
+                return
+            else:
+                self.protocol_mode.set_mode(EmulationMode.ACK)
+
+        # DELAY mode: reply from a timer, keep reading and parsing meanwhile
+        reply_delay = 0
+        if current_mode == EmulationMode.DELAY_N:
+            reply_delay = self.protocol_mode.delay_seconds
+            logger.info(f"({self.receiver.value}) Delaying response by {reply_delay}s")
+
+        # Claim the reply mode atomically (shared across worker processes)
+        if self.protocol_mode.claim_packet() == EmulationMode.NAK:
+            nak = convert_sia_nak(**parsed, timestamp=timestamp, key=key)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, partial(sia.response_label, nak), nak.strip)
+            session.send(nak.encode() if isinstance(nak, str) else nak, reply_delay)
+        else:
+            ack = convert_sia_ack(**parsed, timestamp=timestamp, key=key)
+            log_traffic(TRAFFIC_OUT, proto, client_ip, partial(sia.response_label, ack), ack.strip)
+            session.send(ack.encode() if isinstance(ack, str) else ack, reply_delay)
@@ -0,0 +1,199 @@
+import re
+from typing import Dict, List, Optional
+
+from protocols.sia_dc09.parser import parse_sia_message
+
+_PHOTO_PREFIXES = ('https://i.ajax.systems/s/', 'https://ajax-cdn-prod.s3.')
+_SIA_DCS_CODE = re.compile(r'[A-Z]{2}')
+_ADM_CID_CODE = re.compile(r'\|(\d{4})\s')
+
+
+def classify_v_link(link: str) -> str:
+    if link.startswith(_PHOTO_PREFIXES) or '.jpg' in link or '/image_' in link:
+        return 'PHOTO'
+    if link.startswith('https://web.ajax.systems'):
+        return 'WEB'
+    if link.startswith('ajax-pro-desktop://'):
+        return 'DESKTOP'
+    return 'LINK'
+
+
+class SIAMessage:
+    """
+    One incoming SIA DC-09 frame, tokenized once.
+
+    Holds the header fields and event code, so the reply reuses one parse
+    instead of re-scanning the frame with several regexes. The classified
+    [V...] links and the masked log text are scanned on first access, so
+    only label and log consumers pay for them.
+    """
+
+    __slots__ = (
+        "raw",
+        "message_type",
+        "sequence",
+        "receiver",
+        "line",
+        "account",
+        "event_code",
+        "_photo_links",
+        "_web_links",
+        "_desktop_links",
+        "_other_links",
+        "_log_text",
+        "_label",
+    )
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        header = parse_sia_message(raw)
+        self.sequence = header["sequence"]
+        self.receiver = header["receiver"]
+        self.line = header["line"]
+        self.account = header["account"]
+
+        # Message type is the first quoted token: "NULL", "ADM-CID", "SIA-DCS", ...
+        q1 = raw.find('"')
+        q2 = raw.find('"', q1 + 1) if q1 >= 0 else -1
+        self.message_type = raw[q1 + 1:q2] if q2 > q1 else ""
+
+        self.event_code = self._event_code(q2)
+        self._photo_links: List[str] = []
+        self._web_links: List[str] = []
+        self._desktop_links: List[str] = []
+        self._other_links: List[str] = []
+        self._log_text: Optional[str] = None
+        self._label: Optional[str] = None
+
+    @property
+    def photo_links(self) -> List[str]:
+        self._ensure_scanned()
+        return self._photo_links
+
+    @property
+    def web_links(self) -> List[str]:
+        self._ensure_scanned()
+        return self._web_links
+
+    @property
+    def desktop_links(self) -> List[str]:
+        self._ensure_scanned()
+        return self._desktop_links
+
+    @property
+    def other_links(self) -> List[str]:
+        self._ensure_scanned()
+        return self._other_links
+
+    @property
+    def log_text(self) -> str:
+        """Frame text with every photo link but the first per [V...] block masked."""
+        self._ensure_scanned()
+        return self._log_text
+
+    @property
+    def is_ping(self) -> bool:
+        return self.message_type == "NULL"
+
+    @property
+    def label(self) -> str:
+        """Incoming label: PING, EVENT <code>, PHOTO <code> xN, WEB_LINK/DESKTOP_LINK/LINK <code>, UNKNOWN."""
+        if self._label is None:
+            self._label = self._build_label()
+        return self._label
+
+    def response_label(self, response: str) -> str:
+        # '"ACK"' or encrypted '"*ACK"'
+        if 'ACK"' in response:
+            return f"ACK {self.label}" if self.label != "UNKNOWN" else "ACK"
+        if 'NAK"' in response:
+            return f"NAK {self.label}" if self.label != "UNKNOWN" else "NAK"
+        return "RESPONSE"
+
+    def reply_fields(self) -> Dict[str, str]:
+        """Header fields echoed back by convert_sia_ack / convert_sia_nak."""
+        return {
+            "sequence": self.sequence,
+            "receiver": self.receiver,
+            "line": self.line,
+            "account": self.account,
+        }
+
+    # ---------- tokenizer ----------
+
+    def _event_code(self, body_start: int) -> Optional[str]:
+        if self.message_type == "SIA-DCS":
+            match = _SIA_DCS_CODE.search(self.raw, body_start + 1)
+            return match.group(0) if match else None
+        if self.message_type == "ADM-CID":
+            match = _ADM_CID_CODE.search(self.raw)
+            return match.group(1) if match else None
+        return None
+
+    def _ensure_scanned(self) -> None:
+        if self._log_text is None:
+            self._log_text = self._scan_links().strip()
+
+    def _scan_links(self) -> str:
+        """
+        Walk every [V...] block once: classify its links and build the log text,
+        which keeps only the first photo link per block ([PHOTO_URL] for the rest).
+        """
+        raw = self.raw
+        pieces = []
+        copied = 0
+        pos = 0
+        while True:
+            start = raw.find('[V', pos)
+            if start < 0:
+                break
+            end = raw.find(']', start + 2)
+            if end < 0:
+                break
+            pos = end + 1
+            if end == start + 2:
+                continue
+
+            parts = [part.strip() for part in raw[start + 2:end].split(',')]
+            masked = []
+            seen_photos = 0
+            for part in parts:
+                kind = classify_v_link(part)
+                if kind == 'PHOTO':
+                    self._photo_links.append(part)
+                    masked.append(part if seen_photos == 0 else " [PHOTO_URL]")
+                    seen_photos += 1
+                    continue
+                if kind == 'WEB' and not self._web_links:
+                    self._web_links.append(part)
+                elif kind == 'DESKTOP' and not self._desktop_links:
+                    self._desktop_links.append(part)
+                elif kind == 'LINK' and not self._other_links:
+                    self._other_links.append(part)
+                masked.append(part)
+
+            if seen_photos:
+                pieces.append(raw[copied:start])
+                pieces.append("[V" + ','.join(masked) + "]")
+                copied = pos
+
+        if not pieces:
+            return raw
+        pieces.append(raw[copied:])
+        return ''.join(pieces)
+
+    def _build_label(self) -> str:
+        if self.message_type == "NULL":
+            return "PING"
+        if self.message_type not in ("SIA-DCS", "ADM-CID"):
+            return "UNKNOWN"
+        code = self.event_code
+        if self.photo_links:
+            return f"PHOTO {code} x{len(self.photo_links)}"
+        if self.web_links:
+            return f"WEB_LINK {code}"
+        if self.desktop_links:
+            return f"DESKTOP_LINK {code}"
+        if self.other_links:
+            return f"LINK {code}"
+        return f"EVENT {code}"
@@ -1,14 +1,16 @@
 import re
-from typing import Union, Dict
+from typing import Union, Dict, Optional
+from utils.crc import crc16_arc
 from utils.logger import logger
 
 # Compile regex to capture SIA-DC09 header fields (supports ADM-CID with hex length)
 SIA_HEADER_PATTERN = re.compile(
     r'^(?P<crc>[A-F0-9]{4})'                     # CRC (4 hex chars)
     r'(?P<length>[A-F0-9]{4})"'                  # Length (4 hex chars) + "
-    r'(?P<message_type>ACK|NAK|NULL|ADM-CID)"'   # Message type
+    r'(?P<message_type>\*?(?:ACK|NAK|NULL|ADM-CID|SIA-DCS))"'  # Message type, '*' = encrypted
     r'(?P<sequence>\d{4})'                       # Sequence number (4 digits)
-    r'(?P<line>L\d)'                             # Line, e.g. L0
+    r'(?P<receiver>R[0-9A-F]{1,6})?'             # Optional receiver, e.g. R0
+    r'(?P<line>L[0-9A-F]{1,6})'                  # Line, e.g. L0
     r'#(?P<account>[^[]*)'                       # Account: anything up to '['
 )
 
@@ -36,13 +38,14 @@ def parse_sia_message(message: Union[str, bytes]) -> Dict[str, str]:
             result.update({
                 "sequence": match.group("sequence"),
                 "line":     match.group("line"),
+                "receiver": match.group("receiver") or "R0",
                 "account":  (match.group("account") or "000").strip(),
             })
         else:
             # Low-noise trace log for rare debug sessions
-            logger.trace(f"(SIA_DC09) Header regex did not match message: {msg}")
+            logger.debug(f"(SIA_DC09) Header regex did not match message: {msg}")
     except Exception as e:
-        logger.trace(f"(SIA_DC09) Header parse error: {e}; raw: {msg}")
+        logger.debug(f"(SIA_DC09) Header parse error: {e}; raw: {msg}")
 
     # Extra fallbacks to extract sequence when header regex didn't match
     if result["sequence"] == "0000":
@@ -59,3 +62,25 @@ def parse_sia_message(message: Union[str, bytes]) -> Dict[str, str]:
 def is_ping(message: str) -> bool:
     # Keep simple ping detection by literal "NULL"
     return '"NULL"' in message
+
+def check_sia_frame(message: str) -> Optional[str]:
+    """
+    Validate the CRC and 0LLL length of one DC-09 frame (CR already stripped).
+    Returns None when both match, otherwise a short reason for the log.
+    """
+    msg = message.lstrip("\n")
+    if len(msg) < 9 or msg[8] != '"':
+        return "Malformed SIA header"
+    try:
+        crc = int(msg[:4], 16)
+        length = int(msg[4:8], 16)
+    except ValueError:
+        return "Malformed SIA header"
+
+    body = msg[8:].encode()
+    if length != len(body):
+        return f"SIA length mismatch (got {msg[4:8]}, expected {len(body):04X})"
+    expected = crc16_arc(body)
+    if crc != expected:
+        return f"SIA CRC mismatch (got {msg[:4]}, expected {expected:04X})"
+    return None
@@ -1,6 +1,33 @@
 from datetime import datetime
 from typing import Optional
 
+from protocols.sia_dc09.crypto import encrypt_block
+from utils.crc import crc16_arc
+
+
+def frame_sia(body: str) -> str:
+    """Prefix a DC-09 body ('"ACK"...' up to, not including, CR) with its CRC and 0LLL length."""
+    data = body.encode()
+    return f"{crc16_arc(data):04X}{len(data):04X}{body}\r"
+
+
+def _build_reply(
+    kind: str,
+    sequence: str,
+    receiver: str,
+    line: str,
+    area: str,
+    account: str,
+    timestamp: Optional[str],
+    key: Optional[str],
+) -> str:
+    if timestamp is None:
+        timestamp = datetime.now().strftime("%H:%M:%S,%m-%d-%Y")
+    if key is None:
+        return frame_sia(f'"{kind}"{sequence}{receiver}{line}{area}#{account}[]_{timestamp}')
+    # Encrypted reply: "*ACK"...[ followed by hex of AES(pad + "]_" + timestamp)
+    return frame_sia(f'"*{kind}"{sequence}{receiver}{line}{area}#{account}[{encrypt_block(f"]_{timestamp}", key)}')
+
 
 def convert_sia_ack(
     sequence: str = "0000",
@@ -9,10 +36,9 @@ def convert_sia_ack(
     area: str = "A0",
     account: str = "acct",
     timestamp: Optional[str] = None,
+    key: Optional[str] = None,
 ) -> str:
-    if timestamp is None:
-        timestamp = datetime.now().strftime("%H:%M:%S,%m-%d-%Y")
-    return f'4AA90LLL"ACK"{sequence}{receiver}{line}{area}#{account}[]_{timestamp}\r'
+    return _build_reply("ACK", sequence, receiver, line, area, account, timestamp, key)
 
 
 def convert_sia_nak(
@@ -22,12 +48,18 @@ def convert_sia_nak(
     area: str = "A0",
     account: str = "acct",
     timestamp: Optional[str] = None,
+    key: Optional[str] = None,
 ) -> str:
-    if timestamp is None:
-        timestamp = datetime.now().strftime("%H:%M:%S,%m-%d-%Y")
+    return _build_reply("NAK", sequence, receiver, line, area, account, timestamp, key)
+
 
-    crc = "4B89"
-    lll = "007B"
-    msg_id = "0001"
-    body = f'"NAK"{sequence}{receiver}{line}{area}#{account}[]_{timestamp}'
-    return f"{crc}{lll}{msg_id}{body}\r"
+def convert_sia_duh(
+    sequence: str = "0000",
+    receiver: str = "R0",
+    line: str = "L0",
+    area: str = "A0",
+    account: str = "acct",
+    timestamp: Optional[str] = None,
+) -> str:
+    """DUH: the receiver could not handle the frame (e.g. no key to decrypt it)."""
+    return _build_reply("DUH", sequence, receiver, line, area, account, timestamp, None)
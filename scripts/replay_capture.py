@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+from core.replay import DEFAULT_REPLY_TIMEOUT, load_capture, log_report, replay
+from utils.config_loader import get_port
+from utils.logger import logger
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replay captured client traffic against a running emulator and compare the replies."
+    )
+    parser.add_argument("paths", nargs="+", help="Capture segments (.cap) or directories holding them")
+    parser.add_argument("--host", default="127.0.0.1", help="Emulator host (default: 127.0.0.1)")
+    parser.add_argument(
+        "--protocol",
+        help="Replay only the connections captured for this protocol (e.g. SIA_DCS)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Emulator port (default: the configured port of each captured protocol; "
+        "only for a single protocol)",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Time scale: 1 = original pacing, 10 = ten times faster, 0 = as fast as possible (default: 1)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_REPLY_TIMEOUT,
+        help=f"Seconds to wait for missing replies after the last send (default: {DEFAULT_REPLY_TIMEOUT:g})",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Compare replies byte for byte, without masking per-run fields (SIA timestamps, Manitou RawNo)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    protocols, connections = load_capture(args.paths)
+    if args.protocol:
+        protocols = [p for p in protocols if p.lower() == args.protocol.lower()]
+        connections = [c for c in connections if c.protocol in protocols]
+    if not connections:
+        logger.error("[REPLAY] No captured connections found")
+        return 1
+    if args.port and len(protocols) > 1:
+        logger.error(
+            f"[REPLAY] --port needs a single protocol, the capture holds {', '.join(protocols)}; "
+            f"select one with --protocol"
+        )
+        return 1
+    try:
+        ports = {p: args.port or get_port(p) for p in protocols}
+    except ValueError as e:
+        logger.error(f"[REPLAY] {e}; pass --port")
+        return 1
+    for name, port in ports.items():
+        count = sum(c.protocol == name for c in connections)
+        logger.info(f"[REPLAY] {count} {name} connection(s) -> {args.host}:{port}")
+    report = asyncio.run(replay(connections, args.host, ports, speed=args.speed, reply_timeout=args.timeout, exact=args.exact))
+    log_report(report)
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
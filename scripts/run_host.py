@@ -0,0 +1,41 @@
+import time
+STARTED_AT = time.perf_counter()
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import asyncio
+from core.host import available_receivers, resolve_receivers, run_host, run_workers
+from utils.logger import logger
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run several CMS receiver emulators in one process.")
+    parser.add_argument(
+        "protocols",
+        nargs="*",
+        default=["all"],
+        help=f"Protocols to start (default: all). Choices: {', '.join(r.value.lower() for r in available_receivers())}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes sharing each port via SO_REUSEPORT (default: 1)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    receivers = resolve_receivers(args.protocols)
+    logger.info(f"Launching multi-protocol host: {', '.join(r.value for r in receivers)}")
+    if args.workers > 1:
+        run_workers(receivers, args.workers, started_at=STARTED_AT)
+    else:
+        asyncio.run(run_host(receivers, started_at=STARTED_AT))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+
+from core.buffered_transport import ReceiveBuffer
+from core.connection_handler import BaseProtocol, start_server
+
+
+class FrameProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self):
+        super().__init__(receiver="dummy")
+        self.chunks = []
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session=None):
+        self.chunks.append(data)
+        writer.write(b"ACK" * data.count(b"\r"))
+        await writer.drain()
+
+
+def test_receive_buffer_compacts_and_grows():
+    rbuf = ReceiveBuffer(size=8192)
+    view = rbuf.writable()
+    view[:6] = b"abc\rde"
+    rbuf.advance(6)
+
+    assert rbuf.find(b"\r") == 3
+    assert rbuf.take(4) == b"abc\r"
+    assert bytes(rbuf.view()) == b"de"
+
+    # Not enough room after the unconsumed tail: data is kept, offsets move
+    rbuf.writable(16 * 1024)
+    assert rbuf.start == 0
+    assert rbuf.capacity >= 16 * 1024
+    assert bytes(rbuf.view()) == b"de"
+
+
+@pytest.mark.asyncio
+async def test_buffered_engine_hands_over_complete_frames_only():
+    loop = asyncio.get_running_loop()
+    protocol = FrameProtocol()
+    protocol.port = 9997
+
+    server_task = loop.create_task(start_server(protocol, engine="buffered"))
+    await asyncio.sleep(0.1)
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", 9997)
+    writer.write(b"first\rsec")
+    await writer.drain()
+    await asyncio.sleep(0.05)
+    writer.write(b"ond\r")
+    await writer.drain()
+
+    data = await reader.readexactly(6)
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.1)
+
+    assert data == b"ACKACK"
+    assert b"".join(protocol.chunks) == b"first\rsecond\r"
+    assert all(chunk.endswith(b"\r") for chunk in protocol.chunks)
+
+    server_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await server_task
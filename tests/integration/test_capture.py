@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+
+from core.capture import (
+    CAPTURE_CLOSE,
+    CAPTURE_IN,
+    CAPTURE_OPEN,
+    CAPTURE_OUT,
+    CaptureWriter,
+    iter_records,
+    read_segment_header,
+)
+from core.connection_handler import BaseProtocol, start_server
+
+
+class EchoAckProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self):
+        super().__init__(receiver="dummy")
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session=None):
+        writer.write(b"ACK" * data.count(b"\r"))
+        await writer.drain()
+
+
+def test_capture_writer_roundtrip(tmp_path):
+    capture = CaptureWriter(tmp_path, "dummy", 1234)
+    conn_id = capture.open_connection("127.0.0.1:5000")
+    capture.record(conn_id, CAPTURE_IN, b"hello\r")
+    capture.record(conn_id, CAPTURE_OUT, b"ACK")
+    capture.close_connection(conn_id)
+    capture.close()
+
+    assert len(capture.segments) == 1
+    with open(capture.segments[0], "rb") as f:
+        assert read_segment_header(f.read())[0] == "dummy"
+    records = list(iter_records(capture.segments[0]))
+    assert [(r.conn_id, r.direction, r.data) for r in records] == [
+        (conn_id, CAPTURE_OPEN, b"127.0.0.1:5000"),
+        (conn_id, CAPTURE_IN, b"hello\r"),
+        (conn_id, CAPTURE_OUT, b"ACK"),
+        (conn_id, CAPTURE_CLOSE, b""),
+    ]
+    assert records[0].timestamp <= records[-1].timestamp
+    # Closed writers drop instead of raising
+    capture.record(conn_id, CAPTURE_IN, b"late")
+    assert capture.dropped == 1
+
+
+def test_capture_writer_rotates_and_prunes_segments(tmp_path):
+    # One record per buffer, so segments rotate between them
+    capture = CaptureWriter(tmp_path, "dummy", segment_size=256, max_segments=2, buffer_size=128)
+    for i in range(20):
+        capture.record(1, CAPTURE_IN, bytes([i]) * 100)
+    capture.close()
+
+    files = sorted(tmp_path.glob("*.cap"))
+    assert len(files) == 2
+    assert files == sorted(capture.segments)
+    payloads = [r.data for path in files for r in iter_records(path)]
+    assert payloads[-1] == bytes([19]) * 100
+
+
+def test_records_larger_than_a_buffer_keep_their_order(tmp_path):
+    capture = CaptureWriter(tmp_path, "dummy", buffer_size=64)
+    payloads = [b"small", b"x" * 500, b"tail"]
+    for data in payloads:
+        capture.record(1, CAPTURE_IN, data)
+    capture.close()
+
+    assert [r.data for r in iter_records(capture.segments[0])] == payloads
+    assert capture.dropped == 0
+
+
+def test_records_over_max_pending_are_dropped(tmp_path):
+    capture = CaptureWriter(tmp_path, "dummy", buffer_size=64, max_pending=0)
+    capture.record(1, CAPTURE_IN, b"x" * 500)
+    capture.close()
+    assert capture.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_partial_buffer_is_written_after_flush_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.capture.FLUSH_INTERVAL", 0.01)
+    capture = CaptureWriter(tmp_path, "dummy")
+    capture.record(1, CAPTURE_IN, b"idle")
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if capture.segments and list(iter_records(capture.segments[0])):
+            break
+    assert [r.data for r in iter_records(capture.segments[0])] == [b"idle"]
+    capture.close()
+
+
+def test_iter_records_stops_at_truncated_tail(tmp_path):
+    capture = CaptureWriter(tmp_path, "dummy")
+    capture.record(1, CAPTURE_IN, b"complete")
+    capture.record(1, CAPTURE_IN, b"cut short")
+    capture.close()
+
+    path = capture.segments[0]
+    path.write_bytes(path.read_bytes()[:-4])
+    assert [r.data for r in iter_records(path)] == [b"complete"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine, port", [("streams", 9995), ("buffered", 9994)])
+async def test_server_captures_connection_traffic(tmp_path, engine, port):
+    loop = asyncio.get_running_loop()
+    protocol = EchoAckProtocol()
+    protocol.port = port
+    protocol.capture = CaptureWriter(tmp_path, "dummy", port)
+
+    server_task = loop.create_task(start_server(protocol, engine=engine))
+    await asyncio.sleep(0.1)
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"one\rtwo\r")
+    await writer.drain()
+    reply = await reader.readexactly(6)
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.1)
+    server_task.cancel()
+    protocol.capture.close()
+
+    assert reply == b"ACKACK"
+    records = [r for path in protocol.capture.segments for r in iter_records(path)]
+    assert records[0].direction == CAPTURE_OPEN
+    assert records[-1].direction == CAPTURE_CLOSE
+    assert len({r.conn_id for r in records}) == 1
+    assert b"".join(r.data for r in records if r.direction == CAPTURE_IN) == b"one\rtwo\r"
+    assert b"".join(r.data for r in records if r.direction == CAPTURE_OUT) == b"ACKACK"
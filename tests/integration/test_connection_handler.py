@@ -10,7 +10,7 @@ class DummyProtocol(BaseProtocol):
         super().__init__(receiver="dummy")
         self.received_messages = []
 
-    async def handle(self, reader, writer, client_ip, client_port, message: str):
+    async def handle(self, reader, writer, client_ip, client_port, message: str, session=None):
         self.received_messages.append((client_ip, message))
         writer.write(f"ACK:{message}".encode())
         await writer.drain()
@@ -44,3 +44,49 @@ async def test_tcp_server_receives_data():
     server_task.cancel()
     with pytest.raises(asyncio.CancelledError):
         await server_task
+
+
+class SessionProtocol(BaseProtocol):
+    def __init__(self):
+        super().__init__(receiver="dummy")
+        self.sessions = []
+        self.closed = []
+
+    async def handle(self, reader, writer, client_ip, client_port, message: bytes, session=None):
+        if session not in self.sessions:
+            self.sessions.append(session)
+        session.buffer += message
+        writer.write(b"ACK")
+        await writer.drain()
+
+    def close_session(self, session):
+        self.closed.append(bytes(session.buffer))
+        super().close_session(session)
+
+
+@pytest.mark.asyncio
+async def test_each_connection_gets_own_session():
+    loop = asyncio.get_running_loop()
+    protocol = SessionProtocol()
+    protocol.port = 9998
+
+    server_task = loop.create_task(start_server(protocol))
+    await asyncio.sleep(0.1)
+
+    for payload in (b"panel-1", b"panel-2"):
+        reader, writer = await asyncio.open_connection("127.0.0.1", 9998)
+        writer.write(payload)
+        await writer.drain()
+        await reader.read(4096)
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.sleep(0.1)
+
+    assert len(protocol.sessions) == 2
+    assert sorted(protocol.closed) == [b"panel-1", b"panel-2"]
+    assert all(s.buffer == b"" and s.state == {} for s in protocol.sessions)
+
+    server_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await server_task
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+
+from core.datagram_transport import create_datagram_endpoint
+from protocols.sia_dc09.handler import SIADC09Protocol
+from protocols.sia_dc09.parser import check_sia_frame
+from protocols.sia_dc09.responses import frame_sia
+
+
+class ReplyCollector(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.replies = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.replies.put_nowait(data)
+
+
+@pytest.mark.asyncio
+async def test_sia_datagram_gets_one_reply_per_frame():
+    loop = asyncio.get_running_loop()
+    protocol = SIADC09Protocol()
+    protocol.port = 9996
+    server = await create_datagram_endpoint(protocol, host="127.0.0.1")
+
+    client, collector = await loop.create_datagram_endpoint(ReplyCollector, remote_addr=("127.0.0.1", 9996))
+    for seq in (1, 2):
+        client.sendto(("\n" + frame_sia(f'"ADM-CID"000{seq}R0L0#1234[#1234|1130 01 001]')).encode())
+
+    replies = [await asyncio.wait_for(collector.replies.get(), 2) for _ in range(2)]
+    client.close()
+    server.close()
+
+    assert b'"ACK"0001' in replies[0]
+    assert b'"ACK"0002' in replies[1]
+    assert all(check_sia_frame(reply.decode().rstrip("\r")) is None for reply in replies)
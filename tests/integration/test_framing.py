@@ -0,0 +1,28 @@
+from core.framing import BufferedFramer
+
+
+def test_framer_resumes_scan_across_reads():
+    framer = BufferedFramer(b"</End>")
+    assert framer.feed(b"<A>1</E") == []
+    assert framer.feed(b"nd><A>2</End><A>") == [b"<A>1</End>", b"<A>2</End>"]
+    assert framer.pending() == b"<A>"
+
+
+def test_large_frame_in_small_reads_is_compacted():
+    payload = b"x" * (1024 * 1024)
+    data = b"<A>" + payload + b"</End>" + b"<B></End>"
+    framer = BufferedFramer(b"</End>")
+
+    frames = []
+    for offset in range(0, len(data), 4096):
+        frames += framer.feed(data[offset:offset + 4096])
+
+    assert frames == [b"<A>" + payload + b"</End>", b"<B></End>"]
+    assert len(framer) == 0
+
+
+def test_oversized_frame_is_discarded_until_next_terminator():
+    framer = BufferedFramer(b"\r", max_frame_size=8)
+    assert framer.feed(b"0123456789") == []
+    assert framer.discarded == 1
+    assert framer.feed(b"abc\rok\r") == [b"ok\r"]
@@ -0,0 +1,25 @@
+import pytest
+
+from core.host import available_receivers, resolve_receivers
+from utils.constants import Receiver
+
+
+def test_resolve_receivers_accepts_cli_names():
+    assert resolve_receivers(["sia-dcs", "MASXML", "masxml"]) == [Receiver.SIA_DCS, Receiver.MASXML]
+    assert resolve_receivers(["all"]) == available_receivers()
+
+
+def test_available_receivers_come_from_the_registry():
+    assert set(available_receivers()) == {
+        Receiver.SIA_DCS,
+        Receiver.MASXML,
+        Receiver.MANITOU,
+        Receiver.MICROKEY,
+        Receiver.SENTINEL,
+    }
+
+
+@pytest.mark.parametrize("name", ["cms", "unknown"])
+def test_resolve_receivers_rejects_unknown(name):
+    with pytest.raises(ValueError):
+        resolve_receivers([name])
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+
+from core.capture import CAPTURE_IN, CAPTURE_OUT, CaptureWriter
+from core.connection_handler import BaseProtocol, start_server
+from core.replay import load_capture, normalize_replies, replay
+from protocols.sia_dc09.responses import convert_sia_ack
+
+
+class AckProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self, reply: bytes = b"ACK"):
+        super().__init__(receiver="dummy")
+        self.reply = reply
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session=None):
+        session.send(self.reply * data.count(b"\r"))
+
+
+async def _serve(protocol, port):
+    protocol.port = port
+    task = asyncio.get_running_loop().create_task(start_server(protocol, engine="streams"))
+    await asyncio.sleep(0.1)
+    return task
+
+
+def test_load_capture_groups_records_by_connection(tmp_path):
+    capture = CaptureWriter(tmp_path, "dummy", 9999)
+    first = capture.open_connection("10.0.0.1:1000")
+    second = capture.open_connection("10.0.0.2:2000")
+    capture.record(first, CAPTURE_IN, b"a\r")
+    capture.record(second, CAPTURE_IN, b"b\r")
+    capture.record(first, CAPTURE_OUT, b"ACK")
+    capture.record(first, CAPTURE_IN, b"c\r")
+    capture.close_connection(first)
+    capture.close()
+
+    protocols, connections = load_capture([tmp_path])
+    assert protocols == ["dummy"]
+    assert [c.peer for c in connections] == ["10.0.0.1:1000", "10.0.0.2:2000"]
+    assert [data for _, data in connections[0].inbound] == [b"a\r", b"c\r"]
+    assert connections[0].expected == b"ACK"
+    assert connections[0].closed_at is not None
+    assert connections[1].closed_at is None
+
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_captured_session(tmp_path):
+    protocol = AckProtocol()
+    protocol.capture = CaptureWriter(tmp_path, "dummy", 9993)
+    server_task = await _serve(protocol, 9993)
+
+    for _ in range(2):
+        reader, writer = await asyncio.open_connection("127.0.0.1", 9993)
+        writer.write(b"one\r")
+        await reader.readexactly(3)
+        await asyncio.sleep(0.2)
+        writer.write(b"two\rthree\r")
+        await reader.readexactly(6)
+        writer.close()
+        await writer.wait_closed()
+    await asyncio.sleep(0.1)
+    protocol.capture.close()
+    server_task.cancel()
+
+    _, connections = load_capture([tmp_path])
+    assert len(connections) == 2
+
+    # Same replies from a fresh server; 10x speed keeps the 0.2s pauses short
+    target_task = await _serve(AckProtocol(), 9992)
+    report = await replay(connections, "127.0.0.1", 9992, speed=10)
+    assert report.ok
+    assert report.elapsed < 0.2
+    assert all(r.sent == len(b"one\rtwo\rthree\r") for r in report.results)
+    target_task.cancel()
+
+    # A server answering differently is reported, with where the replies diverge
+    nak_task = await _serve(AckProtocol(b"NAK"), 9991)
+    report = await replay(connections, "127.0.0.1", 9991, speed=0, reply_timeout=0.5)
+    assert report.matched == 0
+    assert report.results[0].mismatch_offset() == 0
+    assert bytes(report.results[0].received) == b"NAKNAKNAK"
+    nak_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_replay_sends_each_protocol_to_its_port(tmp_path):
+    for name, port in (("ALPHA", 9986), ("BETA", 9985)):
+        capture = CaptureWriter(tmp_path, name, port)
+        conn = capture.open_connection("10.0.0.1:1000")
+        capture.record(conn, CAPTURE_IN, b"ping\r")
+        capture.record(conn, CAPTURE_OUT, name.encode())
+        capture.close_connection(conn)
+        capture.close()
+
+    protocols, connections = load_capture([tmp_path])
+    assert sorted(protocols) == ["ALPHA", "BETA"]
+    assert sorted(c.protocol for c in connections) == ["ALPHA", "BETA"]
+
+    alpha_task = await _serve(AckProtocol(b"ALPHA"), 9984)
+    beta_task = await _serve(AckProtocol(b"BETA"), 9983)
+    report = await replay(connections, "127.0.0.1", {"ALPHA": 9984, "BETA": 9983}, speed=0)
+    assert report.ok
+    alpha_task.cancel()
+    beta_task.cancel()
+
+
+def test_volatile_reply_fields_are_masked():
+    first = convert_sia_ack(sequence="0001", account="1234", timestamp="12:00:00,01-01-2025").encode()
+    second = convert_sia_ack(sequence="0001", account="1234", timestamp="12:00:07,01-01-2025").encode()
+    assert first != second
+    assert normalize_replies("SIA_DCS", first) == normalize_replies("SIA_DCS", second)
+    # Another sequence still differs
+    third = convert_sia_ack(sequence="0002", account="1234", timestamp="12:00:00,01-01-2025").encode()
+    assert normalize_replies("SIA_DCS", first) != normalize_replies("SIA_DCS", third)
+
+    ack = b'\x02<?xml version="1.0"?><Ack><RawNo>ER9ReRiXVWRl</RawNo></Ack>\x03'
+    assert normalize_replies("MANITOU", ack) == b'\x02<?xml version="1.0"?><Ack><RawNo>?</RawNo></Ack>\x03'
+    assert normalize_replies("MASXML", ack) == ack
+
+
+class StampedAckProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self, timestamp: str):
+        super().__init__(receiver="SIA_DCS")
+        self.timestamp = timestamp
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session=None):
+        for _ in range(data.count(b"\r")):
+            session.send(convert_sia_ack(sequence="0001", account="1234", timestamp=self.timestamp).encode())
+
+
+@pytest.mark.asyncio
+async def test_replay_ignores_sia_timestamps_unless_exact(tmp_path):
+    protocol = StampedAckProtocol("12:00:00,01-01-2025")
+    protocol.capture = CaptureWriter(tmp_path, "SIA_DCS", 9988)
+    server_task = await _serve(protocol, 9988)
+    reader, writer = await asyncio.open_connection("127.0.0.1", 9988)
+    writer.write(b"event\r")
+    await reader.readuntil(b"\r")
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.1)
+    protocol.capture.close()
+    server_task.cancel()
+
+    _, connections = load_capture([tmp_path])
+    target_task = await _serve(StampedAckProtocol("13:30:00,02-01-2025"), 9987)
+    assert (await replay(connections, "127.0.0.1", 9987, speed=0)).ok
+    exact = await replay(connections, "127.0.0.1", 9987, speed=0, exact=True)
+    assert exact.matched == 0
+    target_task.cancel()
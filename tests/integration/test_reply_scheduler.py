@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+
+from core.connection_handler import BaseProtocol, start_server
+from core.reply_scheduler import ReplyScheduler
+from core.session import ConnectionSession
+
+
+class FakeWriter:
+    def __init__(self):
+        self.sent = []
+        self.calls = 0
+
+    def writelines(self, data):
+        self.calls += 1
+        self.sent.extend(data)
+
+    def is_closing(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_preserve_ordering_queues_immediate_reply_behind_delayed():
+    writer = FakeWriter()
+    replies = ReplyScheduler(writer, ordering="preserve")
+
+    replies.send(b"first", delay=0.05)
+    replies.send(b"second")
+    replies.flush()
+    assert writer.sent == []
+
+    await replies.wait_idle(timeout=1)
+    assert writer.sent == [b"first", b"second"]
+
+
+@pytest.mark.asyncio
+async def test_ready_ordering_sends_each_reply_when_due():
+    writer = FakeWriter()
+    replies = ReplyScheduler(writer, ordering="ready")
+
+    replies.send(b"slow", delay=0.05)
+    replies.send(b"fast", delay=0.01)
+    replies.send(b"now")
+    replies.flush()
+    assert writer.sent == [b"now"]
+
+    await replies.wait_idle(timeout=1)
+    assert writer.sent == [b"now", b"fast", b"slow"]
+
+
+@pytest.mark.asyncio
+async def test_delay_is_not_multiplied_by_pipelined_events():
+    loop = asyncio.get_running_loop()
+    writer = FakeWriter()
+    replies = ReplyScheduler(writer)
+
+    started = loop.time()
+    for index in range(10):
+        replies.send(b"ACK%d" % index, delay=0.1)
+    await replies.wait_idle(timeout=2)
+
+    assert len(writer.sent) == 10
+    assert loop.time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_replies_from_one_read_are_flushed_in_one_write():
+    writer = FakeWriter()
+    replies = ReplyScheduler(writer)
+
+    for index in range(12):
+        replies.send(b"ACK%d" % index)
+    assert writer.sent == []
+
+    assert replies.flush() == 12
+    assert replies.flush() == 0
+    assert writer.calls == 1
+    assert writer.sent == [b"ACK%d" % index for index in range(12)]
+
+
+@pytest.mark.asyncio
+async def test_finish_replies_gives_up_on_a_stuck_delayed_reply():
+    loop = asyncio.get_running_loop()
+    writer = FakeWriter()
+    session = ConnectionSession("127.0.0.1", 1000, writer=writer)
+
+    session.send(b"NAK")
+    session.send(b"ACK", delay=30)
+    started = loop.time()
+    await session.finish_replies(peer_gone=False, timeout=0.1)
+
+    # Immediate replies are written, the 30s one does not hold the close
+    assert writer.sent == [b"NAK"]
+    assert loop.time() - started < 0.5
+
+
+class DelayedAckProtocol(BaseProtocol):
+    frame_delimiter = b"\r"
+
+    def __init__(self):
+        super().__init__(receiver="dummy")
+        self.closed = asyncio.Event()
+
+    async def handle(self, reader, writer, client_ip, client_port, data: bytes, session=None):
+        session.send(b"ACK", delay=30)
+
+    def close_session(self, session):
+        super().close_session(session)
+        self.closed.set()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine, port", [("streams", 9990), ("buffered", 9989)])
+async def test_disconnected_peer_does_not_wait_for_delayed_replies(engine, port):
+    loop = asyncio.get_running_loop()
+    protocol = DelayedAckProtocol()
+    protocol.port = port
+    server_task = loop.create_task(start_server(protocol, engine=engine))
+    await asyncio.sleep(0.1)
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"event\r")
+    await writer.drain()
+    await asyncio.sleep(0.05)
+    writer.close()
+    await writer.wait_closed()
+
+    # The 30s reply is dropped and the session closed as soon as the peer leaves
+    await asyncio.wait_for(protocol.closed.wait(), timeout=1)
+    server_task.cancel()
@@ -0,0 +1,26 @@
+from protocols.manitou.framing import StxEtxFramer
+
+SIGNAL = b'\x02<Signal Event="BA"/>\x03'
+
+
+def test_frames_split_on_etx_and_start_at_stx():
+    framer = StxEtxFramer()
+    assert framer.feed(b"\r\n" + SIGNAL + SIGNAL[:5]) == [SIGNAL]
+    assert framer.feed(SIGNAL[5:] + b"<Ping/>\x03") == [SIGNAL, b"<Ping/>\x03"]
+
+
+def test_byte_at_a_time_delivery():
+    framer = StxEtxFramer()
+    frames = []
+    for byte in SIGNAL * 3:
+        frames += framer.feed(bytes([byte]))
+    assert frames == [SIGNAL] * 3
+    assert len(framer) == 0
+
+
+def test_oversized_garbage_is_dropped():
+    framer = StxEtxFramer(max_frame_size=16)
+    assert framer.feed(b"\x02" + b"g" * 32) == []
+    assert framer.discarded == 1
+    assert len(framer) <= 16
+    assert framer.feed(b"more garbage\x03" + SIGNAL) == [SIGNAL]
@@ -0,0 +1,61 @@
+import pytest
+
+from protocols.manitou.parser import ManitouFrame, parse_manitou_message, sanitize_for_log
+
+SIGNAL = (
+    b'\x02<Signal Event="BA" EvType="1"><Area>1</Area><AreaInfo>Home</AreaInfo>'
+    b'<Zone>3</Zone><PointID>7</PointID><URL>http://x/y.jpg</URL></Signal>\x03'
+)
+BINARY = (
+    b'\x02<Binary Ext="jpg" RawNo="ABC123" FrameNo="2" Length="9">'
+    b'<Data Length="12">QUJD\r\nREVG\nR0hJ</Data></Binary>\x03'
+)
+HEARTBEAT = b'\x02<Heartbeat Passkey="secret"/>\x03'
+
+
+def test_signal_frame_fields():
+    frame = ManitouFrame(SIGNAL)
+    assert frame.kind == "signal"
+    assert not frame.is_ping and not frame.is_binary
+    assert frame.fields == {
+        "type": "signal", "evtype": "1", "event_code": "BA", "area": "1", "area_info": "Home",
+        "zone": "3", "point_id": "7", "url": "http://x/y.jpg",
+    }
+    assert frame.label == ("EVENT BA", "")
+
+
+def test_binary_frame_data_and_sanitized_text():
+    frame = ManitouFrame(BINARY)
+    assert frame.kind == "binary"
+    assert frame.get("rawno") == "ABC123" and frame.get("frame_no") == "2"
+    assert frame.get("length") == "9" and frame.get("data_len") == "12"
+    assert frame.data == "QUJDREVGR0hJ"
+    assert frame.sanitized == (
+        '<Binary Ext="jpg" RawNo="ABC123" FrameNo="2" Length="9">'
+        '<Data Length="12">[BINARY REDACTED len=12]</Data></Binary>'
+    )
+    assert frame.label == ("PHOTO jpg", "RawNo=ABC123 Frame=2 Len=9")
+    assert sanitize_for_log(BINARY) == frame.sanitized
+
+
+def test_heartbeat_passkey():
+    frame = ManitouFrame(HEARTBEAT)
+    assert frame.is_ping and frame.kind == "unknown"
+    assert frame.passkey == "secret"
+    assert frame.label == ("PING AUTH", "Passkey=secret")
+    assert ManitouFrame(b"\x02<MessageType>heartbeat</MessageType>\x03").label == ("PING", "")
+    assert ManitouFrame(BINARY).passkey is None
+    with pytest.raises(AttributeError):
+        frame.passkey = "other"
+
+
+def test_parse_manitou_message_keeps_dict_shape():
+    parsed = parse_manitou_message(BINARY)
+    assert parsed["type"] == "binary"
+    assert parsed["raw_text"].endswith("[BINARY REDACTED len=12]</Data></Binary>")
+
+
+def test_frame_is_immutable():
+    frame = ManitouFrame(SIGNAL)
+    with pytest.raises(AttributeError):
+        frame.text = "other"
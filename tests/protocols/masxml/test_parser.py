@@ -0,0 +1,54 @@
+from protocols.masxml.parser import parse_masxml_frame
+
+
+def test_parse_heartbeat(example_masxml_heartbeat):
+    msg = parse_masxml_frame(example_masxml_heartbeat.encode())
+
+    assert msg.is_ping
+    assert msg.sequence == "100"
+    assert msg.label == "PING"
+    assert msg.response_label(0) == "ACK PING"
+
+
+def test_parse_event_key_values(example_masxml_ajax):
+    msg = parse_masxml_frame(b"\n" + example_masxml_ajax.encode())
+
+    assert msg.error is None
+    assert msg.message_type == "AJAX"
+    assert msg.sequence == "101"
+    assert msg.fields == {"Account": "ABCDEF1234", "EventCode": "E120", "Area": "1", "User": "0"}
+    assert msg.label == "EVENT E120"
+    assert msg.response_label(10) == "NAK EVENT E120"
+
+
+def test_payload_data_is_a_span_of_the_raw_frame():
+    b64 = b"QUJD" * 1000
+    frame = (
+        b"<?xml version='1.0' encoding='UTF-8'?><XMLMessageClass><MessageType>AJAX</MessageType>"
+        b"<MessageSequenceNo>7</MessageSequenceNo><Payload><PayloadID>42</PayloadID>"
+        b"<PacketNumber>2</PacketNumber><FileName>3_photo.jpg</FileName><LastFile>True</LastFile>"
+        b"<PacketData>" + b64 + b"</PacketData></Payload></XMLMessageClass>"
+    )
+    msg = parse_masxml_frame(frame)
+
+    assert msg.packet_data == b64
+    assert msg.payload.payload_id == "42"
+    assert msg.payload.last_file is True
+    assert msg.payload.index == 3
+    assert msg.label == "PHOTO AJAX"
+    assert "[PHOTO BASE64, len=4000]" in msg.display_text()
+
+
+def test_malformed_frame_keeps_sequence():
+    msg = parse_masxml_frame(b"<XMLMessageClass><MessageSequenceNo>5</MessageSequenceNo><Oops></XMLMessageClass>")
+
+    assert msg.error
+    assert msg.sequence == "5"
+
+
+def test_sequence_must_be_digits():
+    msg = parse_masxml_frame(b"<XMLMessageClass><MessageSequenceNo>12a</MessageSequenceNo></XMLMessageClass>")
+    assert msg.sequence is None
+
+    msg = parse_masxml_frame(b"<XMLMessageClass><MessageSequenceNo> 7 </MessageSequenceNo></XMLMessageClass>")
+    assert msg.sequence is None
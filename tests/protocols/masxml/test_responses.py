@@ -0,0 +1,26 @@
+import pytest
+from xml.etree.ElementTree import Element, SubElement
+
+from protocols.masxml.responses import _prettify_xml, convert_masxml_ack, convert_masxml_nak
+
+
+def _reference(seq: str, code: str, text: str) -> str:
+    root = Element("AckNakClass")
+    SubElement(root, "MessageSequenceNo").text = seq
+    SubElement(root, "ResultCode").text = code
+    SubElement(root, "ResultText").text = text
+    return _prettify_xml(root).encode()
+
+
+def test_ack_matches_minidom_output(example_masxml_ajax):
+    assert convert_masxml_ack(example_masxml_ajax) == _reference("101", "0", "ok")
+    assert convert_masxml_ack(sequence="7") == _reference("7", "0", "ok")
+    assert convert_masxml_ack("<no sequence/>") == _reference("0000", "0", "ok")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["Poorly formed XML", "", "a&b<c>\"d'e", "x\r\ny\rz\n", "  padded  ", "ü€ unicode", "\t"],
+)
+def test_nak_matches_minidom_output(text):
+    assert convert_masxml_nak(sequence="42", text=text, code=10) == _reference("42", "10", text)
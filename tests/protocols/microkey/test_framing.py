@@ -0,0 +1,39 @@
+from protocols.microkey.framing import MicrokeyFramer
+
+FRAME = (
+    b'<Signals SignalCount="1"><Signal><Account>1234</Account><SignalIdentifier>E130</SignalIdentifier>'
+    b"</Signal><Sequence>7</Sequence></Signals><Checksum>4FE9</Checksum>"
+)
+
+
+def test_frames_split_across_reads():
+    framer = MicrokeyFramer()
+    data = b"\r\n" + FRAME + FRAME
+    frames = []
+    for offset in range(0, len(data), 7):
+        frames += framer.feed(data[offset:offset + 7])
+    assert frames == [FRAME, FRAME]
+    assert len(framer) == 0
+
+
+def test_tail_split_inside_checksum_and_whitespace():
+    framer = MicrokeyFramer()
+    head, tail = FRAME.split(b"<Checksum>")
+    assert framer.feed(head + b"\r\n") == []
+    assert framer.feed(b"<Checksum>4F") == []
+    assert framer.feed(b"E9</Checksum>") == [head + b"\r\n<Checksum>4FE9</Checksum>"]
+
+
+def test_invalid_checksum_tag_is_not_a_frame_end():
+    framer = MicrokeyFramer()
+    broken = FRAME.replace(b"4FE9", b"ZZZZ")
+    assert framer.feed(broken) == []
+    # Like the regex splitter, the next valid tail closes the frame opened first
+    assert framer.feed(FRAME) == [broken + FRAME]
+
+
+def test_oversized_frame_is_dropped():
+    framer = MicrokeyFramer(max_frame_size=64)
+    assert framer.feed(b"<Signals>" + b"x" * 100) == []
+    assert framer.discarded == 1
+    assert framer.feed(b"</Signals><Checksum>0000</Checksum>" + FRAME) == [FRAME]
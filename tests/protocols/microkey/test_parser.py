@@ -0,0 +1,51 @@
+from protocols.microkey.parser import (
+    MicrokeySignal,
+    build_labels,
+    build_labels_for_message,
+    build_reply_label,
+    classify_signals,
+    extract_signals,
+    signal_category,
+)
+
+
+def _signal(code: str, extra: str = "") -> str:
+    return (
+        f"<Signal><Account>1234</Account><Date>01-01-2025</Date><Time>12:00:00</Time>"
+        f"<SignalIdentifier>{code}</SignalIdentifier><PhysicalZone>3</PhysicalZone><Area>1</Area>{extra}</Signal>"
+    )
+
+
+def _frame(*signals: str) -> str:
+    return f'<Signals SignalCount="{len(signals)}">' + "".join(signals) + "<Sequence>1</Sequence></Signals>"
+
+
+def test_signal_record_fields_and_dict_access():
+    (sig,) = extract_signals(_frame(_signal("R145", "<Data> x </Data>")))
+    assert isinstance(sig, MicrokeySignal)
+    assert (sig.account, sig.code, sig.zone, sig.area, sig.data) == ("1234", "R145", "3", "1", "x")
+    assert sig["time"] == "12:00:00" and sig.get("missing") is None
+
+
+def test_url_categories():
+    assert signal_category("E761", "<VideoFile>https://cdn.x.com/a/b.JPG?sig=1</VideoFile>") == "photo"
+    assert signal_category("E761", "<Url>https://imagesvc.x.com/original/abc</Url>") == "photo"
+    assert signal_category("E761", "<Url>https://x.com/app_video-svc/image_12</Url>") == "photo"
+    assert signal_category("E761", "<Hyperlink>ajax-pro-desktop://hub/1</Hyperlink>") == "link"
+    assert signal_category("E130", "") == "photo"
+    assert signal_category("R145", "<Data>no url</Data>") == "event"
+
+
+def test_both_labels_from_one_classification():
+    frame = _frame(_signal("E130"), _signal("E130"), _signal("E761", "<Url>https://x.com/p</Url>"))
+    buckets = classify_signals(extract_signals(frame))
+    assert build_labels(*buckets) == "[PHOTO E130 x2] [LINK E761]"
+    assert build_labels_for_message(frame) == "[PHOTO E130 x2] [LINK E761]"
+    assert build_reply_label("ACK", *buckets) == "[ACK MIXED] "
+
+    single = classify_signals(extract_signals(_frame(_signal("R145"), _signal("R145"))))
+    assert build_reply_label("NAK", *single) == "[NAK EVENT R145 x2] "
+
+
+def test_plain_dicts_still_classify():
+    assert classify_signals([{"code": "R145", "raw": ""}]) == ({}, {}, {"R145": 1})
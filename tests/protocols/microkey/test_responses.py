@@ -0,0 +1,31 @@
+import pytest
+
+from protocols.microkey.parser import check_microkey_checksum
+from protocols.microkey.responses import generate_ack, generate_nak, response_checksum
+from utils.crc import crc16_arc_hex
+
+
+def _body(reply: bytes) -> bytes:
+    return reply[1:reply.index(b"<Checksum>")]
+
+
+@pytest.mark.parametrize("sequence", ["0", "7", "0042", "123456"])
+def test_computed_ack_checksum_matches_direct_crc(sequence):
+    ack = generate_ack(sequence, compute=True)
+    assert ack.startswith(b"\r<Response><Sequence>" + sequence.encode() + b"</Sequence><Status>ACK</Status>")
+    assert ack.endswith(b"<Checksum>" + crc16_arc_hex(_body(ack)).encode() + b"</Checksum>\n")
+
+
+def test_fixed_checksums_by_default():
+    assert generate_ack("12").endswith(b"<Checksum>4FE9</Checksum>\n")
+    assert generate_nak("12").endswith(b"<Checksum>0000</Checksum>\n")
+    nak = generate_nak("12", "Checksum error", compute=True)
+    assert nak.endswith(f"<Checksum>{response_checksum(_body(nak))}</Checksum>\n".encode())
+
+
+def test_incoming_checksum_verification():
+    signals = b'<Signals SignalCount="0"><Sequence>5</Sequence></Signals>'
+    good = signals + b"<Checksum>" + crc16_arc_hex(signals).lower().encode() + b"</Checksum>"
+    assert check_microkey_checksum(good) is None
+    assert "mismatch" in check_microkey_checksum(signals + b"\r\n<Checksum>0000</Checksum>")
+    assert check_microkey_checksum(b"<Signals>") == "Checksum missing"
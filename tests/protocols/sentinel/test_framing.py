@@ -0,0 +1,31 @@
+from protocols.sentinel.framing import PING, SentinelFramer
+
+EVENT = b"Account=1234|Event=E130|MediaUrl=https://x.com/1.jpg\x14"
+
+
+def test_coalesced_ping_and_events_are_split():
+    framer = SentinelFramer()
+    assert framer.feed(PING + EVENT + EVENT + PING) == [PING, EVENT, EVENT, PING]
+    assert len(framer) == 0
+
+
+def test_event_split_across_reads():
+    framer = SentinelFramer()
+    frames = []
+    for offset in range(0, len(EVENT), 5):
+        frames += framer.feed(EVENT[offset:offset + 5])
+    assert frames == [EVENT]
+
+
+def test_cr_terminator_and_line_noise():
+    framer = SentinelFramer()
+    event = b"Account=1234|Event=R401\r"
+    assert framer.feed(event + b"\n" + event + b"\n\r\x14") == [event, event]
+    assert framer.feed(b"\n" + PING) == [PING]
+
+
+def test_oversized_frame_is_dropped():
+    framer = SentinelFramer(max_frame_size=32)
+    assert framer.feed(b"x" * 40) == []
+    assert framer.discarded == 1
+    assert framer.feed(b"tail\x14" + EVENT) == [EVENT]
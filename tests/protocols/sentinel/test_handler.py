@@ -0,0 +1,30 @@
+from protocols.sentinel.handler import SentinelProtocol
+
+ALL_BYTES = bytes(range(256))
+
+
+def _visible_reference(data: bytes) -> str:
+    out = []
+    for b in data:
+        if 0x20 <= b <= 0x7E and b not in (0x0D, 0x0A):
+            out.append(chr(b))
+        elif b == 0x09:
+            out.append(" ")
+        else:
+            out.append(f"<0x{b:02X}>")
+    return "".join(out)
+
+
+def test_visible_str_matches_per_byte_rendering():
+    protocol = SentinelProtocol()
+    assert protocol._bytes_to_visible_str(ALL_BYTES) == _visible_reference(ALL_BYTES)
+    assert protocol._bytes_to_visible_str(b"Account=1|Event=E130") == "Account=1|Event=E130"
+    assert protocol._bytes_to_visible_str(b"a\tb\r\n\x14") == "a b<0x0D><0x0A><0x14>"
+
+
+def test_hex_renderings():
+    protocol = SentinelProtocol()
+    assert protocol._bytes_as_angle_hex(b"\x06\x14") == "<0x06 0x14>"
+    assert protocol._bytes_as_angle_hex(ALL_BYTES, limit=2) == "<0x00 0x01 …>"
+    assert protocol._bytes_to_hex_block(b"\xab\x01") == "AB 01"
+    assert protocol._bytes_to_hex_block(ALL_BYTES, limit=2) == "00 01 …(+254 bytes)"
@@ -0,0 +1,75 @@
+import pytest
+
+from protocols.sia_dc09.crypto import SIAEncryptionError, decrypt_sia_message, encrypt_block
+from protocols.sia_dc09.message import SIAMessage
+from protocols.sia_dc09.parser import parse_sia_message
+
+
+PHOTO = "https://i.ajax.systems/s/abc{}"
+
+
+def test_parse_sia_message_extracts_header(example_sia_message):
+    parsed = parse_sia_message('2E6A0044"ADM-CID"0007L0#1234[#1234|1130 01 001]')
+
+    assert parsed["sequence"] == "0007"
+    assert parsed["account"] == "1234"
+    assert parsed["line"] == "L0"
+    assert parse_sia_message(example_sia_message)["sequence"] == "0003"
+
+
+def test_sia_message_labels_event_and_ping(example_sia_message):
+    assert SIAMessage(example_sia_message).label == "EVENT PH"
+    assert SIAMessage('\n8F4B0014"NULL"0000R0L0#1234[]').label == "PING"
+    assert SIAMessage("garbage").label == "UNKNOWN"
+
+
+def test_sia_message_classifies_and_masks_links_once():
+    links = ",".join(PHOTO.format(i) for i in range(3))
+    raw = (
+        '\n5D2F0047"ADM-CID"0001L0#1234[#1234|1130 01 001]'
+        f"[V{links}, https://web.ajax.systems/x, ajax-pro-desktop://y]_12:00:00,01-01-2025"
+    )
+    msg = SIAMessage(raw)
+
+    assert msg.event_code == "1130"
+    assert msg.label == "PHOTO 1130 x3"
+    assert msg.photo_links == [PHOTO.format(i) for i in range(3)]
+    assert msg.web_links == ["https://web.ajax.systems/x"]
+    assert msg.desktop_links == ["ajax-pro-desktop://y"]
+    assert msg.log_text.count("[PHOTO_URL]") == 2
+    assert PHOTO.format(0) in msg.log_text and PHOTO.format(1) not in msg.log_text
+    assert msg.response_label('"ACK"0001L0#1234[]') == "ACK PHOTO 1130 x3"
+
+
+def test_sia_message_scans_links_only_on_demand(monkeypatch):
+    calls = []
+    scan = SIAMessage._scan_links
+
+    def counting_scan(self):
+        calls.append(self.raw)
+        return scan(self)
+
+    monkeypatch.setattr(SIAMessage, "_scan_links", counting_scan)
+    msg = SIAMessage(f'\n5D2F0047"SIA-DCS"0001L0#1234[#1234|NBA]_[V{PHOTO.format(0)}]')
+
+    assert msg.reply_fields()["sequence"] == "0001"
+    assert calls == []
+    assert msg.label == "PHOTO NB x1"
+    assert msg.log_text.startswith('5D2F0047"SIA-DCS"')
+    assert len(calls) == 1
+
+
+def test_decrypt_sia_message_restores_clear_frame():
+    pytest.importorskip("cryptography")
+    key = "000102030405060708090A0B0C0D0E0F"
+    hex_data = encrypt_block("|1130 01 001]_12:00:00,01-01-2025", key)
+    clear, used_key = decrypt_sia_message(f'ABCD0050"*ADM-CID"0001R0L0#1234[{hex_data}', {"1234": key})
+
+    assert used_key == key
+    assert clear == 'ABCD0050"ADM-CID"0001R0L0#1234[|1130 01 001]_12:00:00,01-01-2025'
+    msg = SIAMessage(clear)
+    assert msg.label == "EVENT 1130"
+    assert msg.account == "1234" and msg.sequence == "0001"
+
+    with pytest.raises(SIAEncryptionError):
+        decrypt_sia_message(f'ABCD0050"*ADM-CID"0001R0L0#9999[{hex_data}', {"1234": key})
@@ -0,0 +1,42 @@
+import pytest
+
+from protocols.sia_dc09.crypto import decrypt_block
+from protocols.sia_dc09.parser import check_sia_frame
+from protocols.sia_dc09.responses import convert_sia_ack, convert_sia_nak
+from utils.crc import crc16_arc
+
+
+def test_ack_carries_crc_and_length_of_body():
+    ack = convert_sia_ack(sequence="0007", account="1234", timestamp="12:00:00,01-01-2025")
+    body = '"ACK"0007R0L0A0#1234[]_12:00:00,01-01-2025'
+
+    assert ack == f"{crc16_arc(body.encode()):04X}{len(body):04X}{body}\r"
+    assert check_sia_frame(ack.rstrip("\r")) is None
+
+
+def test_nak_is_a_valid_frame():
+    nak = convert_sia_nak(timestamp="12:00:00,01-01-2025")
+
+    assert '"NAK"0000' in nak
+    assert check_sia_frame(nak.rstrip("\r")) is None
+
+
+def test_check_sia_frame_reports_bad_crc_and_length():
+    body = '"ADM-CID"0001L0#1234[#1234|1130 01 001]'
+    good = f"{crc16_arc(body.encode()):04X}{len(body):04X}{body}"
+
+    assert check_sia_frame("\n" + good) is None
+    assert "CRC mismatch" in check_sia_frame("0000" + good[4:])
+    assert "length mismatch" in check_sia_frame(good[:4] + "0001" + body)
+    assert check_sia_frame("garbage") == "Malformed SIA header"
+
+
+def test_encrypted_ack_round_trips():
+    pytest.importorskip("cryptography")
+    key = "000102030405060708090A0B0C0D0E0F"
+    ack = convert_sia_ack(sequence="0007", account="1234", timestamp="12:00:00,01-01-2025", key=key)
+
+    assert '"*ACK"0007R0L0A0#1234[' in ack
+    assert check_sia_frame(ack.rstrip("\r")) is None
+    hex_data = ack.rstrip("\r").split("[", 1)[1]
+    assert decrypt_block(hex_data, key) == "]_12:00:00,01-01-2025"
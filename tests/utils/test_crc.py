@@ -0,0 +1,12 @@
+from utils.crc import crc16_arc, crc16_arc_hex
+
+
+def test_crc16_arc_check_value():
+    # Catalogue check value over b"123456789"
+    assert crc16_arc(b"123456789") == 0xBB3D
+    assert crc16_arc_hex(b"123456789") == "BB3D"
+
+
+def test_crc16_arc_continues_over_split_data():
+    data = bytes(range(256)) * 3 + b"\x01"
+    assert crc16_arc(data[100:], crc16_arc(data[:100])) == crc16_arc(data)
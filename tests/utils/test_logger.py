@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from utils.logger import (
+    TRAFFIC_IN,
+    TRAFFIC_OUT,
+    LogRecordQueue,
+    disable_queue_logging,
+    enable_queue_logging,
+    log_traffic,
+    log_traffic_frame,
+)
+
+
+def _record(level: int, msg: str) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 0, msg, None, None)
+
+
+def _messages(q: LogRecordQueue):
+    return [q.get_nowait().msg for _ in range(q.qsize())]
+
+
+def test_drop_oldest_keeps_newest_records():
+    q = LogRecordQueue(maxsize=2, overflow="drop_oldest")
+    for i in range(4):
+        q.put_record(_record(logging.INFO, str(i)))
+    assert _messages(q) == ["2", "3"]
+    assert q.dropped == 2
+
+
+def test_drop_debug_sacrifices_debug_records_first():
+    q = LogRecordQueue(maxsize=3, overflow="drop_debug")
+    q.put_record(_record(logging.INFO, "a"))
+    q.put_record(_record(logging.DEBUG, "d1"))
+    q.put_record(_record(logging.INFO, "b"))
+    q.put_record(_record(logging.WARNING, "c"))  # evicts d1
+    q.put_record(_record(logging.DEBUG, "d2"))   # full of INFO+: dropped
+    assert _messages(q) == ["a", "b", "c"]
+    assert q.dropped == 2
+
+
+def test_drop_oldest_never_evicts_the_stop_sentinel():
+    q = LogRecordQueue(maxsize=2, overflow="drop_oldest")
+    q.put_record(_record(logging.INFO, "a"))
+    q.put(None)
+    for i in range(3):
+        q.put_record(_record(logging.INFO, str(i)))
+    assert q.get_nowait().msg == "a"
+    assert q.get_nowait() is None
+    assert q.dropped == 3
+
+
+@pytest.mark.parametrize("overflow", ["drop_oldest", "drop_debug"])
+def test_flooded_queue_logging_stops(overflow):
+    class Slow(logging.Handler):
+        def emit(self, record):
+            time.sleep(0.0005)
+
+    log = logging.getLogger(f"test_flooded_queue_{overflow}")
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    slow = Slow()
+    log.addHandler(slow)
+    flooding = threading.Event()
+
+    def flood():
+        while not flooding.is_set():
+            log.info("flood")
+
+    enable_queue_logging(log, maxsize=4, overflow=overflow)
+    flooders = [threading.Thread(target=flood, daemon=True) for _ in range(2)]
+    try:
+        for t in flooders:
+            t.start()
+        time.sleep(0.05)
+        stopper = threading.Thread(target=disable_queue_logging, args=(log,), daemon=True)
+        stopper.start()
+        stopper.join(5)
+        assert not stopper.is_alive()
+    finally:
+        flooding.set()
+        for t in flooders:
+            # Producers must not stay blocked on a queue nobody drains any more
+            t.join(5)
+            assert not t.is_alive()
+        log.removeHandler(slow)
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        LogRecordQueue(overflow="drop_everything")
+
+
+def test_queue_logging_round_trip():
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    log = logging.getLogger("test_queue_logging")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    collector = Collect()
+    log.addHandler(collector)
+    try:
+        enable_queue_logging(log, maxsize=8, overflow="block")
+        assert log.handlers != [collector]
+        for i in range(100):
+            log.info(f"record {i}")
+        assert disable_queue_logging(log) == 0
+        assert log.handlers == [collector]
+        assert records[:100] == [f"record {i}" for i in range(100)]
+        assert "0 record(s) dropped" in records[-1]
+    finally:
+        log.removeHandler(collector)
+
+
+def test_log_traffic_renders_lazily_once():
+    calls = []
+    lines = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            lines.append((record.protocol, record.client_ip, record.getMessage()))
+
+    log = logging.getLogger("test_log_traffic")
+    log.propagate = False
+    log.addHandler(Collect())
+    log.addHandler(Collect())
+
+    def payload():
+        calls.append("payload")
+        return "<Signals/>"
+
+    log.setLevel(logging.WARNING)
+    log_traffic(TRAFFIC_IN, "MICROKEY", "10.0.0.1", lambda: 1 / 0, payload, log=log)
+    assert calls == [] and lines == []
+
+    log.setLevel(logging.INFO)
+    log_traffic(TRAFFIC_IN, "MICROKEY", "10.0.0.1", lambda: "EVENT R145", payload, log=log)
+    log_traffic(TRAFFIC_OUT, "MICROKEY", "10.0.0.1", "[ACK EVENT R145] ", "<Response/>", log=log)
+    log_traffic(TRAFFIC_IN, "MICROKEY", "10.0.0.1", "", "raw", log=log)
+    assert calls == ["payload"]
+    assert [line[2] for line in lines[::2]] == [
+        "<<-- [EVENT R145] <Signals/>",
+        "-->> [ACK EVENT R145] <Response/>",
+        "<<-- raw",
+    ]
+    assert lines[0][:2] == ("MICROKEY", "10.0.0.1")
+
+
+def test_log_traffic_frame_renders_label_and_payload_in_one_call():
+    calls = []
+    lines = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            lines.append(record.getMessage())
+
+    log = logging.getLogger("test_log_traffic_frame")
+    log.propagate = False
+    log.addHandler(Collect())
+    log.addHandler(Collect())
+
+    def render(frame):
+        calls.append(frame)
+        return f"EVENT {frame.upper()}", frame
+
+    log.setLevel(logging.WARNING)
+    log_traffic_frame(TRAFFIC_IN, "SENTINEL", "10.0.0.1", render, "r145", log=log)
+    assert calls == [] and lines == []
+
+    log.setLevel(logging.INFO)
+    log_traffic_frame(TRAFFIC_IN, "SENTINEL", "10.0.0.1", render, "r145", log=log)
+    assert calls == ["r145"]
+    assert lines == ["<<-- [EVENT R145] r145"] * 2
@@ -0,0 +1,188 @@
+import base64
+import os
+
+import pytest
+
+from utils import media_assembler
+from utils.media_assembler import MediaAssembler
+
+
+@pytest.fixture
+def media_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _chunks(data: bytes, size: int):
+    b64 = base64.b64encode(data)
+    return [b64[i:i + size] for i in range(0, len(b64), size)]
+
+
+def test_in_order_chunks_stream_to_file(media_dir):
+    image = os.urandom(10_000)
+    chunks = _chunks(image, 1001)  # not a multiple of 4: quanta straddle chunks
+    assembler = MediaAssembler("masxml", 6667)
+
+    for i, chunk in enumerate(chunks[:-1]):
+        assert assembler.add("p1", i, chunk) is None
+        assert assembler.buffered == 0
+    path = assembler.add("p1", len(chunks) - 1, chunks[-1], last=True, sequence="7", event_code="E130")
+
+    assert path.read_bytes() == image
+    assert "seq7_E130_" in path.name
+    assert len(assembler) == 0 and assembler.completed == 1
+    assert not list((media_dir / "log_media" / ".partial").iterdir())
+
+
+def test_out_of_order_chunks_buffer_only_the_gap(media_dir):
+    image = os.urandom(4_000)
+    chunks = _chunks(image, 500)
+    order = [1, 2, 0] + list(range(3, len(chunks)))
+    assembler = MediaAssembler("masxml", 6667)
+
+    path = None
+    for index in order:
+        path = assembler.add("p1", index, chunks[index], last=index == len(chunks) - 1)
+        if index == 2:
+            assert assembler.buffered == len(chunks[1]) + len(chunks[2])
+    assert path.read_bytes() == image
+    assert assembler.buffered == 0
+
+
+def test_first_chunk_arriving_second_is_not_dropped(media_dir):
+    image = os.urandom(900)
+    chunks = _chunks(image, 400)
+    assembler = MediaAssembler("masxml", 6667)
+
+    assert assembler.add("p1", 1, chunks[1]) is None
+    assert assembler.add("p1", 0, chunks[0]) is None
+    path = assembler.add("p1", 2, chunks[2], last=True)
+
+    assert path.read_bytes() == image
+    assert assembler.late_chunks == 0
+
+
+def test_one_based_indices_complete(media_dir):
+    image = os.urandom(2_000)
+    chunks = _chunks(image, 700)
+    assembler = MediaAssembler("masxml", 6667)
+
+    results = [
+        assembler.add("p1", i + 1, chunk, last=i == len(chunks) - 1) for i, chunk in enumerate(chunks)
+    ]
+
+    assert results[:-1] == [None] * (len(chunks) - 1)
+    assert results[-1].read_bytes() == image
+    assert assembler.stats()["open"] == 0 and assembler.buffered == 0
+
+
+def test_manitou_frame_numbers_from_one_complete_at_total_size(media_dir):
+    image = os.urandom(5_000)
+    chunks = _chunks(image, 2_000)
+    assembler = MediaAssembler("manitou", 6777)
+
+    results = [
+        assembler.add("RAW1", i + 1, chunk, total_size=len(image), sequence="RAW1")
+        for i, chunk in enumerate(chunks)
+    ]
+
+    assert results[:-1] == [None] * (len(chunks) - 1)
+    assert results[-1].read_bytes() == image
+
+
+def test_failed_save_abandons_media(media_dir, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(media_assembler, "media_file_path", fail)
+    assembler = MediaAssembler("masxml", 6667)
+
+    assert assembler.add("p1", 0, base64.b64encode(b"abc"), last=True) is None
+    assert assembler.abandoned_error == 1 and len(assembler) == 0
+    assert not list((media_dir / "log_media" / ".partial").iterdir())
+
+
+def test_close_drops_open_assemblies(media_dir):
+    assembler = MediaAssembler("masxml", 6667)
+    assembler.add("p1", 0, base64.b64encode(b"abc"))
+    assembler.add("p2", 3, base64.b64encode(b"def"))
+
+    assembler.close()
+
+    assert len(assembler) == 0 and assembler.buffered == 0
+    assert not list((media_dir / "log_media" / ".partial").iterdir())
+
+
+def test_protocol_base_index(media_dir):
+    chunks = _chunks(os.urandom(600), 400)
+    assembler = MediaAssembler("masxml", 6667, first_index=1)
+
+    assert assembler.add("p1", 2, chunks[1], last=True) is None
+    assert assembler.add("p1", 1, chunks[0]) is not None
+
+
+def test_last_chunk_waits_for_missing_chunks(media_dir):
+    chunks = _chunks(os.urandom(900), 400)
+    assembler = MediaAssembler("masxml", 6667)
+
+    assert assembler.add("p1", 0, chunks[0]) is None
+    assert assembler.add("p1", 2, chunks[2], last=True) is None
+    assert assembler.add("p1", 1, chunks[1]) is not None
+
+
+def test_ttl_abandons_stale_payloads(media_dir):
+    assembler = MediaAssembler("masxml", 6667, ttl=10)
+    assembler.add("p1", 1, base64.b64encode(b"abc"))
+    assembler.add("p2", 3, base64.b64encode(b"def"))
+
+    assembler.sweep(now=media_assembler.time.monotonic() + 11)
+
+    assert len(assembler) == 0 and assembler.buffered == 0
+    assert assembler.abandoned_ttl == 2
+    assert not list((media_dir / "log_media" / ".partial").iterdir())
+
+
+def test_memory_cap_evicts_oldest_payload(media_dir):
+    assembler = MediaAssembler("masxml", 6667, max_buffered=1000)
+    assembler.add("old", 5, b"A" * 600)
+    assembler.add("new", 5, b"B" * 600)
+
+    assert assembler.abandoned_memory == 1
+    assert assembler.buffered == 600
+    assert assembler.stats()["open"] == 1
+
+
+def test_invalid_base64_abandons_payload(media_dir):
+    assembler = MediaAssembler("masxml", 6667)
+    assert assembler.add("p1", 0, b"!!!!====AAAA", last=True) is None
+    assert assembler.abandoned_invalid == 1 and len(assembler) == 0
+
+
+def test_total_size_finalizes_without_last_flag(media_dir):
+    image = os.urandom(5_000)
+    chunks = _chunks(image, 2_000)
+    assembler = MediaAssembler("manitou", 6777)
+
+    results = [
+        assembler.add("RAW1", i, chunk, total_size=len(image), sequence="RAW1", ext="png")
+        for i, chunk in enumerate(chunks)
+    ]
+
+    assert results[:-1] == [None] * (len(chunks) - 1)
+    assert results[-1].suffix == ".png"
+    assert results[-1].read_bytes() == image
+
+
+def test_media_finished_in_the_same_second_are_not_overwritten(media_dir, monkeypatch):
+    monkeypatch.setattr("utils.media_logger.get_timestamp", lambda: "2025-01-01_00-00-00")
+    images = [os.urandom(300) for _ in range(3)]
+    assembler = MediaAssembler("masxml", 6667)
+
+    paths = [
+        assembler.add(f"p{i}", 0, base64.b64encode(image), last=True, sequence="7", event_code="E130")
+        for i, image in enumerate(images)
+    ]
+
+    assert len(set(paths)) == 3
+    assert [path.read_bytes() for path in paths] == images
+    assert paths[1].name == "photo_seq7_E130_2025-01-01_00-00-00_1.jpg"
@@ -1,5 +1,6 @@
 # tests/utils/test_mode_manager.py
 
+import multiprocessing
 import pytest
 from datetime import datetime
 from utils.mode_manager import EmulationMode, TimeModeDuration
@@ -42,3 +43,37 @@ def test_time_custom_mode_once(fresh_mode_manager):
     assert timestamp.startswith("00:00:00,01-01-2024")
     # After consuming once, timestamp override should clear
     assert protocol_mode.get_response_timestamp() != timestamp
+
+
+def _claim_many(protocol_mode, naks, claims):
+    for _ in range(claims):
+        if protocol_mode.claim_packet() == EmulationMode.NAK:
+            with naks.get_lock():
+                naks.value += 1
+
+
+def test_shared_mode_counts_across_processes(fresh_mode_manager):
+    ctx = multiprocessing.get_context("fork")
+    protocol_mode = fresh_mode_manager.share("shared_proto", ctx)
+    protocol_mode.set_mode(EmulationMode.NAK, count=5)
+    assert fresh_mode_manager.get("shared_proto") is protocol_mode
+
+    naks = ctx.Value("i", 0)
+    procs = [ctx.Process(target=_claim_many, args=(protocol_mode, naks, 10)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(timeout=10)
+
+    assert naks.value == 5
+    assert protocol_mode.mode == EmulationMode.ACK
+
+
+def test_shared_mode_keeps_existing_state(fresh_mode_manager):
+    fresh_mode_manager.get("drop_proto").set_drop(2)
+    shared = fresh_mode_manager.share("drop_proto", multiprocessing.get_context("fork"))
+
+    assert shared.mode == EmulationMode.DROP_N
+    assert shared.take_drop() and shared.take_drop()
+    assert not shared.take_drop()
+    assert shared.time_override is None
@@ -21,6 +21,7 @@ def test_register_and_get_protocol():
     # Get from registry
     retrieved = registry_tools.get_protocol_handler(name)
     assert retrieved is DummyProtocol
+    assert name in registry_tools.list_protocols()
 
 
 def test_register_existing_protocol_raises():
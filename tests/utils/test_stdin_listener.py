@@ -0,0 +1,35 @@
+from protocols.sentinel.mode_switcher import SentinelModeSwitcher
+from utils.mode_manager import EmulationMode
+from utils.stdin_listener import broadcast_command
+
+
+class FakeMode:
+    def __init__(self):
+        self.mode = EmulationMode.ACK
+
+    def set_mode(self, mode, *args):
+        self.mode = mode
+
+
+class RecordingSwitcher:
+    def __init__(self):
+        self.commands = []
+
+    def handle_command(self, command: str):
+        self.commands.append(command)
+
+
+def test_broadcast_skips_commands_a_switcher_does_not_support(capsys):
+    sentinel = SentinelModeSwitcher(FakeMode())
+    other = RecordingSwitcher()
+    targets = {"SENTINEL": sentinel, "MASXML": other}
+
+    for command in ("nak 3", "drop 2", "delay 5"):
+        broadcast_command(targets, command)
+    assert "Unknown command" not in capsys.readouterr().out
+    assert sentinel.protocol_mode.mode == EmulationMode.ACK
+    assert other.commands == ["nak 3", "drop 2", "delay 5"]
+
+    broadcast_command(targets, "nak")
+    assert sentinel.protocol_mode.mode == EmulationMode.NAK
+    assert other.commands[-1] == "nak"
@@ -0,0 +1,12 @@
+from utils.tools import LRUDict
+
+
+def test_lru_dict_evicts_least_recently_used():
+    cache = LRUDict(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1  # refreshes "a"
+    cache["c"] = 3
+
+    assert list(cache) == ["a", "c"]
+    assert cache.get("b") is None
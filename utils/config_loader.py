@@ -44,3 +44,31 @@ def load_config(force_reload: bool = False) -> dict:
 def get_logging_level() -> int:
     level_str = CONFIG.get("logging", {}).get("level", "INFO").upper()
     return getattr(logging, level_str, logging.INFO)
+
+
+def get_logging_config() -> dict:
+    """The 'logging' section (level, queue, queue_size, queue_overflow)."""
+    return (CONFIG or {}).get("logging") or {}
+
+
+def get_capture_config() -> dict:
+    """The 'capture' section (enabled, dir, segment_size, max_segments)."""
+    return (CONFIG or {}).get("capture") or {}
+
+
+def get_transport_engine() -> str:
+    """Connection engine: 'streams' (StreamReader) or 'buffered' (asyncio.BufferedProtocol)."""
+    return str((CONFIG or {}).get("transport", {}).get("engine", "streams")).lower()
+
+
+def get_reply_ordering() -> str:
+    """Delayed reply ordering: 'preserve' (arrival order) or 'ready' (as soon as each delay expires)."""
+    return str((CONFIG or {}).get("delay", {}).get("ordering", "preserve")).lower()
+
+
+def get_protocol_config(protocol_name) -> dict:
+    """Protocol-specific settings section, keyed like the ports ('sia-dcs', 'microkey', ...)."""
+    if hasattr(protocol_name, "value"):
+        protocol_name = protocol_name.value
+    protocol_key = str(protocol_name).lower().replace("_", "-")
+    return (CONFIG or {}).get(protocol_key) or {}
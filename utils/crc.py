@@ -0,0 +1,45 @@
+import sys
+from array import array
+from typing import List, Tuple
+
+# CRC-16/ARC ("ANSI"): poly 0x8005 reflected, init 0, no final XOR. Used by SIA DC-09 framing.
+
+
+def _make_tables() -> Tuple[List[int], List[int]]:
+    """Byte table, and the table for the first byte of a pair (the second byte uses the byte table)."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    first = [(crc >> 8) ^ table[crc & 0xFF] for crc in table]
+    return table, first
+
+
+_TABLE, _TABLE_FIRST = _make_tables()
+
+
+def crc16_arc(data: bytes, crc: int = 0) -> int:
+    """
+    CRC-16/ARC of `data`; pass an earlier result as `crc` to continue it over more data.
+
+    Two bytes per step: the CRC is linear, so after a little-endian pair
+    x = crc ^ (b0 | b1 << 8) it is _TABLE_FIRST[x & 0xFF] ^ _TABLE[x >> 8].
+    """
+    table, first = _TABLE, _TABLE_FIRST
+    even = len(data) & ~1
+    words = array("H", data[:even])
+    if sys.byteorder == "big":
+        words.byteswap()
+    for word in words:
+        x = crc ^ word
+        crc = first[x & 0xFF] ^ table[x >> 8]
+    if even != len(data):
+        crc = (crc >> 8) ^ table[(crc ^ data[-1]) & 0xFF]
+    return crc
+
+
+def crc16_arc_hex(data: bytes) -> str:
+    """Upper-case 4-digit hex, as written into DC-09 / Micro Key frames."""
+    return f"{crc16_arc(data):04X}"
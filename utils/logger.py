@@ -1,12 +1,24 @@
 # utils/logger.py
 from __future__ import annotations
 
+import atexit
 import logging
 import os
+import queue
 import sys
 from pathlib import Path
-from typing import Optional
-from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from utils.config_loader import get_logging_config
+
+# Direction markers of traffic lines
+TRAFFIC_IN = "<<--"
+TRAFFIC_OUT = "-->>"
+
+# Overflow policies of the log queue (see enable_queue_logging)
+QUEUE_OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_debug")
+DEFAULT_LOG_QUEUE_SIZE = 10000
 
 
 class SafeFormatter(logging.Formatter):
@@ -99,4 +111,278 @@ def setup_logger(
     return logger
 
 
+LazyText = Union[str, Callable[[], str]]
+
+
+class TrafficMessage:
+    """
+    Message of one traffic log line: "<<-- [LABEL] payload".
+
+    `label` and `payload` are strings or zero-argument callables; callables
+    run when the first handler formats the record (in the writer thread
+    when queue logging is on), and the text is cached for the others. A
+    label that already carries its own brackets (Micro Key's multi-label
+    "[PHOTO E130] [LINK E761]") is kept as is; an empty label is omitted.
+
+    With `render`, label and payload are both produced by render(frame)
+    instead, so one parse of the frame serves both.
+    """
+
+    __slots__ = ("direction", "label", "payload", "render", "frame", "_text")
+
+    def __init__(self, direction: str, label: LazyText, payload: LazyText,
+                 render: Optional[Callable[[Any], Tuple[str, str]]] = None, frame: Any = None):
+        self.direction = direction
+        self.label = label
+        self.payload = payload
+        self.render = render
+        self.frame = frame
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            if self.render is not None:
+                label, payload = self.render(self.frame)
+            else:
+                label = self.label() if callable(self.label) else self.label
+                payload = self.payload() if callable(self.payload) else self.payload
+            label = (label or "").strip()
+            if label and not label.startswith("["):
+                label = f"[{label}]"
+            self._text = f"{self.direction} {label} {payload}" if label else f"{self.direction} {payload}"
+        return self._text
+
+
+def log_traffic(
+    direction: str,
+    protocol: str,
+    client_ip: str,
+    label: LazyText,
+    payload: LazyText,
+    level: int = logging.INFO,
+    log: Optional[logging.Logger] = None,
+):
+    """
+    Log one incoming (TRAFFIC_IN) or outgoing (TRAFFIC_OUT) message.
+
+    Protocol and client IP travel as record extras (rendered by
+    SafeFormatter as "(PROTO) (ip) "). Nothing is built unless the logger
+    is enabled for `level`, so labels, masking and payload rendering passed
+    as callables cost nothing in WARNING-level runs.
+    """
+    log = log or logger
+    if log.isEnabledFor(level):
+        log.log(level, TrafficMessage(direction, label, payload), extra={"protocol": protocol, "client_ip": client_ip})
+
+
+def log_traffic_frame(
+    direction: str,
+    protocol: str,
+    client_ip: str,
+    render: Callable[[Any], Tuple[str, str]],
+    frame: Any,
+    level: int = logging.INFO,
+    log: Optional[logging.Logger] = None,
+):
+    """
+    log_traffic() for a label and payload derived from one frame:
+    render(frame) -> (label, payload) runs only when the line is formatted,
+    with no per-frame closure or cache around it.
+    """
+    log = log or logger
+    if log.isEnabledFor(level):
+        log.log(
+            level,
+            TrafficMessage(direction, "", "", render, frame),
+            extra={"protocol": protocol, "client_ip": client_ip},
+        )
+
+
+class LogRecordQueue(queue.Queue):
+    """
+    Bounded queue between the QueueHandler and the writer thread.
+
+    When it is full, `put_record` applies the overflow policy:
+      - block:       wait for the writer thread (nothing is lost)
+      - drop_oldest: discard the oldest queued record
+      - drop_debug:  discard queued DEBUG records first and drop incoming
+                     DEBUG records; INFO and above wait as with 'block'
+    Discarded records are counted in `dropped`. The listener's stop
+    sentinel (None) is never discarded: once it is queued, records that
+    find the queue full are dropped instead, as they would not be written
+    anyway.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_LOG_QUEUE_SIZE, overflow: str = "block"):
+        if overflow not in QUEUE_OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown log queue overflow policy '{overflow}'. Valid: {', '.join(QUEUE_OVERFLOW_POLICIES)}"
+            )
+        super().__init__(maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+        self._debug_queued = 0
+        self._stopping = False
+
+    def put_record(self, record: logging.LogRecord):
+        if self.overflow != "block":
+            with self.not_full:
+                if 0 < self.maxsize <= self._qsize() and not self._make_room(record):
+                    self.dropped += 1
+                    return
+        self.put(record)
+
+    def _make_room(self, record: logging.LogRecord) -> bool:
+        """Evict one record for `record`; False if `record` itself is to be dropped."""
+        items = self.queue
+        if self._stopping:
+            return False
+        if self.overflow == "drop_oldest":
+            evicted = items.popleft()
+            if _is_debug(evicted):
+                self._debug_queued -= 1
+        elif _is_debug(record):
+            return False
+        elif self._debug_queued:
+            for index, item in enumerate(items):
+                if _is_debug(item):
+                    del items[index]
+                    self._debug_queued -= 1
+                    break
+        else:
+            # Nothing left to sacrifice: wait like 'block'
+            return True
+        self.dropped += 1
+        self.unfinished_tasks -= 1
+        return True
+
+    def _put(self, item):
+        if item is None:
+            self._stopping = True
+        elif _is_debug(item):
+            self._debug_queued += 1
+        super()._put(item)
+
+    def _get(self):
+        item = super()._get()
+        if _is_debug(item):
+            self._debug_queued -= 1
+        return item
+
+
+def _is_debug(item) -> bool:
+    return item is not None and item.levelno <= logging.DEBUG
+
+
+class _OverflowQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: no pickling, so the record is formatted once, by the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put_record(record)
+
+
+class _LogQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full; the writer thread is still draining it
+        self.queue.put(self._sentinel)
+
+
+class _QueueLogging:
+    """Queue, handler and writer thread installed in front of one logger's handlers."""
+
+    __slots__ = ("logger", "handlers", "handler", "listener")
+
+    def __init__(self, logger: logging.Logger, maxsize: int, overflow: str):
+        self.logger = logger
+        self.handlers: List[logging.Handler] = list(logger.handlers)
+        self.handler = _OverflowQueueHandler(LogRecordQueue(maxsize, overflow))
+        self.listener = None
+        self.start()
+
+    @property
+    def queue(self) -> LogRecordQueue:
+        return self.handler.queue
+
+    def start(self):
+        self.listener = _LogQueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def restart_in_child(self):
+        # The writer thread does not survive fork(): start a fresh one on a fresh queue
+        self.handler.queue = LogRecordQueue(self.queue.maxsize, self.queue.overflow)
+        self.start()
+
+
+_queue_logging: Dict[str, _QueueLogging] = {}
+
+
+def enable_queue_logging(
+    logger: logging.Logger,
+    maxsize: int = DEFAULT_LOG_QUEUE_SIZE,
+    overflow: str = "block",
+) -> LogRecordQueue:
+    """
+    Put a QueueHandler in front of the logger's handlers.
+
+    Records are handed to a bounded LogRecordQueue and written to console
+    and file by a background QueueListener thread, so the event loop never
+    waits for a write or a log rotation (unless `overflow` is 'block' and
+    the queue is full). Call disable_queue_logging() to drain the queue and
+    go back to synchronous handlers; it also runs at interpreter exit.
+    """
+    state = _queue_logging.get(logger.name)
+    if state is not None:
+        return state.queue
+    state = _QueueLogging(logger, maxsize, overflow)
+    for h in state.handlers:
+        logger.removeHandler(h)
+    logger.addHandler(state.handler)
+    _queue_logging[logger.name] = state
+    return state.queue
+
+
+def disable_queue_logging(logger: logging.Logger) -> int:
+    """Flush the queue, restore the direct handlers and report dropped records. Returns the count."""
+    state = _queue_logging.pop(logger.name, None)
+    if state is None:
+        return 0
+    state.listener.stop()
+    logger.removeHandler(state.handler)
+    for h in state.handlers:
+        logger.addHandler(h)
+    log_queue = state.queue
+    report = logger.warning if log_queue.dropped else logger.info
+    report(f"[LOGGING] Log queue stopped: {log_queue.dropped} record(s) dropped (overflow policy: {log_queue.overflow})")
+    return log_queue.dropped
+
+
+def _disable_all_queue_logging():
+    for state in list(_queue_logging.values()):
+        disable_queue_logging(state.logger)
+
+
+def _restart_queue_logging_in_child():
+    for state in _queue_logging.values():
+        state.restart_in_child()
+
+
+atexit.register(_disable_all_queue_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_queue_logging_in_child)
+
+
+def _configure_queue_logging(logger: logging.Logger):
+    """Opt-in via 'logging: queue: true' in config_signalling.yaml."""
+    settings = get_logging_config()
+    if settings.get("queue"):
+        enable_queue_logging(
+            logger,
+            maxsize=int(settings.get("queue_size", DEFAULT_LOG_QUEUE_SIZE)),
+            overflow=str(settings.get("queue_overflow", "block")).lower(),
+        )
+
+
 logger = setup_logger()
+_configure_queue_logging(logger)
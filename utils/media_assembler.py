@@ -0,0 +1,332 @@
+import base64
+import itertools
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+
+from utils.logger import logger
+from utils.media_logger import DEFAULT_MAX_FILES, DEFAULT_MEDIA_DIR, media_file_path
+
+# Open assemblies that received nothing for this long are abandoned
+DEFAULT_ASSEMBLY_TTL = 300.0
+# Out-of-order chunks buffered in memory across all assemblies of one assembler
+DEFAULT_MAX_BUFFERED = 64 * 1024 * 1024
+SWEEP_INTERVAL = 10.0
+
+PARTIAL_DIR = ".partial"
+_B64_WHITESPACE = b" \t\r\n"
+
+
+class _Assembly:
+    """
+    One media file being written: next expected chunk index (None until the
+    base index is known), out-of-order gap buffer.
+    """
+
+    __slots__ = (
+        "key", "file", "path", "next_index", "pending", "pending_bytes",
+        "carry", "written", "last_index", "total_size", "sequence", "event_code", "ext", "touched",
+    )
+
+    def __init__(self, key: Hashable, file, path: str, first_index: Optional[int]):
+        self.key = key
+        self.file = file
+        self.path = path
+        self.next_index: Optional[int] = first_index
+        self.pending: Dict[int, bytes] = {}
+        self.pending_bytes = 0
+        self.carry = b""
+        self.written = 0
+        self.last_index: Optional[int] = None
+        self.total_size: Optional[int] = None
+        self.sequence: Optional[str] = None
+        self.event_code: Optional[str] = None
+        self.ext: Optional[str] = None
+        self.touched = time.monotonic()
+
+
+class MediaAssembler:
+    """
+    Streams multipart media (photo chunks) to disk as the chunks arrive.
+
+    Chunks of one key (PayloadID, RawNo, ...) are written to a temporary file
+    under <media dir>/.partial in index order; only chunks that arrive ahead
+    of a gap are held in memory. Protocols do not agree on the first index
+    (0 or 1, even within one protocol), so unless `first_index` is given,
+    chunks are held until chunk 0 arrives, the `last` chunk arrives, or the
+    held chunks reach `total_size`; writing then starts at the lowest index
+    received. With `base64_chunks` the chunks are decoded
+    incrementally (a base64 quantum split across chunks is carried over), so
+    neither the encoded nor the decoded image is ever held in full.
+
+    A file is finalized into the protocol media directory when the chunk
+    flagged `last` has been written, or once `total_size` decoded bytes have
+    been written. Assemblies idle for longer than `ttl`, and the oldest
+    assemblies when buffered gaps exceed `max_buffered` bytes, are abandoned
+    and counted in `abandoned_ttl` / `abandoned_memory`; undecodable chunks
+    abandon their media immediately (`abandoned_invalid`), as does a failure
+    to move the finished file into place (`abandoned_error`).
+    """
+
+    def __init__(
+        self,
+        protocol: str,
+        port: int,
+        base64_chunks: bool = True,
+        ext: str = "jpg",
+        ttl: float = DEFAULT_ASSEMBLY_TTL,
+        max_buffered: int = DEFAULT_MAX_BUFFERED,
+        max_files: int = DEFAULT_MAX_FILES,
+        first_index: Optional[int] = None,
+    ):
+        self.protocol = protocol
+        self.port = port
+        self.base64_chunks = base64_chunks
+        self.ext = ext
+        self.ttl = ttl
+        self.max_buffered = max_buffered
+        self.max_files = max_files
+        # Index of the first chunk of every media if the protocol fixes it, else found per media
+        self.first_index = first_index
+        self._assemblies: Dict[Hashable, _Assembly] = {}
+        self._buffered = 0
+        self._last_sweep = time.monotonic()
+        # Metrics
+        self.completed = 0
+        self.abandoned_ttl = 0
+        self.abandoned_memory = 0
+        self.abandoned_invalid = 0
+        self.abandoned_error = 0
+        self.late_chunks = 0
+
+    def __len__(self) -> int:
+        """Assemblies still open."""
+        return len(self._assemblies)
+
+    @property
+    def buffered(self) -> int:
+        """Out-of-order chunk bytes currently held in memory."""
+        return self._buffered
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open": len(self._assemblies),
+            "buffered": self._buffered,
+            "completed": self.completed,
+            "abandoned_ttl": self.abandoned_ttl,
+            "abandoned_memory": self.abandoned_memory,
+            "abandoned_invalid": self.abandoned_invalid,
+            "abandoned_error": self.abandoned_error,
+            "late_chunks": self.late_chunks,
+        }
+
+    def log_stats(self, level: int = logging.INFO):
+        logger.log(level, f"({self.protocol}) Media assembler: " + " ".join(f"{k}={v}" for k, v in self.stats().items()))
+
+    def add(
+        self,
+        key: Hashable,
+        index: int,
+        data: bytes,
+        last: bool = False,
+        total_size: Optional[int] = None,
+        sequence: Optional[str] = None,
+        event_code: Optional[str] = None,
+        ext: Optional[str] = None,
+    ) -> Optional[Path]:
+        """
+        Add chunk `index` of `key`. Returns the saved file path when this
+        chunk completed the media, otherwise None.
+        """
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self.sweep(now)
+
+        asm = self._assemblies.get(key)
+        if asm is None:
+            asm = self._open(key)
+        asm.touched = now
+        if sequence:
+            asm.sequence = sequence
+        if event_code:
+            asm.event_code = event_code
+        if ext:
+            asm.ext = ext
+        if total_size is not None:
+            asm.total_size = total_size
+        if last:
+            asm.last_index = index
+
+        if index in asm.pending or (asm.next_index is not None and index < asm.next_index):
+            self.late_chunks += 1
+            logger.debug(f"({self.protocol}) Duplicate/late chunk {index} for {key!r} ignored")
+        elif index == asm.next_index:
+            try:
+                self._write(asm, data)
+                asm.next_index += 1
+                self._drain_pending(asm)
+            except (ValueError, OSError) as e:
+                self.abandoned_invalid += 1
+                self._abandon(asm, f"cannot write chunk {asm.next_index}: {e}")
+                return None
+        else:
+            asm.pending[index] = data
+            asm.pending_bytes += len(data)
+            self._buffered += len(data)
+            if self._buffered > self.max_buffered:
+                self._evict(keep=asm)
+            if key in self._assemblies and asm.next_index is None and self._base_known(asm):
+                # Start at the lowest index received and write everything contiguous from there
+                asm.next_index = min(asm.pending)
+                try:
+                    self._drain_pending(asm)
+                except (ValueError, OSError) as e:
+                    self.abandoned_invalid += 1
+                    self._abandon(asm, f"cannot write chunk {asm.next_index}: {e}")
+                    return None
+
+        if key in self._assemblies and self._is_complete(asm):
+            return self._finalize(asm)
+        return None
+
+    def sweep(self, now: Optional[float] = None):
+        """Abandon assemblies idle for longer than the TTL."""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        abandoned = self.abandoned_ttl
+        for asm in list(self._assemblies.values()):
+            if now - asm.touched > self.ttl:
+                self.abandoned_ttl += 1
+                self._abandon(asm, "no chunk received within TTL")
+        self.log_stats(logging.INFO if self.abandoned_ttl > abandoned else logging.DEBUG)
+
+    def close(self):
+        """Drop every open assembly and its temporary file (server shutdown)."""
+        for asm in list(self._assemblies.values()):
+            self._abandon(asm, "shutdown")
+        self.log_stats()
+
+    # ---------- internals ----------
+
+    def _open(self, key: Hashable) -> _Assembly:
+        partial = Path(DEFAULT_MEDIA_DIR) / PARTIAL_DIR
+        partial.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"{self.protocol}_{self.port}_", suffix=".part", dir=partial)
+        asm = _Assembly(key, os.fdopen(fd, "wb"), path, self.first_index)
+        self._assemblies[key] = asm
+        return asm
+
+    def _write(self, asm: _Assembly, data: bytes):
+        if self.base64_chunks:
+            data = asm.carry + data.translate(None, _B64_WHITESPACE)
+            usable = len(data) - len(data) % 4
+            asm.carry = data[usable:]
+            data = base64.b64decode(data[:usable], validate=True)
+        asm.file.write(data)
+        asm.written += len(data)
+
+    def _drain_pending(self, asm: _Assembly):
+        pending = asm.pending
+        while asm.next_index in pending:
+            data = pending.pop(asm.next_index)
+            asm.pending_bytes -= len(data)
+            self._buffered -= len(data)
+            self._write(asm, data)
+            asm.next_index += 1
+
+    def _base_known(self, asm: _Assembly) -> bool:
+        """Whether the held chunks show where the media starts: chunk 0, the last chunk, or all of total_size."""
+        if 0 in asm.pending or asm.last_index is not None:
+            return True
+        if asm.total_size is None:
+            return False
+        held = sum(map(len, asm.pending.values()))
+        return (held * 3 // 4 if self.base64_chunks else held) >= asm.total_size
+
+    def _is_complete(self, asm: _Assembly) -> bool:
+        if asm.next_index is None:
+            return False
+        if asm.total_size is not None and asm.written + len(asm.carry) * 3 // 4 >= asm.total_size:
+            return True
+        return asm.last_index is not None and asm.next_index > asm.last_index
+
+    def _finalize(self, asm: _Assembly) -> Optional[Path]:
+        try:
+            if asm.carry:
+                # Unpadded tail of the last chunk
+                try:
+                    asm.file.write(base64.b64decode(asm.carry + b"=" * (-len(asm.carry) % 4)))
+                except ValueError:
+                    logger.debug(f"({self.protocol}) Dropped {len(asm.carry)} trailing base64 bytes of {asm.key!r}")
+            asm.file.flush()
+            target = media_file_path(
+                self.protocol, self.port, asm.sequence, asm.event_code, asm.ext or self.ext, self.max_files
+            )
+        except OSError as e:
+            self.abandoned_error += 1
+            self._abandon(asm, f"cannot save: {e}")
+            return None
+        self._release(asm)
+        try:
+            target = _move_unique(asm.path, target)
+        except OSError as e:
+            self.abandoned_error += 1
+            _unlink(asm.path)
+            logger.warning(f"({self.protocol}) Abandoned media {asm.key!r}: cannot save: {e} (written={asm.written})")
+            return None
+        self.completed += 1
+        return target
+
+    def _evict(self, keep: _Assembly):
+        # Oldest activity first; the assembly that just grew goes last
+        for asm in sorted(self._assemblies.values(), key=lambda a: (a is keep, a.touched)):
+            if self._buffered <= self.max_buffered:
+                break
+            if not asm.pending_bytes:
+                continue
+            self.abandoned_memory += 1
+            self._abandon(asm, f"buffered chunks exceed {self.max_buffered} bytes")
+
+    def _abandon(self, asm: _Assembly, reason: str):
+        buffered_chunks = len(asm.pending)
+        self._release(asm)
+        _unlink(asm.path)
+        logger.warning(
+            f"({self.protocol}) Abandoned media {asm.key!r}: {reason} "
+            f"(written={asm.written}, buffered chunks={buffered_chunks})"
+        )
+
+    def _release(self, asm: _Assembly):
+        del self._assemblies[asm.key]
+        self._buffered -= asm.pending_bytes
+        asm.pending.clear()
+        asm.pending_bytes = 0
+        asm.file.close()
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _move_unique(src: str, target: Path) -> Path:
+    """
+    Move `src` to `target`, or to "<stem>_N<suffix>" when that name is taken.
+    Names only have second resolution, so media of the same sequence/event
+    can finish together (also in other worker processes); os.link fails on
+    an existing name instead of overwriting it.
+    """
+    candidate = target
+    for n in itertools.count(1):
+        try:
+            os.link(src, candidate)
+        except FileExistsError:
+            candidate = target.with_name(f"{target.stem}_{n}{target.suffix}")
+            continue
+        os.unlink(src)
+        return candidate
@@ -21,15 +21,14 @@ def clean_old_files(path: Path, max_files: int):
 def get_timestamp():
     return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
-def save_base64_media(
-    b64_data: str,
+def media_file_path(
     protocol: str,
     port: int,
     sequence: Optional[str]=None,
     event_code: Optional[str]=None,
     ext="jpg",
     max_files=DEFAULT_MAX_FILES
-):
+) -> Path:
     sub_dir = Path(DEFAULT_MEDIA_DIR) / f"{protocol}_{port}"
     ensure_media_dir(sub_dir)
     clean_old_files(sub_dir, max_files)
@@ -37,7 +36,18 @@ def save_base64_media(
     timestamp = get_timestamp()
     seq_part = f"seq{sequence}_" if sequence else ""
     event_part = f"{event_code}_" if event_code else ""
-    filename = sub_dir / f"photo_{seq_part}{event_part}{timestamp}.{ext}"
+    return sub_dir / f"photo_{seq_part}{event_part}{timestamp}.{ext}"
+
+def save_base64_media(
+    b64_data: str,
+    protocol: str,
+    port: int,
+    sequence: Optional[str]=None,
+    event_code: Optional[str]=None,
+    ext="jpg",
+    max_files=DEFAULT_MAX_FILES
+):
+    filename = media_file_path(protocol, port, sequence, event_code, ext, max_files)
 
     try:
         with open(filename, "wb") as f:
@@ -1,4 +1,4 @@
-import asyncio
+import math
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict
@@ -35,6 +35,9 @@ class ProtocolMode:
         self.time_mode_duration: Optional[TimeModeDuration] = None
         self.time_left = 0
 
+        # Protocol-specific NAK result code (e.g. MASXML 'nak9')
+        self.nak_result_code: Optional[int] = None
+
     def set_mode(self, mode: EmulationMode, count: Optional[int] = None, next_mode: Optional[EmulationMode] = None):
         if count is not None and self.mode != mode:
             self.previous_mode = self.mode
@@ -63,6 +66,19 @@ class ProtocolMode:
                 return True
         return False
 
+    def claim_packet(self) -> EmulationMode:
+        """Return the mode that applies to this reply and count the packet against it."""
+        mode = self.mode
+        self.consume_packet()
+        return mode
+
+    def take_drop(self) -> bool:
+        """Consume one pending drop; False when nothing is left to drop."""
+        if self.drop_count > 0:
+            self.drop_count -= 1
+            return True
+        return False
+
     def set_drop(self, count: int):
         self.set_mode(EmulationMode.DROP_N)
         self.drop_count = count
@@ -101,6 +117,109 @@ class ProtocolMode:
         self.time_left = 0
 
 
+_NONE = -(2 ** 63)
+_MODES = list(EmulationMode)
+_DURATIONS = list(TimeModeDuration)
+
+
+class _SharedField:
+    """Descriptor storing one ProtocolMode attribute in a shared int64 array."""
+
+    def __init__(self, index: int, choices: Optional[list] = None):
+        self.index = index
+        self.choices = choices
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        raw = obj._ints[self.index]
+        if raw == _NONE:
+            return None
+        return self.choices[raw] if self.choices else raw
+
+    def __set__(self, obj, value):
+        if value is None:
+            obj._ints[self.index] = _NONE
+        else:
+            obj._ints[self.index] = self.choices.index(value) if self.choices else int(value)
+
+
+class _SharedTimestamp:
+    """Descriptor storing an optional datetime as a shared float (NaN means None)."""
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        ts = obj._floats[0]
+        return None if math.isnan(ts) else datetime.fromtimestamp(ts)
+
+    def __set__(self, obj, value: Optional[datetime]):
+        obj._floats[0] = math.nan if value is None else value.timestamp()
+
+
+class SharedProtocolMode(ProtocolMode):
+    """
+    ProtocolMode kept in shared memory so forked workers see one state.
+
+    Every read-modify-write goes through a cross-process lock, so `nak 5`
+    means five NAKs in total across all workers.
+    """
+
+    mode = _SharedField(0, _MODES)
+    previous_mode = _SharedField(1, _MODES)
+    mode_packet_count = _SharedField(2)
+    next_mode = _SharedField(3, _MODES)
+    drop_count = _SharedField(4)
+    delay_seconds = _SharedField(5)
+    time_mode_duration = _SharedField(6, _DURATIONS)
+    time_left = _SharedField(7)
+    nak_result_code = _SharedField(8)
+    time_override = _SharedTimestamp()
+
+    def __init__(self, ctx, source: Optional[ProtocolMode] = None):
+        self._ints = ctx.RawArray("q", 9)
+        self._floats = ctx.RawArray("d", 1)
+        self._lock = ctx.RLock()
+        super().__init__()
+        if source is not None:
+            for name in ("mode", "previous_mode", "mode_packet_count", "next_mode", "drop_count",
+                         "delay_seconds", "time_override", "time_mode_duration", "time_left",
+                         "nak_result_code"):
+                setattr(self, name, getattr(source, name))
+
+    def set_mode(self, *args, **kwargs):
+        with self._lock:
+            super().set_mode(*args, **kwargs)
+
+    def consume_packet(self) -> bool:
+        with self._lock:
+            return super().consume_packet()
+
+    def claim_packet(self) -> EmulationMode:
+        with self._lock:
+            return super().claim_packet()
+
+    def take_drop(self) -> bool:
+        with self._lock:
+            return super().take_drop()
+
+    def set_drop(self, count: int):
+        with self._lock:
+            super().set_drop(count)
+
+    def set_delay(self, seconds: int):
+        with self._lock:
+            super().set_delay(seconds)
+
+    def set_time(self, *args, **kwargs):
+        with self._lock:
+            super().set_time(*args, **kwargs)
+
+    def get_response_timestamp(self) -> str:
+        with self._lock:
+            return super().get_response_timestamp()
+
+
 class ModeManager:
     def __init__(self):
         self._modes: Dict[str, ProtocolMode] = {}
@@ -110,6 +229,16 @@ class ModeManager:
             self._modes[protocol_name] = ProtocolMode()
         return self._modes[protocol_name]
 
+    def share(self, protocol_name: str, ctx) -> SharedProtocolMode:
+        """
+        Move a protocol's mode into shared memory (multiprocessing context `ctx`).
+        Must be called before handlers grab the mode and before workers fork.
+        """
+        current = self._modes.get(protocol_name)
+        if not isinstance(current, SharedProtocolMode):
+            self._modes[protocol_name] = SharedProtocolMode(ctx, source=current)
+        return self._modes[protocol_name]
+
     def reset_all(self):
         self._modes.clear()
         logger.info("[MODE_MANAGER] All modes have been reset")
@@ -1,4 +1,4 @@
-from typing import Callable, Dict, Type
+from typing import Callable, Dict, List, Type
 
 # Central registry for protocol handlers
 _protocol_registry: Dict[str, Type] = {}
@@ -33,6 +33,15 @@ def get_protocol_handler(name: str) -> Type:
     return _protocol_registry[name]
 
 
+def list_protocols() -> List[str]:
+    """
+    Names of all registered protocols, in registration order.
+
+    :return: The registered protocol names
+    """
+    return list(_protocol_registry)
+
+
 # Convenience aliases matching handler usage
 register = register_protocol
 get = get_protocol_handler
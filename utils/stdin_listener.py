@@ -1,7 +1,9 @@
 import asyncio
 import sys
 import logging
+import threading
 from datetime import datetime
+from typing import Dict
 
 from utils.mode_manager import EmulationMode, TimeModeDuration, mode_manager
 from utils.logger import logger
@@ -15,86 +17,149 @@ async def stdin_listener(protocol_key: str, mode_switcher=None):
     logger.info(
         f"[STDIN] Type commands to control '{protocol_key}' emulation (e.g., 'ack', 'nak 3', 'drop 2', 'time 2024-08-26 14:46:14 5', 'loglevel DEBUG')"
     )
-    loop = asyncio.get_event_loop()
+    async for command in _read_commands():
+        dispatch_command(protocol_key, command, mode_switcher)
 
-    while True:
-        command = await loop.run_in_executor(None, sys.stdin.readline)
-        command = command.strip()
 
-        if not command:
+async def host_stdin_listener(targets: Dict[str, object]):
+    """
+    Single control plane for several protocols running in one process.
+
+    `targets` maps protocol key -> mode switcher (or None for default handling).
+    A command may be prefixed with a protocol key ('masxml nak 3'); without a
+    prefix it is applied to every protocol.
+    """
+    aliases = {key.lower().replace("_", "-"): key for key in targets}
+    logger.info(
+        f"[STDIN] Type commands for all protocols or prefix with one of: {', '.join(sorted(aliases))} "
+        f"(e.g., 'masxml nak 3', 'drop 2', 'loglevel DEBUG')"
+    )
+    async for command in _read_commands():
+        parts = command.split(maxsplit=1)
+        key = aliases.get(parts[0].lower().replace("_", "-"))
+        if key is not None:
+            if len(parts) > 1:
+                dispatch_command(key, parts[1], targets[key])
             continue
+        if parts[0].lower() == "loglevel":
+            dispatch_command("", command)
+            continue
+        broadcast_command(targets, command)
 
-        parts = command.split()
-        cmd = parts[0].lower()
 
-        # Allow changing log level globally
-        if cmd == "loglevel" and len(parts) == 2:
-            level = parts[1].upper()
-            if level in VALID_LOG_LEVELS:
-                logger.setLevel(getattr(logging, level))
-                logger.info(f"[STDIN] Log level changed to {level}")
-            else:
-                logger.warning(f"[STDIN] Invalid log level '{parts[1]}'. Valid: {', '.join(VALID_LOG_LEVELS)}")
+def broadcast_command(targets: Dict[str, object], command: str):
+    """
+    Apply an unprefixed command to every protocol. Switchers with a narrower
+    command set (supports_command(), e.g. Sentinel's ack | nak | no_response)
+    quietly sit out the commands they do not know.
+    """
+    for key, mode_switcher in targets.items():
+        supports = getattr(mode_switcher, "supports_command", None)
+        if supports is not None and not supports(command):
             continue
+        dispatch_command(key, command, mode_switcher)
 
-        # If a custom mode switcher is provided (e.g., for MASXML), delegate logic
-        if mode_switcher:
-            mode_switcher.handle_command(command)
-            continue
 
-        # Fallback: default global handling via mode_manager
-        protocol_mode = mode_manager.get(protocol_key)
-
-        # Modes with count + optional `then`
-        if cmd in MODES_WITH_COUNT:
-            count = None
-            next_mode = None
-
-            if len(parts) > 1 and parts[1].isdigit():
-                count = int(parts[1])
-            if len(parts) > 3 and parts[2].lower() == "then":
-                next_raw = parts[3].lower()
-                if next_raw in ALL_MODES:
-                    next_mode = EmulationMode(next_raw)
-                else:
-                    logger.warning(f"[STDIN] Invalid next mode: {next_raw}")
-                    continue
-
-            protocol_mode.set_mode(EmulationMode(cmd), count, next_mode)
-            continue
+async def _read_commands():
+    """
+    Yield non-empty stdin lines. Reading happens in a daemon thread so a
+    blocked readline never keeps the process alive on shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    lines: "asyncio.Queue[str]" = asyncio.Queue()
+
+    def _reader():
+        try:
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+            # EOF (e.g. stdin redirected from /dev/null in CI): stop listening
+            loop.call_soon_threadsafe(lines.put_nowait, "")
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    threading.Thread(target=_reader, name="stdin-listener", daemon=True).start()
+    while True:
+        command = await lines.get()
+        if not command:
+            return
+        command = command.strip()
+        if command:
+            yield command
+
+
+def dispatch_command(protocol_key: str, command: str, mode_switcher=None):
+    parts = command.split()
+    cmd = parts[0].lower()
+
+    # Allow changing log level globally
+    if cmd == "loglevel" and len(parts) == 2:
+        level = parts[1].upper()
+        if level in VALID_LOG_LEVELS:
+            logger.setLevel(getattr(logging, level))
+            logger.info(f"[STDIN] Log level changed to {level}")
+        else:
+            logger.warning(f"[STDIN] Invalid log level '{parts[1]}'. Valid: {', '.join(VALID_LOG_LEVELS)}")
+        return
+
+    # If a custom mode switcher is provided (e.g., for MASXML), delegate logic
+    if mode_switcher:
+        mode_switcher.handle_command(command)
+        return
+
+    # Fallback: default global handling via mode_manager
+    protocol_mode = mode_manager.get(protocol_key)
+
+    # Modes with count + optional `then`
+    if cmd in MODES_WITH_COUNT:
+        count = None
+        next_mode = None
+
+        if len(parts) > 1 and parts[1].isdigit():
+            count = int(parts[1])
+        if len(parts) > 3 and parts[2].lower() == "then":
+            next_raw = parts[3].lower()
+            if next_raw in ALL_MODES:
+                next_mode = EmulationMode(next_raw)
+            else:
+                logger.warning(f"[STDIN] Invalid next mode: {next_raw}")
+                return
+
+        protocol_mode.set_mode(EmulationMode(cmd), count, next_mode)
+        return
 
-        match cmd:
-            case "only-ping":
-                protocol_mode.set_mode(EmulationMode.ONLY_PING)
-            case "drop" if len(parts) > 1 and parts[1].isdigit():
-                protocol_mode.set_drop(int(parts[1]))
-            case "delay" if len(parts) > 1 and parts[1].isdigit():
-                protocol_mode.set_delay(int(parts[1]))
-            case "time" if len(parts) >= 3:
-                try:
-                    new_time = datetime.strptime(f"{parts[1]} {parts[2]}", "%Y-%m-%d %H:%M:%S")
-                    duration = TimeModeDuration.FOREVER
-                    count = -1
-                    if len(parts) == 4:
-                        if parts[3].lower() == "once":
-                            duration = TimeModeDuration.ONCE
-                            count = 1
-                        elif parts[3].isdigit():
-                            duration = TimeModeDuration.TIMES
-                            count = int(parts[3])
-                    protocol_mode.set_time(new_time, duration, count)
-                except Exception as e:
-                    logger.warning(f"[STDIN] Invalid time command: {e}")
-            case _:
-                logger.warning(f"[STDIN] Unknown command: {command}")
-                logger.info(
-                    "[STDIN] Available commands:\n"
-                    "  ack [N]                 - respond with ACK (optionally N times)\n"
-                    "  nak [N]                 - respond with NAK (optionally N times)\n"
-                    "  no-response [N]         - skip responses (optionally N times)\n"
-                    "  only-ping               - respond only to pings, skip events\n"
-                    "  drop N                  - drop next N packets\n"
-                    "  delay N                 - delay each response by N seconds\n"
-                    "  time YYYY-MM-DD HH:MM:SS [once|N|forever] - override timestamp for all responses\n"
-                    "  loglevel LEVEL          - change log level (DEBUG, INFO, TRACE...)\n"
-                )
+    match cmd:
+        case "only-ping":
+            protocol_mode.set_mode(EmulationMode.ONLY_PING)
+        case "drop" if len(parts) > 1 and parts[1].isdigit():
+            protocol_mode.set_drop(int(parts[1]))
+        case "delay" if len(parts) > 1 and parts[1].isdigit():
+            protocol_mode.set_delay(int(parts[1]))
+        case "time" if len(parts) >= 3:
+            try:
+                new_time = datetime.strptime(f"{parts[1]} {parts[2]}", "%Y-%m-%d %H:%M:%S")
+                duration = TimeModeDuration.FOREVER
+                count = -1
+                if len(parts) == 4:
+                    if parts[3].lower() == "once":
+                        duration = TimeModeDuration.ONCE
+                        count = 1
+                    elif parts[3].isdigit():
+                        duration = TimeModeDuration.TIMES
+                        count = int(parts[3])
+                protocol_mode.set_time(new_time, duration, count)
+            except Exception as e:
+                logger.warning(f"[STDIN] Invalid time command: {e}")
+        case _:
+            logger.warning(f"[STDIN] Unknown command: {command}")
+            logger.info(
+                "[STDIN] Available commands:\n"
+                "  ack [N]                 - respond with ACK (optionally N times)\n"
+                "  nak [N]                 - respond with NAK (optionally N times)\n"
+                "  no-response [N]         - skip responses (optionally N times)\n"
+                "  only-ping               - respond only to pings, skip events\n"
+                "  drop N                  - drop next N packets\n"
+                "  delay N                 - delay each response by N seconds\n"
+                "  time YYYY-MM-DD HH:MM:SS [once|N|forever] - override timestamp for all responses\n"
+                "  loglevel LEVEL          - change log level (DEBUG, INFO, TRACE...)\n"
+            )
@@ -1,6 +1,7 @@
 import asyncio
 import dataclasses
 import json
+from collections import OrderedDict
 from binascii import hexlify
 from utils.logger import logger
 from utils.config_loader import get_port_by_key
@@ -32,3 +33,28 @@ async def tcp_client(internal_message, receiver: str):
         await writer.wait_closed()
     except Exception as err:
         logger.info(f"({receiver}) Failed to send to internal server: {err}")
+
+
+class LRUDict(OrderedDict):
+    """Dict bounded to `maxsize` entries; reads and writes refresh a key, the least recently used one is evicted."""
+
+    def __init__(self, maxsize: int = 1024, *args, **kwargs):
+        self.maxsize = maxsize
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)